@@ -6,7 +6,10 @@ def main (page: ft.Page):
     
     # ESTADOS (dados do app)
     
-    registros = []
+    # id -> registro; o dict guarda a ordem de inclusão e acha pelo id sem percorrer tudo
+    registros = {}
+    # id -> item da lista já montado (só o que mudou é redesenhado)
+    itens = {}
     selecionado_id = None
     prox_id = 1
     
@@ -17,7 +20,9 @@ def main (page: ft.Page):
     
     msg = ft.Text()
     
-    lista = ft.Column(spacing=5)
+    # ListView monta só os itens que aparecem na tela: aguenta milhares de registros
+    lista = ft.ListView(spacing=5, expand=True)
+    vazio = ft.Text("Nenhum registro ainda.")
     
     btn_salvar = ft.ElevatedButton("Salvar")
     btn_excluir = ft.OutlinedButton("Excluir Selecionado", disabled=True)
@@ -34,44 +39,62 @@ def main (page: ft.Page):
         msg.color = cor
         
     def obter_registros_por_id(_id):
-        for r in registros:
-            if r["id"] == _id:
-                return r
-        return None
+        return registros.get(_id)
     
-    #RENDERIZAÇÃO DA LISTA
+    #RENDERIZAÇÃO DA LISTA (um item por registro, identificado pelo id)
+
+    def criar_item(r):
+        item = ft.Container(
+            key=r["id"],
+            data=r["id"],
+            padding=10,
+            border_radius=10,
+            content=ft.Row(
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                controls=[ft.Text(), ft.Text()],
+            ),
+            on_click=ao_clicar_item,
+        )
+        itens[r["id"]] = item
+        pintar_item(r["id"])
+        return item
     
     def renderizar_lista():
-        lista.controls.clear()
-
-        if not registros:
-            lista.controls.append(ft.Text("Nenhum registro ainda."))
-            return
+        # montagem completa só na abertura; depois cada ação mexe só nos itens dela
+        lista.controls = [criar_item(r) for r in registros.values()]
+        vazio.visible = not registros
 
-        for r in registros:
-            is_sel = (r["id"] == selecionado_id)
+    def pintar_item(rid):
+        # atualiza o item que já existe (texto e destaque), sem recriar nada
+        item = itens.get(rid)
+        r = obter_registros_por_id(rid)
+        if item is None or r is None:
+            return None
+        is_sel = (rid == selecionado_id)
+        texto, marca = item.content.controls
+        texto.value = f"#{r['id']} — {r['nome']} ({r['idade']})"
+        marca.value = "Selecionado" if is_sel else ""
+        item.bgcolor = ft.Colors.BLUE_50 if is_sel else None
+        return item
 
-            item = ft.Container(
-                padding=10,
-                border_radius=10,
-                bgcolor=ft.Colors.BLUE_50 if is_sel else None,
-                content=ft.Row(
-                    alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
-                    controls=[
-                        ft.Text(f"#{r['id']} — {r['nome']} ({r['idade']})"),
-                        ft.Text("Selecionado" if is_sel else ""),
-                    ],
-                ),
-                on_click=lambda e, rid=r["id"]: selecionar(rid),
-            )
+    def enviar(*controles):
+        # manda para a tela só os controles que mudaram
+        page.update(*[c for c in controles if c is not None])
 
-            lista.controls.append(item)
+    def trocar_selecao(rid):
+        # o antigo perde o destaque, o novo ganha: só esses dois são redesenhados
+        nonlocal selecionado_id
+        anterior = selecionado_id
+        selecionado_id = rid
+        return pintar_item(anterior), pintar_item(rid)
             
             #Eventos - Ações dos usuários
             
+    def ao_clicar_item(e):
+        selecionar(e.control.data)
+
     def selecionar (rid: int):
-        nonlocal selecionado_id
-        selecionado_id = rid
+        alterados = trocar_selecao(rid)
         
         r = obter_registros_por_id(rid)
         if r:
@@ -80,32 +103,35 @@ def main (page: ft.Page):
             
         btn_excluir.disabled = False
         set_mensagem(f"Registro #{rid} selecionado", ft.Colors.BLUE)
-        renderizar_lista()
-        page.update()
+        enviar(*alterados, nome, idade, btn_excluir, msg)
         
     def salvar(e):
-        nonlocal prox_id, selecionado_id
+        nonlocal prox_id
 
         n = (nome.value or "").strip()
         i = (idade.value or "").strip()
 
         if not n or not i:
             set_mensagem("Preencha Nome e Idade", ft.Colors.RED)
-            page.update()
+            enviar(msg)
             return
 
         # 🔹 NOVO REGISTRO
         if selecionado_id is None:
-            registros.append({
+            registros[prox_id] = {
                 "id": prox_id,
                 "nome": n,
                 "idade": i
-            })
+            }
+            lista.controls.append(criar_item(registros[prox_id]))
+            vazio.visible = False
+            alterados = [lista, vazio]
             set_mensagem(f"Registro #{prox_id} criado", ft.Colors.GREEN)
             prox_id += 1
 
         # 🔹 EDIÇÃO
         else:
+            alterados = []
             r = obter_registros_por_id(selecionado_id)
             if r:
                 r["nome"] = n
@@ -113,11 +139,10 @@ def main (page: ft.Page):
                 set_mensagem(f"Registro #{selecionado_id} atualizado", ft.Colors.GREEN)
 
         limpar_campos()
-        selecionado_id = None
+        alterados.extend(trocar_selecao(None))
         btn_excluir.disabled = True
 
-        renderizar_lista()
-        page.update()
+        enviar(*alterados, nome, idade, btn_excluir, msg)
 
         
     def excluir(e):
@@ -125,27 +150,25 @@ def main (page: ft.Page):
         if selecionado_id is None:
             return
         
-        r = obter_registros_por_id(selecionado_id)
+        r = registros.pop(selecionado_id, None)
         if r:
-            registros.remove(r)
+            lista.controls.remove(itens.pop(selecionado_id))
             set_mensagem(f"Registro #{selecionado_id} excluido", ft.Colors.ORANGE)
         
         selecionado_id = None
         btn_excluir.disabled = True
         limpar_campos()
+        vazio.visible = not registros
         
-        renderizar_lista()
-        page.update()
+        enviar(lista, vazio, nome, idade, btn_excluir, msg)
         
     def limpar_selecao(e):
-        nonlocal selecionado_id
-        selecionado_id = None
+        alterados = trocar_selecao(None)
         btn_excluir.disabled = True
         limpar_campos()
         set_mensagem("Seleção Limpa", ft.Colors.BLACK)
         
-        renderizar_lista()
-        page.update()
+        enviar(*alterados, nome, idade, btn_excluir, msg)
         
     # amarrar eventos nos botões
     btn_salvar.on_click = salvar
@@ -162,6 +185,7 @@ def main (page: ft.Page):
         msg,
         ft.Divider(),
         ft.Text("Registros:", weight=ft.FontWeight.BOLD),
+        vazio,
         lista,
     )
     #renderização inicial
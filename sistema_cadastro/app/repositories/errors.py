@@ -0,0 +1,6 @@
+class DuplicateEmailError(ValueError):
+    """O e-mail já pertence a outro cadastro."""
+
+
+class ConflictError(ValueError):
+    """O cadastro mudou (ou foi excluído) desde que foi lido: outra sessão gravou antes."""
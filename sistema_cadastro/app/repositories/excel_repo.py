@@ -1,4 +1,16 @@
-from openpyxl import Workbook, load_workbook
+import json
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+
+from app.repositories.errors import ConflictError, DuplicateEmailError
+from app.repositories.snapshot import read_snapshot, write_snapshot
+from app.repositories.user_index import UserIndex, normalize_email
+from app.utils.file_lock import FileLock
+from app.utils.timing import timed
 
 
 HEADERS = [
@@ -15,94 +27,898 @@ HEADERS = [
     "complemento",
 ]
 
+# colunas de controle, depois das de dados: id estável do cadastro, versão
+# (incrementada a cada alteração, para detectar edição concorrente) e quando
+# foi excluído (vazio = ativo; a linha só sai de vez no vacuum)
+META_HEADERS = ["id", "versao", "excluido_em"]
+SHEET_HEADERS = HEADERS + META_HEADERS
+_ID = len(HEADERS)  # posição do id nos valores de uma linha
+_VERSION = _ID + 1
+_DELETED = _VERSION + 1
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# propriedade do .xlsx com o último seq do journal já gravado na planilha
+JOURNAL_SEQ_PROP = "journal_seq"
+# propriedade do .xlsx com o próximo id a usar: nunca desce, mesmo que os
+# cadastros de id mais alto tenham saído da planilha (ids não são reaproveitados)
+NEXT_ID_PROP = "proximo_id"
+
+# linhas lidas por vez ao percorrer a planilha de trás para frente
+_CHUNK_ROWS = 500
+
+
+def _is_blank_row(values) -> bool:
+    # só as colunas de dados contam; id/versao sozinhos não fazem um cadastro
+    return all(v is None or str(v).strip() == "" for v in islice(values, len(HEADERS)))
+
+
+def _is_live(values) -> bool:
+    """Linha que aparece para o usuário: tem dados e não está marcada como excluída."""
+    return (len(values) <= _DELETED or not values[_DELETED]) and not _is_blank_row(values)
+
+
+def _last_row(ws) -> int:
+    # ws.max_row varre todas as células a cada chamada; o openpyxl já mantém
+    # _current_row atualizado em append/cell/delete_rows
+    return ws._current_row
+
+
+# nome da chave do id de quando os registros eram dicts
+_RECORD_ALIASES = {"_excel_row": "key"}
+
+
+class UserRecord:
+    """
+    Um cadastro lido do repositório: os campos de HEADERS (vazio no lugar de
+    None), `key` (id do cadastro) e `version` (versão lida).
+
+    __slots__ em vez de um dict por linha: ocupa bem menos memória e custa
+    menos para criar (bench.py --memoria mostra a diferença). Continua
+    aceitando o acesso de antes (user["nome"], user.get("_excel_row"),
+    dict(user)). É só de leitura: tabela e busca compartilham o mesmo objeto.
+    """
+
+    __slots__ = (*HEADERS, "key", "version")
+
+    def __init__(self, values, key: int, version: int = 1):
+        # values: na ordem de HEADERS
+        for field, value in zip(HEADERS, values):
+            setattr(self, field, "" if value is None else value)
+        self.key = key
+        self.version = version
+
+    def __getitem__(self, field: str):
+        name = _RECORD_ALIASES.get(field, field)
+        if name not in _RECORD_FIELDS:
+            raise KeyError(field)
+        return getattr(self, name)
+
+    def get(self, field: str, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def keys(self) -> tuple[str, ...]:
+        return (*HEADERS, "_excel_row")
+
+    def text(self, field: str) -> str:
+        """Valor do campo como texto (o que a tabela mostra)."""
+        value = getattr(self, field)
+        return value if value.__class__ is str else str(value)
+
+    def __repr__(self) -> str:
+        return f"UserRecord(key={self.key}, version={self.version}, nome={self.nome!r})"
+
+
+_RECORD_FIELDS = frozenset(UserRecord.__slots__)
+
+
+def _to_user(values) -> UserRecord:
+    return UserRecord(values, values[_ID], values[_VERSION] or 1)
+
+
+def _sheet_row(row: list, key: int, version: int) -> list:
+    """Valores de HEADERS (completados com vazio) seguidos de id e versão."""
+    values = list(row[: len(HEADERS)])
+    values += [None] * (len(HEADERS) - len(values))
+    return values + [key, version]
+
 
 class ExcelRepo:
-    def __init__(self, file_path: str = "cadastros.xlsx", sheet_name: str = "usuarios"):
+    """
+    Cadastros numa aba do .xlsx.
+
+    Os registros (UserRecord) trazem em `key` o id do cadastro (coluna "id"),
+    que não muda quando outras linhas são excluídas, e em `version` a versão
+    lida, para update_user/delete_user recusarem gravar por cima de outra sessão.
+
+    Várias sessões (ou processos) podem usar o mesmo arquivo: quem grava
+    segura uma trava em "<arquivo>.lock" e antes aplica o que os outros já
+    gravaram; quem só lê não espera ninguém.
+
+    O openpyxl só é carregado quando o .xlsx precisa ser lido ou gravado: com
+    um snapshot válido a abertura não toca na planilha.
+    """
+
+    def __init__(
+        self,
+        file_path: str = "cadastros.xlsx",
+        sheet_name: str = "usuarios",
+        cached: bool = True,
+        journal: bool = True,
+        compact_every: int = 50,
+        lock_timeout: float | None = 30.0,
+        snapshot: bool = True,
+        undo_window: float | None = 600.0,
+    ):
+        """
+        cached=True mantém a planilha em memória entre as chamadas e só relê o
+        arquivo quando ele muda por fora (mtime/tamanho diferentes).
+        cached=False relê o arquivo a cada operação (comportamento antigo).
+
+        journal=True grava cada alteração como uma linha JSON em
+        "<arquivo>.journal" (custo O(1)) e só regrava o .xlsx a cada
+        compact_every alterações, numa única gravação. Na abertura, o que
+        ficou no journal e ainda não está na planilha é reaplicado.
+        journal=False grava o .xlsx inteiro a cada alteração.
+
+        lock_timeout: quanto esperar pela trava de escrita antes de desistir.
+
+        snapshot=True guarda em "<arquivo>.snapshot" as linhas da planilha num
+        formato binário, junto com o carimbo do .xlsx; enquanto o .xlsx não
+        muda, as próximas aberturas leem só o snapshot (muito mais rápido). A
+        planilha de verdade só é aberta na primeira gravação.
+
+        undo_window: por quantos segundos um cadastro excluído ainda pode ser
+        restaurado (restore_user); depois disso a próxima compactação o remove
+        de vez. None: só vacuum() remove.
+        """
         self.file_path = file_path
         self.sheet_name = sheet_name
+        self.cached = cached
+        self.journal = journal
+        self.compact_every = max(1, compact_every)
+        self.journal_path = f"{file_path}.journal"
+        self.snapshot = snapshot
+        self.snapshot_path = f"{file_path}.snapshot"
+        self.undo_window = undo_window
+
+        self._lock = threading.RLock()  # estado em memória (threads desta sessão)
+        self._file_lock = FileLock(f"{file_path}.lock", timeout=lock_timeout)
 
-    def _ensure_workbook(self):
+        self._wb = None  # None com _ws preenchido: aba veio do snapshot (só leitura)
+        self._ws = None
+        self._stamp = None  # (inode, mtime_ns, tamanho) do arquivo quando foi lido/salvo
+        self._seq = 0  # último seq aplicado em memória
+        self._pending = 0  # entradas do journal ainda não gravadas no .xlsx
+        self._journal_pos = 0  # bytes do journal já aplicados em memória
+        self._rows: dict[int, int] = {}  # id -> linha no Excel
+        self._tombstones: dict[int, str] = {}  # id -> quando foi excluído (ainda na planilha)
+        self._next_id = 1
+        self._count = None  # total de cadastros (linhas não vazias), calculado sob demanda
+        self._index = None  # UserIndex, montado na primeira busca e mantido a cada alteração
+        self._generation = -1  # quantas vezes o arquivo foi (re)lido; muda com edição externa
+        self._save_due = False  # o .xlsx precisa ser regravado (feito ao soltar a trava de escrita)
+        self._saving = False  # _save() gravando o arquivo agora
+
+        # valida cabeçalho uma única vez, na construção
+        if not self._disk_ready():
+            self._sheet()
+            if self._save_due and self._wb is not None:
+                with self._writing():
+                    pass  # arquivo novo ou corrigido (cabeçalho, ids): já fica gravado
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        # o inode muda a cada os.replace, mesmo dentro da resolução do mtime
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return 0
+
+    def _open_xlsx(self):
+        """Lê o .xlsx, criando/corrigindo aba e cabeçalho. Retorna (wb, ws, changed)."""
+        from openpyxl import Workbook, load_workbook
+
+        changed = False
         try:
             wb = load_workbook(self.file_path)
             if self.sheet_name in wb.sheetnames:
                 ws = wb[self.sheet_name]
                 # garante cabeçalho na linha 1
-                if ws.max_row < 1 or ws["A1"].value != HEADERS[0]:
+                header = [c.value for c in ws[1]][: len(SHEET_HEADERS)]
+                if header != SHEET_HEADERS:
                     if ws.max_row == 0:
-                        ws.append(HEADERS)
+                        ws.append(SHEET_HEADERS)
                     else:
-                        for i, h in enumerate(HEADERS, start=1):
+                        for i, h in enumerate(SHEET_HEADERS, start=1):
                             ws.cell(row=1, column=i, value=h)
+                    changed = True
             else:
                 ws = wb.create_sheet(self.sheet_name)
-                ws.append(HEADERS)
+                ws.append(SHEET_HEADERS)
+                changed = True
 
             # remove sheet padrão se existir e estiver vazio
             if "Sheet" in wb.sheetnames:
                 ws_default = wb["Sheet"]
                 if ws_default.max_row == 1 and ws_default.max_column == 1 and ws_default["A1"].value is None:
                     wb.remove(ws_default)
-
-            wb.save(self.file_path)
+                    changed = True
 
         except FileNotFoundError:
             wb = Workbook()
             ws = wb.active
             ws.title = self.sheet_name
-            ws.append(HEADERS)
-            wb.save(self.file_path)
+            ws.append(SHEET_HEADERS)
+            changed = True
+
+        return wb, ws, changed
+
+    @timed("excel.carregar")
+    def _ensure_workbook(self, use_snapshot: bool = True):
+        stamp = self._file_stamp()
+        snap = read_snapshot(self.snapshot_path, stamp, self.sheet_name) if self.snapshot and use_snapshot else None
+        if snap is not None:
+            # .xlsx igual ao da última leitura/gravação: nem abre o arquivo
+            seq, next_id, ws = snap
+            self._load(stamp, None, ws, False, seq, next_id)
+        else:
+            self._load(stamp, *self._open_xlsx())
+
+    def _load(self, stamp, wb, ws, changed: bool, seq: int | None = None, next_id: int | None = None,
+              snapshot: bool = True):
+        """
+        Passa a usar a planilha lida e reaplica o journal por cima. seq e
+        next_id vêm do snapshot; sem ele, das propriedades do .xlsx.
+        """
+        self._wb = wb
+        self._ws = ws
+        self._count = None
+        self._index = None
+        self._generation += 1
+        self._seq = self._doc_prop(JOURNAL_SEQ_PROP) if seq is None else seq
+        changed |= self._scan_ids(self._doc_prop(NEXT_ID_PROP) if next_id is None else next_id)
+        if snapshot and wb is not None and not changed:
+            self._write_snapshot(stamp)  # a próxima abertura não precisa ler o .xlsx
+        self._pending = self._replay_journal()
+
+        # só regrava se algo foi corrigido, e só na próxima escrita (com a trava
+        # e a planilha em dia); até lá basta registrar o carimbo atual
+        self._save_due = changed or self._pending >= self.compact_every
+        self._stamp = stamp
+
+    @timed("excel.abrir_para_gravar")
+    def _open_for_writing(self):
+        """
+        Troca a aba do snapshot pelo .xlsx de verdade (estilos e outras abas
+        precisam ir junto na próxima gravação). A leitura do arquivo é feita
+        sem a trava: enquanto isso, quem só lê continua no snapshot.
+        """
+        stamp = self._file_stamp()
+        opened = self._open_xlsx()
+        with self._lock:
+            if self._wb is None and self._ws is not None and stamp == self._stamp == self._file_stamp():
+                generation = self._generation
+                self._load(stamp, *opened, snapshot=False)  # o snapshot atual já é deste .xlsx
+                self._generation = generation  # mesmo conteúdo: a UI não precisa reler
+
+    @timed("excel.snapshot")
+    def _write_snapshot(self, stamp):
+        if not self.snapshot or stamp is None or self._file_stamp() != stamp:
+            return  # mudou enquanto era lido: o conteúdo pode não ser o deste carimbo
+        ws = self._ws
+        try:
+            write_snapshot(self.snapshot_path, stamp, self.sheet_name, self._seq, self._next_id,
+                           ws.iter_rows(min_row=1, max_row=_last_row(ws), max_col=len(SHEET_HEADERS), values_only=True))
+        except OSError:
+            pass  # sem snapshot a próxima abertura só fica mais lenta
+
+    def _scan_ids(self, next_id: int = 1) -> bool:
+        """
+        Monta o mapa id -> linha. Linhas sem id (planilhas de antes da coluna)
+        ganham um, na ordem em que estão. Retorna True se numerou alguma.
+        next_id: próximo id já reservado (gravado no .xlsx); o novo nunca fica
+        abaixo dele, senão o id de um cadastro que saiu voltaria a ser usado.
+        """
+        ws = self._ws
+        self._rows = {}
+        self._tombstones = {}
+        missing = []
+        rows = ws.iter_rows(min_row=2, max_row=_last_row(ws), max_col=len(SHEET_HEADERS), values_only=True)
+        for row_num, values in enumerate(rows, start=2):
+            if values[_ID] is not None:
+                self._rows[int(values[_ID])] = row_num
+                if values[_DELETED]:
+                    self._tombstones[int(values[_ID])] = str(values[_DELETED])
+            elif not _is_blank_row(values):
+                missing.append(row_num)
+
+        self._next_id = max(next_id, max(self._rows, default=0) + 1)
+        for row_num in missing:
+            ws.cell(row=row_num, column=_ID + 1).value = self._next_id
+            ws.cell(row=row_num, column=_VERSION + 1).value = 1
+            self._rows[self._next_id] = row_num
+            self._next_id += 1
+        return bool(missing)
 
-    def append_user(self, row: list):
-        self._ensure_workbook()
-        wb = load_workbook(self.file_path)
-        ws = wb[self.sheet_name]
-        ws.append(row)
-        wb.save(self.file_path)
+    def _sheet(self):
+        """
+        Retorna a aba de usuários pronta para uso.
+        No modo cached só relê o arquivo se ele foi alterado fora do repo; se
+        outra sessão só acrescentou ao journal, aplica apenas o que falta.
+        """
+        with self._lock:
+            if self._saving:
+                return self._ws  # o arquivo está sendo gravado por esta sessão a partir desta planilha
+            if not self.cached or self._ws is None or self._file_stamp() != self._stamp:
+                self._ensure_workbook()
+            elif self._journal_size() != self._journal_pos and not self._catch_up():
+                self._ensure_workbook()
+            return self._ws
+
+    @contextmanager
+    def _writing(self):
+        """
+        Trava de escrita (entre sessões, processos e threads), com a planilha
+        já em dia. Se o bloco pediu para regravar o .xlsx (_save_due), a
+        gravação acontece na saída, ainda com a trava de escrita mas já sem
+        self._lock: as leituras desta sessão não esperam o arquivo ser gravado.
+        """
+        if self.cached and self._wb is None and self._ws is not None:
+            self._open_for_writing()
+        with self._file_lock:
+            with self._lock:
+                ws = self._sheet()
+                if self._wb is None:
+                    # o .xlsx mudou enquanto era aberto: abre de novo, agora com a trava
+                    self._ensure_workbook(use_snapshot=False)
+                    ws = self._ws
+                yield ws
+            if self._save_due:
+                self._save()
 
-    def list_users(self) -> list[dict]:
+    @timed("excel.gravar")
+    def _save(self):
         """
-        Retorna lista de dicts com uma chave extra:
-        - _excel_row: número da linha real no Excel (para editar/excluir)
-        Mais recentes primeiro.
+        Grava a planilha inteira (com o seq do journal e o próximo id) e zera
+        o journal. Grava num arquivo temporário e troca no fim, para nunca
+        deixar o .xlsx pela metade se o processo cair durante a gravação.
+        Só é chamada por _writing(): com a trava de escrita ninguém mais altera
+        a planilha, então ela pode ser gravada fora de self._lock.
         """
-        self._ensure_workbook()
-        wb = load_workbook(self.file_path)
-        ws = wb[self.sheet_name]
+        with self._lock:
+            self._save_due = False
+            self._saving = True
+            wb = self._wb
+            self._set_doc_prop(JOURNAL_SEQ_PROP, self._seq)
+            self._set_doc_prop(NEXT_ID_PROP, self._next_id)
 
-        users: list[dict] = []
+        tmp_path = f"{self.file_path}.tmp"
+        try:
+            wb.save(tmp_path)
+            os.replace(tmp_path, self.file_path)
+        except Exception:
+            with self._lock:
+                # memória e disco divergiram: força releitura na próxima chamada
+                self._wb = self._ws = self._stamp = None
+                self._saving = False
+            raise
+
+        with self._lock:
+            self._saving = False
+            self._stamp = stamp = self._file_stamp()
+            # a planilha já contém tudo até self._seq; o journal pode ser zerado
+            if self._pending:
+                open(self.journal_path, "w", encoding="utf-8").close()
+                self._pending = 0
+                self._journal_pos = 0
+        self._write_snapshot(stamp)
+
+    # ===== Journal =====
+
+    def _doc_prop(self, name: str) -> int:
+        """Propriedade inteira gravada no .xlsx (JOURNAL_SEQ_PROP, NEXT_ID_PROP); 0 se não há."""
+        props = self._wb.custom_doc_props
+        if name in props.names:
+            return int(props[name].value or 0)
+        return 0
+
+    def _set_doc_prop(self, name: str, value: int):
+        from openpyxl.packaging.custom import IntProperty
 
-        for excel_row in range(2, ws.max_row + 1):  # pula cabeçalho
-            values = [ws.cell(row=excel_row, column=c).value for c in range(1, len(HEADERS) + 1)]
-            if all(v is None or str(v).strip() == "" for v in values):
+        props = self._wb.custom_doc_props
+        if name in props.names:
+            props[name].value = value
+        else:
+            props.append(IntProperty(name=name, value=value))
+
+    def _read_journal(self, start: int = 0) -> tuple[list[dict], int]:
+        """Entradas completas a partir do byte `start` e a posição logo depois da última."""
+        entries = []
+        pos = start
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(start)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # sendo escrita agora por outra sessão, ou cortada por queda
+                    if line.strip():
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            break
+                    pos += len(line)
+        except FileNotFoundError:
+            pass
+        return entries, pos
+
+    def _replay_journal(self) -> int:
+        """Reaplica em memória as entradas que ainda não estão no .xlsx."""
+        replayed = 0
+        entries, self._journal_pos = self._read_journal()
+        for entry in entries:
+            if entry["seq"] <= self._seq:
                 continue
+            self._apply(self._ws, entry)
+            self._seq = entry["seq"]
+            replayed += 1
+        return replayed
 
-            item = {HEADERS[i]: (values[i] if values[i] is not None else "") for i in range(len(HEADERS))}
-            item["_excel_row"] = excel_row
-            users.append(item)
+    @timed("excel.sincronizar")
+    def _catch_up(self) -> bool:
+        """
+        Aplica o que outras sessões acrescentaram ao journal desde a última
+        leitura. False se não der para continuar de onde parou (aí relê tudo).
+        """
+        if self._journal_size() < self._journal_pos:
+            return False
 
-        users.reverse()
-        return users
+        entries, pos = self._read_journal(self._journal_pos)
+        applied = 0
+        for entry in entries:
+            if entry["seq"] <= self._seq:
+                continue
+            if entry["seq"] != self._seq + 1:
+                return False
+            try:
+                self._apply(self._ws, entry)
+            except (KeyError, ValueError):
+                return False
+            self._seq = entry["seq"]
+            applied += 1
+
+        self._journal_pos = pos
+        self._pending += applied
+        if applied:
+            self._generation += 1  # mudou por fora: a UI relê o que mostra
+        return True
+
+    @timed("excel.journal")
+    def _log(self, entry: dict):
+        with open(self.journal_path, "ab") as f:
+            if f.tell() != self._journal_pos:
+                # sobra de uma escrita interrompida: a próxima linha não pode emendar nela
+                f.truncate(self._journal_pos)
+            f.write(json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self._journal_pos = f.tell()
+
+    def _commit(self, ws, entry: dict):
+        """Aplica a alteração em memória e a torna durável (journal ou .xlsx)."""
+        self._apply(ws, entry)
+        self._seq += 1
+        if not self.journal:
+            self._save_due = True
+            return
+
+        entry["seq"] = self._seq
+        try:
+            self._log(entry)
+        except Exception:
+            self._wb = self._ws = self._stamp = None
+            raise
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self._save_due = True
+
+    def _row_values(self, ws, row_num: int) -> tuple:
+        # ws[linha] pediria ws.max_column, que varre todas as células
+        return next(ws.iter_rows(min_row=row_num, max_row=row_num, max_col=len(SHEET_HEADERS), values_only=True))
+
+    def _row_is_live(self, ws, row_num: int) -> bool:
+        return _is_live(self._row_values(ws, row_num))
+
+    def _apply(self, ws, entry: dict):
+        op = entry["op"]
+        index = self._index
+        before = after = 0  # 1 se a linha afetada conta como cadastro
+        if op == "append":
+            row = entry["row"]
+            key = row[_ID]
+            ws.append(row)
+            self._rows[key] = _last_row(ws)
+            self._next_id = max(self._next_id, key + 1)
+            after = not _is_blank_row(row)
+            if index is not None and after:
+                index.add(key, row)
+        elif op == "update":
+            key = entry["id"]
+            row_num = self._rows[key]
+            before = self._row_is_live(ws, row_num)
+            for col_idx, value in enumerate(entry["row"], start=1):
+                # ws.cell(..., value=None) não apaga o valor; atribui direto
+                ws.cell(row=row_num, column=col_idx).value = value
+            after = not _is_blank_row(entry["row"])
+            if index is not None:
+                index.remove(key)
+                if after:
+                    index.add(key, entry["row"])
+        elif op == "delete":
+            # exclusão lógica: só marca a linha; nada se desloca
+            key = entry["id"]
+            row_num = self._rows[key]
+            before = self._row_is_live(ws, row_num)
+            ws.cell(row=row_num, column=_VERSION + 1).value = entry["version"]
+            ws.cell(row=row_num, column=_DELETED + 1).value = entry["deleted_at"]
+            self._tombstones[key] = entry["deleted_at"]
+            if index is not None:
+                index.remove(key)
+        elif op == "restore":
+            key = entry["id"]
+            row_num = self._rows[key]
+            ws.cell(row=row_num, column=_VERSION + 1).value = entry["version"]
+            ws.cell(row=row_num, column=_DELETED + 1).value = None
+            self._tombstones.pop(key, None)
+            values = self._row_values(ws, row_num)
+            after = _is_live(values)
+            if index is not None and after:
+                index.add(key, values)
+        else:
+            raise ValueError(f"Operação desconhecida no journal: {op}")
+
+        if self._count is not None:
+            self._count += after - before
+
+    @timed("excel.compact")
+    def compact(self, vacuum: bool = True):
+        """
+        Grava no .xlsx tudo o que está pendente no journal (uma única
+        gravação). Com vacuum, já remove as exclusões mais velhas que undo_window.
+        """
+        if self._ws is None:
+            return
+        with self._lock:
+            expired = vacuum and self.undo_window is not None and bool(self._expired(self.undo_window))
+        if not (self._pending or self._save_due or expired):
+            return
+        with self._writing() as ws:
+            if expired:
+                self._vacuum_rows(ws, self.undo_window)
+            self._save_due |= bool(self._pending)
+
+    def _expired(self, older_than: float | None) -> list[int]:
+        """Ids excluídos há mais de older_than segundos (todos, se None)."""
+        if older_than is None:
+            return list(self._tombstones)
+        cutoff = (datetime.now() - timedelta(seconds=older_than)).strftime(_TIME_FORMAT)
+        return [key for key, when in self._tombstones.items() if when <= cutoff]
+
+    @timed("excel.vacuum")
+    def vacuum(self, older_than: float | None = None) -> int:
+        """
+        Tira da planilha, numa passada só, as linhas excluídas (exclusão
+        lógica) e grava o .xlsx uma vez. older_than: só as excluídas há mais
+        de tantos segundos; as outras continuam podendo ser restauradas.
+        Retorna quantas linhas saíram.
+        """
+        with self._writing() as ws:
+            return self._vacuum_rows(ws, older_than)
+
+    def _vacuum_rows(self, ws, older_than: float | None) -> int:
+        doomed = {self._rows[key] for key in self._expired(older_than)}
+        if not doomed:
+            return 0
+
+        # sobe os valores das linhas que ficam por cima das que saem e
+        # corta o fim: cada linha é copiada no máximo uma vez
+        first, last = min(doomed), _last_row(ws)
+        dest = first
+        rows = ws.iter_rows(min_row=first, max_row=last, max_col=len(SHEET_HEADERS), values_only=True)
+        for row_num, values in enumerate(rows, start=first):
+            if row_num in doomed:
+                continue
+            for col_idx, value in enumerate(values, start=1):
+                ws.cell(row=dest, column=col_idx).value = value
+            dest += 1
+        ws.delete_rows(dest, last - dest + 1)  # só o fim: não há nada depois para deslocar
+
+        self._scan_ids(self._next_id)  # as linhas mudaram; o contador de ids não volta
+        self._save_due = True
+        return len(doomed)
+
+    def close(self):
+        self.compact()
+
+    def data_version(self) -> int:
+        """Muda quando o arquivo é alterado por fora (as alterações feitas por este repo não contam)."""
+        self._sheet()
+        return self._generation
+
+    @timed("excel.append_user")
+    def append_user(self, row: list) -> int:
+        """Inclui o cadastro e retorna o id dele."""
+        with self._writing() as ws:
+            self._check_unique_email(row)
+            key = self._next_id
+            self._commit(ws, {"op": "append", "row": _sheet_row(row, key, 1)})
+            return key
+
+    @timed("excel.append_users")
+    def append_users(self, rows: list[list]):
+        """
+        Inclui vários cadastros com uma única gravação do .xlsx (importação em lote).
+        Não passa pelo journal: a gravação já leva junto o que estava pendente.
+        """
+        with self._writing() as ws:
+            for row in rows:
+                self._apply(ws, {"op": "append", "row": _sheet_row(row, self._next_id, 1)})
+            self._save_due = True
+
+    # ===== Leitura =====
+
+    def _journal_empty(self) -> bool:
+        try:
+            return os.path.getsize(self.journal_path) == 0
+        except FileNotFoundError:
+            return True
+
+    def _streaming(self) -> bool:
+        """
+        Sem cache e sem nada pendente no journal, o arquivo em disco está
+        completo e pode ser lido em modo read_only, sem carregar tudo.
+        """
+        return not self.cached and self._journal_empty() and os.path.exists(self.file_path)
+
+    def _disk_ready(self) -> bool:
+        """
+        Sem cache, com o journal vazio e o cabeçalho certo, o arquivo em disco
+        já serve como está: a abertura só confere o cabeçalho (modo read_only)
+        e as leituras são em streaming, sem carregar a planilha inteira.
+        """
+        if not self._streaming():
+            return False
+        from openpyxl import load_workbook
+
+        wb = load_workbook(self.file_path, read_only=True)
+        try:
+            if self.sheet_name not in wb.sheetnames:
+                return False
+            header = next(wb[self.sheet_name].iter_rows(max_row=1, max_col=len(SHEET_HEADERS), values_only=True), ())
+            return list(header) == SHEET_HEADERS
+        finally:
+            wb.close()
+
+    def _iter_disk_rows(self):
+        """Valores das linhas não vazias, lendo o arquivo em streaming."""
+        from openpyxl import load_workbook
+
+        wb = load_workbook(self.file_path, read_only=True)
+        try:
+            ws = wb[self.sheet_name]
+            for values in ws.iter_rows(min_row=2, max_col=len(SHEET_HEADERS), values_only=True):
+                if _is_live(values):
+                    yield values
+        finally:
+            wb.close()
+
+    def _iter_memory_rows(self, newest_first: bool, deleted: bool = False):
+        """
+        Valores das linhas não vazias da planilha em memória. deleted=True
+        inclui as excluídas que ainda não saíram no vacuum.
+        """
+        ws = self._sheet()
+        width = len(SHEET_HEADERS)
+        keep = (lambda values: not _is_blank_row(values)) if deleted else _is_live
+
+        if not newest_first:
+            for values in ws.iter_rows(min_row=2, max_col=width, values_only=True):
+                if keep(values):
+                    yield values
+            return
+
+        hi = _last_row(ws)
+        while hi >= 2:
+            lo = max(2, hi - _CHUNK_ROWS + 1)
+            chunk = list(ws.iter_rows(min_row=lo, max_row=hi, max_col=width, values_only=True))
+            for values in reversed(chunk):
+                if keep(values):
+                    yield values
+            hi = lo - 1
+
+    def iter_users(self, offset: int = 0, limit: int | None = None, newest_first: bool = True):
+        """
+        Gera os cadastros da página pedida (mesmo formato de list_users),
+        sem montar a lista inteira.
+        """
+        if self._streaming():
+            rows = self._iter_disk_rows()
+            if newest_first:
+                # o arquivo só é lido do início: guarda só as últimas offset+limit linhas
+                rows = reversed(deque(rows, maxlen=None if limit is None else offset + limit))
+        else:
+            rows = self._iter_memory_rows(newest_first)
+
+        stop = None if limit is None else offset + limit
+        for values in islice(rows, offset, stop):
+            yield _to_user(values)
+
+    @timed("excel.count_users")
+    def count_users(self) -> int:
+        if self._streaming():
+            return sum(1 for _ in self._iter_disk_rows())
+
+        ws = self._sheet()
+        if self._count is None:
+            rows = ws.iter_rows(min_row=2, max_col=len(SHEET_HEADERS), values_only=True)
+            self._count = sum(1 for values in rows if _is_live(values))
+        return self._count
+
+    @timed("excel.list_users")
+    def list_users(self) -> list[UserRecord]:
+        """
+        Todos os cadastros (UserRecord), mais recentes primeiro. Além dos
+        campos, cada um traz:
+        - key (ou ["_excel_row"]): id do cadastro (para editar/excluir)
+        - version: versão lida (para detectar edição concorrente)
+        """
+        return list(self.iter_users())
+
+    def _current_version(self, ws, key: int) -> int:
+        """Versão atual do cadastro; ConflictError se ele não existe mais."""
+        row_num = self._rows.get(key)
+        if row_num is None or not self._row_is_live(ws, row_num):
+            raise ConflictError("Cadastro não encontrado: pode ter sido excluído em outra sessão.")
+        return ws.cell(row=row_num, column=_VERSION + 1).value or 1
+
+    @timed("excel.update_user")
+    def update_user(self, key: int, row: list, expected_version: int | None = None) -> int:
+        """
+        Grava o cadastro `key` (id) e retorna a nova versão.
+        Com expected_version, recusa (ConflictError) se outra sessão gravou antes.
+        """
+        with self._writing() as ws:
+            version = self._current_version(ws, key)
+            if expected_version is not None and version != expected_version:
+                raise ConflictError("Cadastro alterado em outra sessão. Recarregue e tente de novo.")
+
+            current = ws.cell(row=self._rows[key], column=HEADERS.index("email") + 1).value
+            self._check_unique_email(row, key, current)
+            self._commit(ws, {"op": "update", "id": key, "row": _sheet_row(row, key, version + 1)})
+            return version + 1
+
+    @timed("excel.update_users")
+    def update_users(self, updates: list[tuple[int, list]], versions: dict[int, int] | None = None) -> int:
+        """
+        Atualiza vários cadastros com uma única gravação do .xlsx.
+        updates: pares (id, linha nova). Não valida e-mail único: é para
+        correções em lote (ex.: preencher endereço), não para edição.
+        Cadastros que não existem mais ou cuja versão difere da informada em
+        `versions` são pulados. Retorna quantos foram gravados.
+        """
+        with self._writing() as ws:
+            applied = 0
+            for key, row in updates:
+                try:
+                    version = self._current_version(ws, key)
+                except ConflictError:
+                    continue
+                if versions is not None and versions.get(key, version) != version:
+                    continue
+                self._apply(ws, {"op": "update", "id": key, "row": _sheet_row(row, key, version + 1)})
+                applied += 1
+            if applied:
+                self._save_due = True
+            return applied
+
+    @timed("excel.delete_user")
+    def delete_user(self, key: int, expected_version: int | None = None):
+        """
+        Exclusão lógica: marca "excluido_em" e some das listagens, sem
+        deslocar as outras linhas. restore_user desfaz até o próximo vacuum.
+        """
+        with self._writing() as ws:
+            version = self._current_version(ws, key)
+            if expected_version is not None and version != expected_version:
+                raise ConflictError("Cadastro alterado em outra sessão. Recarregue e tente de novo.")
+
+            deleted_at = datetime.now().strftime(_TIME_FORMAT)
+            self._commit(ws, {"op": "delete", "id": key, "version": version + 1, "deleted_at": deleted_at})
 
-    def update_user(self, excel_row: int, row: list):
-        self._ensure_workbook()
-        wb = load_workbook(self.file_path)
-        ws = wb[self.sheet_name]
+    @timed("excel.restore_user")
+    def restore_user(self, key: int) -> int:
+        """
+        Desfaz a exclusão do cadastro `key` (id) e retorna a nova versão.
+        DuplicateEmailError se, enquanto estava excluído, outro cadastro passou a usar o e-mail.
+        """
+        with self._writing() as ws:
+            if key not in self._tombstones:
+                raise ConflictError("Não há exclusão para desfazer: o cadastro já foi removido de vez ou restaurado.")
+
+            values = self._row_values(ws, self._rows[key])
+            self._check_unique_email(values, exclude_row=key)
+            version = (values[_VERSION] or 1) + 1
+            self._commit(ws, {"op": "restore", "id": key, "version": version})
+            return version
+
+    # ===== Busca =====
+
+    def _user_index(self) -> UserIndex:
+        self._sheet()
+        if self._index is None:
+            rows = ((values[_ID], values) for values in self._iter_memory_rows(newest_first=False))
+            self._index = UserIndex.build(SHEET_HEADERS, rows)
+        return self._index
 
-        if excel_row < 2 or excel_row > ws.max_row:
-            raise ValueError("Linha inválida para atualização.")
+    @timed("excel.get_user")
+    def get_user(self, key: int) -> UserRecord | None:
+        ws = self._sheet()
+        row_num = self._rows.get(key)
+        if row_num is None or not self._row_is_live(ws, row_num):
+            return None
+        return self._users_at([key])[0]
 
-        for col_idx, value in enumerate(row, start=1):
-            ws.cell(row=excel_row, column=col_idx, value=value)
+    def _users_at(self, keys) -> list[UserRecord]:
+        ws = self._sheet()
+        users = []
+        for key in keys:
+            row_num = self._rows[key]
+            values = next(ws.iter_rows(min_row=row_num, max_row=row_num, max_col=len(SHEET_HEADERS), values_only=True))
+            users.append(_to_user(values))
+        return users
+
+    @timed("excel.email_exists")
+    def email_exists(self, email: str, exclude_row: int | None = None) -> bool:
+        """exclude_row: id do cadastro que não conta (o que está sendo editado)."""
+        return bool(self._user_index().find_email(email) - {exclude_row})
+
+    def _check_unique_email(self, row: list, exclude_row: int | None = None, current: str | None = None):
+        """
+        DuplicateEmailError se o e-mail de `row` já é de outro cadastro.
+        current: e-mail gravado hoje no cadastro editado; se não mudou, não
+        confere (cadastros antigos que já dividem um e-mail continuam editáveis).
+        """
+        email = row[HEADERS.index("email")] if len(row) > HEADERS.index("email") else ""
+        if current is not None and normalize_email(email) == normalize_email(current):
+            return
+        if email and self.email_exists(email, exclude_row):
+            raise DuplicateEmailError("E-mail já cadastrado.")
 
-        wb.save(self.file_path)
+    @timed("excel.find_by_email")
+    def find_by_email(self, email: str) -> UserRecord | None:
+        rows = sorted(self._user_index().find_email(email), reverse=True)
+        return self._users_at(rows[:1])[0] if rows else None
 
-    def delete_user(self, excel_row: int):
-        self._ensure_workbook()
-        wb = load_workbook(self.file_path)
-        ws = wb[self.sheet_name]
+    @timed("excel.find_by_cep")
+    def find_by_cep(self, cep: str) -> list[UserRecord]:
+        return self._users_at(sorted(self._user_index().find_cep(cep), reverse=True))
 
-        if excel_row < 2 or excel_row > ws.max_row:
-            raise ValueError("Linha inválida para exclusão.")
+    @timed("excel.search")
+    def search(self, prefix: str, limit: int | None = 50) -> list[UserRecord]:
+        """Cadastros cujo nome começa com `prefix` (sem acento/maiúsculas), em ordem alfabética."""
+        return self._users_at(self._user_index().prefix(prefix, limit))
 
-        ws.delete_rows(excel_row, 1)
-        wb.save(self.file_path)
+    @timed("excel.filter")
+    def filter(self, uf: str | None = None, cidade: str | None = None, limit: int | None = None) -> list[UserRecord]:
+        """Cadastros de uma UF e/ou cidade, mais recentes primeiro."""
+        rows = sorted(self._user_index().filter(uf=uf, cidade=cidade), reverse=True)
+        return self._users_at(rows[:limit])
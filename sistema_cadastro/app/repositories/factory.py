@@ -0,0 +1,25 @@
+import os
+
+from app.repositories.excel_repo import ExcelRepo
+from app.repositories.sqlite_repo import migrate_excel_to_sqlite
+
+# CADASTRO_BACKEND=excel (padrão) ou sqlite
+BACKEND_ENV = "CADASTRO_BACKEND"
+
+
+def create_repo(backend: str | None = None, xlsx_path: str = "cadastros.xlsx", db_path: str = "cadastros.db",
+                sheet_name: str = "usuarios", cached: bool = True):
+    """
+    Escolhe o armazenamento sem a UI precisar saber qual é.
+    No sqlite, a planilha existente é importada na primeira execução.
+    cached=False (só excel): lê a planilha do disco a cada operação, em
+    streaming quando não há nada pendente no journal (ex.: exportação).
+    """
+    backend = (backend or os.environ.get(BACKEND_ENV) or "excel").strip().lower()
+
+    if backend == "excel":
+        return ExcelRepo(file_path=xlsx_path, sheet_name=sheet_name, cached=cached)
+    if backend == "sqlite":
+        return migrate_excel_to_sqlite(xlsx_path, db_path, sheet_name)
+
+    raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
@@ -0,0 +1,131 @@
+import os
+import pickle
+import tempfile
+from itertools import islice
+
+# muda quando o formato do arquivo muda; snapshot de outro formato é ignorado
+SNAPSHOT_FORMAT = 2
+
+# além de str/int/float/bool/None, é o que uma célula pode trazer do openpyxl
+_CELL_TYPES = {
+    ("datetime", "datetime"),
+    ("datetime", "date"),
+    ("datetime", "time"),
+    ("datetime", "timedelta"),
+}
+
+
+class _Unpickler(pickle.Unpickler):
+    # só valores de célula: um snapshot adulterado não consegue executar código
+    def find_class(self, module, name):
+        if (module, name) in _CELL_TYPES:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Tipo inesperado no snapshot: {module}.{name}")
+
+
+class _Cell:
+    __slots__ = ("_values", "_col")
+
+    def __init__(self, values: list, col: int):
+        self._values = values
+        self._col = col
+
+    @property
+    def value(self):
+        return self._values[self._col] if self._col < len(self._values) else None
+
+    @value.setter
+    def value(self, value):
+        if self._col >= len(self._values):
+            self._values.extend([None] * (self._col + 1 - len(self._values)))
+        self._values[self._col] = value
+
+
+class RowSheet:
+    """
+    Aba montada a partir do snapshot: uma lista de valores por linha (a
+    linha 1 é o cabeçalho, como no .xlsx), com a parte da interface do
+    openpyxl que o ExcelRepo usa para ler e aplicar alterações.
+    """
+
+    def __init__(self, rows: list[list]):
+        self._rows = rows
+
+    @property
+    def _current_row(self) -> int:
+        # mesmo nome do openpyxl (ver excel_repo._last_row)
+        return len(self._rows)
+
+    max_row = _current_row
+
+    def iter_rows(self, min_row: int = 1, max_row: int | None = None, max_col: int | None = None,
+                  values_only: bool = True):
+        stop = len(self._rows) if max_row is None else min(max_row, len(self._rows))
+        for values in islice(self._rows, min_row - 1, stop):
+            if max_col is None:
+                yield tuple(values)
+            elif len(values) >= max_col:
+                yield tuple(values[:max_col])
+            else:
+                yield tuple(values) + (None,) * (max_col - len(values))
+
+    def cell(self, row: int, column: int) -> _Cell:
+        return _Cell(self._rows[row - 1], column - 1)
+
+    def __getitem__(self, row: int) -> tuple[_Cell, ...]:
+        values = self._rows[row - 1]
+        return tuple(_Cell(values, col) for col in range(len(values)))
+
+    def append(self, values):
+        self._rows.append(list(values))
+
+    def delete_rows(self, idx: int, amount: int = 1):
+        del self._rows[idx - 1 : idx - 1 + amount]
+
+
+def read_snapshot(path: str, stamp, sheet_name: str) -> tuple[int, int, RowSheet] | None:
+    """
+    (seq do journal, próximo id, aba) do snapshot, se ele foi gerado a partir deste mesmo
+    .xlsx (mesmo carimbo inode/mtime/tamanho) e desta aba; senão None.
+    """
+    if stamp is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = _Unpickler(f).load()
+    except FileNotFoundError:
+        return None
+    except Exception:
+        return None  # corrompido ou de outra versão: relê o .xlsx
+
+    if not isinstance(data, dict) or data.get("formato") != SNAPSHOT_FORMAT:
+        return None
+    if data.get("xlsx") != tuple(stamp) or data.get("aba") != sheet_name:
+        return None
+    return data["seq"], data["proximo_id"], RowSheet(data["linhas"])
+
+
+def write_snapshot(path: str, stamp, sheet_name: str, seq: int, next_id: int, rows):
+    """
+    Grava as linhas da aba (cabeçalho incluído) num arquivo binário ao lado
+    do .xlsx. Temporário + troca no fim: quem lê nunca vê o arquivo pela metade.
+    """
+    data = {
+        "formato": SNAPSHOT_FORMAT,
+        "xlsx": tuple(stamp),
+        "aba": sheet_name,
+        "seq": seq,
+        "proximo_id": next_id,
+        "linhas": [list(values) for values in rows],
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
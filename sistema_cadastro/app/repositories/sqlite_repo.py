@@ -0,0 +1,351 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from app.repositories.errors import ConflictError, DuplicateEmailError
+from app.repositories.excel_repo import HEADERS, SHEET_HEADERS, ExcelRepo, UserRecord
+from app.repositories.user_index import normalize_email
+from app.utils.strings import normalize_text, only_digits
+
+# colunas auxiliares (só para busca), calculadas a partir das de HEADERS
+NORM_COLUMNS = {
+    "nome_norm": ("nome", normalize_text),
+    "email_norm": ("email", normalize_email),
+    "cidade_norm": ("cidade", normalize_text),
+}
+
+
+class SqliteRepo:
+    """
+    Mesmo contrato do ExcelRepo (append_user/list_users/update_user/delete_user),
+    mas com atualizações pontuais indexadas em vez de regravar o arquivo todo.
+
+    A `key` dos registros (UserRecord) aqui é o id da linha na tabela; a UI só
+    a usa como identificador para editar/excluir. `version` é a versão lida,
+    para update_user/delete_user recusarem gravar por cima de outra sessão.
+
+    Várias sessões/processos podem abrir o mesmo banco: no modo WAL leitores
+    não esperam quem grava, e as gravações são serializadas pelo SQLite.
+
+    Exclusão é lógica (coluna deleted_at), como no ExcelRepo: restore_user
+    desfaz por undo_window segundos; depois compact()/vacuum() apagam de vez.
+    """
+
+    def __init__(self, db_path: str = "cadastros.db", table: str = "usuarios", lock_timeout: float = 30.0,
+                 undo_window: float | None = 600.0):
+        self.db_path = db_path
+        self.table = table
+        self.undo_window = undo_window
+
+        # handlers do Flet rodam em threads diferentes; timeout = espera pela
+        # trava de escrita de outra conexão
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=lock_timeout)
+        self._lock = threading.RLock()
+
+        self._conn.create_function("normalize_text", 1, normalize_text, deterministic=True)
+        self._conn.create_function("normalize_email", 1, normalize_email, deterministic=True)
+
+        cols = ", ".join(f"{h} TEXT NOT NULL DEFAULT ''" for h in [*HEADERS, *NORM_COLUMNS])
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, version INTEGER NOT NULL DEFAULT 1, {cols}, deleted_at TEXT)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_email ON {table} (email_norm)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_cep ON {table} (cep)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_nome ON {table} (nome_norm)")
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_excluido ON {table} (deleted_at) WHERE deleted_at IS NOT NULL"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_local ON {table} (uf, cidade_norm)")
+
+    def _row_values(self, row: list) -> list:
+        """Valores de HEADERS (como texto) seguidos das colunas de busca."""
+        values = ["" if v is None else str(v) for v in row[: len(HEADERS)]]
+        values += [""] * (len(HEADERS) - len(values))
+        by_name = dict(zip(HEADERS, values))
+        return values + [fn(by_name[src]) for src, fn in NORM_COLUMNS.values()]
+
+    @staticmethod
+    def _to_user(r) -> UserRecord:
+        # r = (id, version, *HEADERS)
+        return UserRecord(r[2:], r[0], r[1])
+
+    def _select(self, where: str, params: tuple, order: str = "id DESC", limit: int | None = None) -> list[UserRecord]:
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT id, version, {', '.join(HEADERS)} FROM {self.table} "
+                f"WHERE deleted_at IS NULL AND ({where}) ORDER BY {order} LIMIT ?",
+                (*params, -1 if limit is None else limit),
+            )
+            rows = cur.fetchall()
+        return [self._to_user(r) for r in rows]
+
+    @contextmanager
+    def _writing(self):
+        """
+        Transação de escrita que já começa com a trava do banco (BEGIN IMMEDIATE):
+        a checagem de e-mail/versão e a gravação veem o mesmo estado.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def _current(self, key: int) -> tuple[int, str]:
+        """(versão, e-mail) gravados hoje para o cadastro `key`."""
+        row = self._conn.execute(
+            f"SELECT version, email FROM {self.table} WHERE id = ? AND deleted_at IS NULL", (key,)
+        ).fetchone()
+        if row is None:
+            raise ConflictError("Cadastro não encontrado: pode ter sido excluído em outra sessão.")
+        return row
+
+    def data_version(self) -> int:
+        """Muda quando outra conexão grava no banco (as gravações desta não contam)."""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def append_user(self, row: list) -> int:
+        """Inclui o cadastro e retorna o id dele."""
+        cols = [*HEADERS, *NORM_COLUMNS]
+        placeholders = ", ".join("?" for _ in cols)
+        with self._writing():
+            self._check_unique_email(row)
+            cur = self._conn.execute(
+                f"INSERT INTO {self.table} ({', '.join(cols)}) VALUES ({placeholders})",
+                self._row_values(row),
+            )
+        return cur.lastrowid
+
+    def get_user(self, key: int) -> UserRecord | None:
+        found = self._select("id = ?", (key,), limit=1)
+        return found[0] if found else None
+
+    def append_users(self, rows: list[list]):
+        cols = [*HEADERS, *NORM_COLUMNS]
+        placeholders = ", ".join("?" for _ in cols)
+        with self._writing():
+            self._conn.executemany(
+                f"INSERT INTO {self.table} ({', '.join(cols)}) VALUES ({placeholders})",
+                (self._row_values(r) for r in rows),
+            )
+
+    def _copy_rows(self, rows, next_id: int = 1):
+        """
+        Grava linhas vindas da planilha do ExcelRepo (valores de SHEET_HEADERS)
+        mantendo id, versão e exclusão lógica, e reserva os ids abaixo de
+        next_id (os que a origem já usou não voltam).
+        """
+        cols = ["id", "version", "deleted_at", *HEADERS, *NORM_COLUMNS]
+        placeholders = ", ".join("?" for _ in cols)
+        key, version, deleted = (SHEET_HEADERS.index(h) for h in ("id", "versao", "excluido_em"))
+        with self._writing():
+            self._conn.executemany(
+                f"INSERT INTO {self.table} ({', '.join(cols)}) VALUES ({placeholders})",
+                (
+                    [r[key], r[version] or 1, str(r[deleted]) if r[deleted] else None, *self._row_values(r)]
+                    for r in rows
+                ),
+            )
+            seq = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (self.table,)).fetchone()
+            if seq is None:
+                self._conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (self.table, next_id - 1))
+            elif seq[0] < next_id - 1:
+                self._conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (next_id - 1, self.table))
+
+    def iter_users(self, offset: int = 0, limit: int | None = None, newest_first: bool = True):
+        """Gera os cadastros da página pedida (mesmo formato de list_users)."""
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT id, version, {', '.join(HEADERS)} FROM {self.table} "
+                f"WHERE deleted_at IS NULL ORDER BY id {order} LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            )
+            rows = cur.fetchall()
+
+        for r in rows:
+            yield self._to_user(r)
+
+    def count_users(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE deleted_at IS NULL").fetchone()[0]
+
+    def list_users(self) -> list[UserRecord]:
+        """
+        Todos os cadastros (UserRecord), mais recentes primeiro. Além dos
+        campos, cada um traz:
+        - key (ou ["_excel_row"]): id do registro no banco (para editar/excluir)
+        - version: versão lida (para detectar edição concorrente)
+        """
+        return list(self.iter_users())
+
+    def update_user(self, key: int, row: list, expected_version: int | None = None) -> int:
+        """
+        Grava o cadastro `key` (id) e retorna a nova versão.
+        Com expected_version, recusa (ConflictError) se outra sessão gravou antes.
+        """
+        assignments = ", ".join(f"{h} = ?" for h in [*HEADERS, *NORM_COLUMNS])
+        with self._writing():
+            version, current = self._current(key)
+            if expected_version is not None and version != expected_version:
+                raise ConflictError("Cadastro alterado em outra sessão. Recarregue e tente de novo.")
+
+            self._check_unique_email(row, key, current)
+            self._conn.execute(
+                f"UPDATE {self.table} SET {assignments}, version = version + 1 WHERE id = ?",
+                [*self._row_values(row), key],
+            )
+        return version + 1
+
+    def update_users(self, updates: list[tuple[int, list]], versions: dict[int, int] | None = None) -> int:
+        """
+        Atualiza vários cadastros numa única transação (sem validar e-mail único).
+        Cadastros que não existem mais ou cuja versão difere da informada em
+        `versions` são pulados. Retorna quantos foram gravados.
+        """
+        assignments = ", ".join(f"{h} = ?" for h in [*HEADERS, *NORM_COLUMNS])
+        versions = versions or {}
+        with self._writing():
+            cur = self._conn.executemany(
+                f"UPDATE {self.table} SET {assignments}, version = version + 1 "
+                "WHERE id = ? AND deleted_at IS NULL AND version = COALESCE(?, version)",
+                ([*self._row_values(row), key, versions.get(key)] for key, row in updates),
+            )
+        return cur.rowcount
+
+    def delete_user(self, key: int, expected_version: int | None = None):
+        with self._writing():
+            version, _ = self._current(key)
+            if expected_version is not None and version != expected_version:
+                raise ConflictError("Cadastro alterado em outra sessão. Recarregue e tente de novo.")
+
+            self._conn.execute(
+                f"UPDATE {self.table} SET deleted_at = ?, version = version + 1 WHERE id = ?",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), key),
+            )
+
+    def restore_user(self, key: int) -> int:
+        """
+        Desfaz a exclusão do cadastro `key` (id) e retorna a nova versão.
+        DuplicateEmailError se, enquanto estava excluído, outro cadastro passou a usar o e-mail.
+        """
+        with self._writing():
+            row = self._conn.execute(
+                f"SELECT version, email FROM {self.table} WHERE id = ? AND deleted_at IS NOT NULL", (key,)
+            ).fetchone()
+            if row is None:
+                raise ConflictError("Não há exclusão para desfazer: o cadastro já foi removido de vez ou restaurado.")
+
+            version, email = row
+            if email and self.email_exists(email, exclude_row=key):
+                raise DuplicateEmailError("E-mail já cadastrado.")
+            self._conn.execute(
+                f"UPDATE {self.table} SET deleted_at = NULL, version = version + 1 WHERE id = ?", (key,)
+            )
+        return version + 1
+
+    def vacuum(self, older_than: float | None = None) -> int:
+        """
+        Apaga de vez os cadastros excluídos (todos, ou só os excluídos há mais
+        de older_than segundos). Retorna quantos saíram.
+        """
+        where, params = "deleted_at IS NOT NULL", ()
+        if older_than is not None:
+            where += " AND deleted_at <= ?"
+            params = ((datetime.now() - timedelta(seconds=older_than)).strftime("%Y-%m-%d %H:%M:%S"),)
+        with self._writing():
+            cur = self._conn.execute(f"DELETE FROM {self.table} WHERE {where}", params)
+        return cur.rowcount
+
+    def compact(self, vacuum: bool = True):
+        """
+        Cada alteração já vai direto para o banco; com vacuum, aqui só vencem
+        as exclusões mais velhas que undo_window.
+        """
+        if vacuum and self.undo_window is not None:
+            self.vacuum(self.undo_window)
+
+    # ===== Busca (usa os índices do banco) =====
+
+    def email_exists(self, email: str, exclude_row: int | None = None) -> bool:
+        found = self._select("email_norm = ? AND id IS NOT ?", (normalize_email(email), exclude_row), limit=1)
+        return bool(found)
+
+    def _check_unique_email(self, row: list, exclude_row: int | None = None, current: str | None = None):
+        """Como no ExcelRepo: com `current` (e-mail gravado hoje), só confere se o e-mail mudou."""
+        email = row[HEADERS.index("email")] if len(row) > HEADERS.index("email") else ""
+        if current is not None and normalize_email(email) == normalize_email(current):
+            return
+        if email and self.email_exists(email, exclude_row):
+            raise DuplicateEmailError("E-mail já cadastrado.")
+
+    def find_by_email(self, email: str) -> UserRecord | None:
+        found = self._select("email_norm = ?", (normalize_email(email),), limit=1)
+        return found[0] if found else None
+
+    def find_by_cep(self, cep: str) -> list[UserRecord]:
+        return self._select("cep = ?", (only_digits(str(cep or "")),))
+
+    def search(self, prefix: str, limit: int | None = 50) -> list[UserRecord]:
+        """Cadastros cujo nome começa com `prefix` (sem acento/maiúsculas), em ordem alfabética."""
+        prefix = normalize_text(prefix)
+        return self._select(
+            "nome_norm >= ? AND nome_norm < ?", (prefix, prefix + "\U0010ffff"), order="nome_norm, id", limit=limit
+        )
+
+    def filter(self, uf: str | None = None, cidade: str | None = None, limit: int | None = None) -> list[UserRecord]:
+        """Cadastros de uma UF e/ou cidade, mais recentes primeiro."""
+        where, params = ["1 = 1"], []
+        if uf:
+            where.append("uf = ?")
+            params.append(uf.strip().upper())
+        if cidade:
+            where.append("cidade_norm = ?")
+            params.append(normalize_text(cidade))
+        return self._select(" AND ".join(where), tuple(params), limit=limit)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _remove_db(db_path: str):
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def migrate_excel_to_sqlite(xlsx_path: str, db_path: str, sheet_name: str = "usuarios") -> SqliteRepo:
+    """
+    Migração única: se o banco ainda não existe e há uma planilha, importa
+    todos os cadastros dela numa única transação, com os mesmos ids e
+    versões, inclusive os excluídos que ainda podem ser restaurados. A
+    planilha é lida pelo ExcelRepo, então o que ainda está só no journal
+    também vem.
+
+    O banco é montado num arquivo temporário e só vira db_path no fim: uma
+    migração que falhou não deixa um banco pela metade (que impediria a
+    próxima tentativa).
+    """
+    if not os.path.exists(db_path) and os.path.exists(xlsx_path):
+        tmp_path = f"{db_path}.tmp"
+        _remove_db(tmp_path)  # sobra de uma migração interrompida
+        try:
+            source = ExcelRepo(file_path=xlsx_path, sheet_name=sheet_name)
+            target = SqliteRepo(tmp_path, table=sheet_name)
+            try:
+                rows = source._iter_memory_rows(newest_first=False, deleted=True)
+                target._copy_rows(rows, next_id=source._next_id)
+            finally:
+                target.close()  # fecha o WAL: o banco inteiro fica no arquivo principal
+            os.replace(tmp_path, db_path)
+        except BaseException:
+            _remove_db(tmp_path)
+            raise
+    return SqliteRepo(db_path, table=sheet_name)
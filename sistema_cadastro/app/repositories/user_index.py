@@ -0,0 +1,122 @@
+from bisect import bisect_left, insort
+
+from app.utils.strings import normalize_text, only_digits
+
+
+def normalize_email(email) -> str:
+    return str(email or "").strip().lower()
+
+
+class UserIndex:
+    """
+    Índices em memória sobre os cadastros (e-mail, CEP, nome e cidade/UF).
+
+    Cada registro é identificado por uma chave (o id do cadastro, no ExcelRepo)
+    e os valores vêm na ordem das colunas passadas no construtor.
+    """
+
+    def __init__(self, columns: list[str]):
+        self._pos = {c: i for i, c in enumerate(columns)}
+
+        self._email: dict[str, set] = {}
+        self._cep: dict[str, set] = {}
+        self._uf: dict[str, set] = {}
+        self._local: dict[tuple[str, str], set] = {}  # (uf, cidade normalizada)
+        self._names: list[tuple[str, int]] = []  # (nome normalizado, chave), ordenada
+        self._entries: dict[int, tuple] = {}  # chave -> campos normalizados, para remover depois
+
+    @classmethod
+    def build(cls, columns: list[str], rows) -> "UserIndex":
+        """Monta o índice de uma vez a partir de pares (chave, valores)."""
+        index = cls(columns)
+        for key, values in rows:
+            index._names.append((index._add(key, values)[4], key))
+        index._names.sort()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _fields(self, values) -> tuple:
+        def get(col):
+            i = self._pos[col]
+            return values[i] if i < len(values) else None
+
+        uf = str(get("uf") or "").strip().upper()
+        return (
+            normalize_email(get("email")),
+            only_digits(str(get("cep") or "")),
+            uf,
+            normalize_text(get("cidade")),
+            normalize_text(get("nome")),
+        )
+
+    def _add(self, key, values) -> tuple:
+        fields = self._fields(values)
+        email, cep, uf, cidade, nome = fields
+        self._entries[key] = fields
+        if email:
+            self._email.setdefault(email, set()).add(key)
+        if cep:
+            self._cep.setdefault(cep, set()).add(key)
+        if uf:
+            self._uf.setdefault(uf, set()).add(key)
+        if cidade:
+            self._local.setdefault((uf, cidade), set()).add(key)
+        return fields
+
+    def add(self, key, values):
+        _, _, _, _, nome = self._add(key, values)
+        insort(self._names, (nome, key))
+
+    def remove(self, key):
+        fields = self._entries.pop(key, None)
+        if fields is None:
+            return
+        email, cep, uf, cidade, nome = fields
+        for bucket, k in ((self._email, email), (self._cep, cep), (self._uf, uf), (self._local, (uf, cidade))):
+            keys = bucket.get(k)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del bucket[k]
+
+        i = bisect_left(self._names, (nome, key))
+        if i < len(self._names) and self._names[i] == (nome, key):
+            del self._names[i]
+
+    # ===== Consultas (retornam chaves) =====
+
+    def find_email(self, email) -> set:
+        return set(self._email.get(normalize_email(email), ()))
+
+    def find_cep(self, cep) -> set:
+        return set(self._cep.get(only_digits(str(cep or "")), ()))
+
+    def prefix(self, prefix: str, limit: int | None = None) -> list:
+        """Chaves cujo nome normalizado começa com `prefix`, em ordem alfabética."""
+        prefix = normalize_text(prefix)
+        keys = []
+        i = bisect_left(self._names, (prefix,))
+        while i < len(self._names) and self._names[i][0].startswith(prefix):
+            keys.append(self._names[i][1])
+            if limit is not None and len(keys) >= limit:
+                break
+            i += 1
+        return keys
+
+    def filter(self, uf: str | None = None, cidade: str | None = None) -> set:
+        uf = (uf or "").strip().upper()
+        cidade = normalize_text(cidade)
+
+        if cidade and uf:
+            return set(self._local.get((uf, cidade), ()))
+        if cidade:
+            keys = set()
+            for (_, c), found in self._local.items():
+                if c == cidade:
+                    keys |= found
+            return keys
+        if uf:
+            return set(self._uf.get(uf, ()))
+        return set(self._entries)
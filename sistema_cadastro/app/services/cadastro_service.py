@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from app.repositories.excel_repo import HEADERS
+from app.utils.strings import only_digits
+
+
+# formato de data_hora gravado no repositório
+DATA_HORA_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def now_str() -> str:
+    return datetime.now().strftime(DATA_HORA_FORMAT)
+
+
+def parse_data_hora(value) -> str | None:
+    """data_hora vinda de fora (importação) no formato do repositório, ou None se não for válida."""
+    value = str(value or "").strip()
+    try:
+        return datetime.strptime(value, DATA_HORA_FORMAT).strftime(DATA_HORA_FORMAT)
+    except ValueError:
+        return None
+
+
+def validate_user(data: dict) -> str | None:
+    """Mesmas regras do formulário. Retorna a mensagem de erro ou None se estiver ok."""
+    if not str(data.get("nome") or "").strip():
+        return "Nome é obrigatório."
+    if not str(data.get("email") or "").strip():
+        return "E-mail é obrigatório."
+    if len(only_digits(str(data.get("cep") or ""))) != 8:
+        return "CEP inválido. Informe 8 dígitos."
+    if not str(data.get("numero") or "").strip():
+        return "Número é obrigatório."
+    return None
+
+
+def build_row(data: dict, data_hora: str | None = None) -> list:
+    """
+    Monta a linha na ordem de HEADERS, normalizada como no formulário:
+    texto sem espaços nas pontas, CEP só com dígitos, UF maiúscula e
+    data/hora de agora (a menos que outra seja informada).
+    """
+    row = []
+    for h in HEADERS:
+        value = str(data.get(h) or "").strip()
+        if h == "cep":
+            value = only_digits(value)
+        elif h == "uf":
+            value = value.upper()
+        row.append(value)
+
+    row[HEADERS.index("data_hora")] = data_hora or now_str()
+    return row
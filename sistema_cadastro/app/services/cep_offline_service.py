@@ -0,0 +1,182 @@
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from app.utils.strings import only_digits
+
+# Formato do arquivo .bin (inteiros de 32 bits sem sinal, little-endian):
+#   cabeçalho: MAGIC, quantidade N
+#   índice de prefixo: 1001 posições (início de cada prefixo de 3 dígitos, 000..999, + fim)
+#   N CEPs ordenados
+#   N + 1 deslocamentos no bloco de texto
+#   bloco de texto: "logradouro\x1fbairro\x1fcidade\x1fuf" de cada CEP, em UTF-8
+MAGIC = b"CEPB"
+_HEADER = struct.Struct("<4sI")
+_PREFIX_DIGITS = 3
+_PREFIXES = 10**_PREFIX_DIGITS
+_SEP = "\x1f"
+_FIELDS = ["logradouro", "bairro", "cidade", "uf"]
+
+
+def _u32(values) -> bytes:
+    arr = array("I", values)
+    if arr.itemsize != 4:
+        arr = array("L", values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def build_offline_db(csv_path: str, out_path: str) -> int:
+    """
+    Converte um CSV de CEPs (colunas cep, logradouro, bairro, cidade ou
+    localidade, uf) no arquivo binário compacto. Retorna quantos CEPs entraram.
+    """
+    records: dict[int, str] = {}
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.DictReader(f, dialect=dialect):
+            row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+            cep = only_digits(row.get("cep", ""))
+            if len(cep) != 8:
+                continue
+            row.setdefault("cidade", row.get("localidade", ""))
+            records[int(cep)] = _SEP.join(row.get(k, "").replace(_SEP, " ") for k in _FIELDS)
+
+    codes = sorted(records)
+    blobs = [records[c].encode("utf-8") for c in codes]
+
+    offsets, pos = [], 0
+    for b in blobs:
+        offsets.append(pos)
+        pos += len(b)
+    offsets.append(pos)
+
+    starts = [bisect_left(codes, p * 10 ** (8 - _PREFIX_DIGITS)) for p in range(_PREFIXES)] + [len(codes)]
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(codes)))
+        f.write(_u32(starts))
+        f.write(_u32(codes))
+        f.write(_u32(offsets))
+        for b in blobs:
+            f.write(b)
+    os.replace(tmp_path, out_path)
+    return len(codes)
+
+
+class OfflineCepDb:
+    """
+    Base local de CEPs, lida por memória mapeada: abrir é instantâneo e só as
+    páginas consultadas são carregadas. Busca binária dentro do bloco do
+    prefixo de 3 dígitos.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mm = None
+        self._views = []  # memoryviews sobre o mmap, liberadas no close()
+        self._file = open(path, "rb")
+        try:
+            self._open()
+        except BaseException:
+            self.close()  # arquivo inválido: não deixa o handle (nem o mmap) aberto
+            raise
+
+    def _open(self):
+        if os.fstat(self._file.fileno()).st_size < _HEADER.size:
+            raise ValueError(f"Arquivo de CEPs inválido: {self.path}")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, n = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Arquivo de CEPs inválido: {self.path}")
+        self._n = n
+
+        pos = _HEADER.size
+        self._starts, pos = self._u32_view(pos, _PREFIXES + 1)
+        self._codes, pos = self._u32_view(pos, n)
+        self._offsets, pos = self._u32_view(pos, n + 1)
+        if pos > len(self._mm):
+            raise ValueError(f"Arquivo de CEPs truncado: {self.path}")
+        self._text_start = pos
+
+    def _u32_view(self, pos: int, count: int):
+        raw = memoryview(self._mm)[pos : pos + 4 * count]
+        self._views.append(raw)
+        if sys.byteorder == "little":
+            view = raw.cast("I")
+            self._views.append(view)
+        else:
+            # máquina big-endian: copia e converte (raro)
+            view = array("I", raw.tobytes())
+            view.byteswap()
+        return view, pos + 4 * count
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _address(self, i: int) -> dict:
+        start = self._text_start + self._offsets[i]
+        end = self._text_start + self._offsets[i + 1]
+        values = self._mm[start:end].decode("utf-8").split(_SEP)
+        return dict(zip(_FIELDS, values))
+
+    def _range(self, lo_code: int, hi_code: int) -> tuple[int, int]:
+        """Posições [i, j) dos CEPs entre lo_code e hi_code (exclusive)."""
+        p = lo_code // 10 ** (8 - _PREFIX_DIGITS)
+        q = min(_PREFIXES, (hi_code - 1) // 10 ** (8 - _PREFIX_DIGITS) + 1)
+        lo, hi = self._starts[p], self._starts[q]
+        i = bisect_left(self._codes, lo_code, lo, hi)
+        j = bisect_left(self._codes, hi_code, i, hi)
+        return i, j
+
+    def lookup(self, cep: str) -> dict | None:
+        cep = only_digits(cep)
+        if len(cep) != 8:
+            return None
+        code = int(cep)
+        i, j = self._range(code, code + 1)
+        return self._address(i) if i < j else None
+
+    def prefix(self, prefix: str, limit: int | None = 20) -> list[tuple[str, dict]]:
+        """CEPs que começam com `prefix` (ex.: "69079"), em ordem."""
+        prefix = only_digits(prefix)[:8]
+        scale = 10 ** (8 - len(prefix))
+        lo_code = int(prefix or "0") * scale
+        i, j = self._range(lo_code, lo_code + scale)
+        if limit is not None:
+            j = min(j, i + limit)
+        return [(f"{self._codes[k]:08d}", self._address(k)) for k in range(i, j)]
+
+    def close(self):
+        self._starts = self._codes = self._offsets = None
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+def open_offline_db(path: str) -> OfflineCepDb:
+    """
+    Abre a base de CEPs. Se `path` for um CSV, gera (ou atualiza, se o CSV
+    for mais novo) o .bin ao lado dele e abre o binário.
+    """
+    if path.lower().endswith(".csv"):
+        bin_path = os.path.splitext(path)[0] + ".bin"
+        if not os.path.exists(bin_path) or os.path.getmtime(bin_path) < os.path.getmtime(path):
+            build_offline_db(path, bin_path)
+        path = bin_path
+    return OfflineCepDb(path)
@@ -0,0 +1,267 @@
+import re
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from operator import add
+
+from app.repositories.excel_repo import UserRecord
+from app.utils.strings import normalize_text, only_digits
+from app.utils.timing import timed
+
+# a partir desta nota o par é tratado como possível duplicado
+THRESHOLD = 0.8
+# bloco maior que isso (ex.: todo mundo do mesmo provedor de e-mail) não é
+# comparado todos com todos: cada nome só com os WINDOW vizinhos em ordem alfabética
+MAX_BLOCK = 200
+WINDOW = 20
+
+# partículas que não ajudam a distinguir nomes ("Maria da Silva" = "Maria Silva")
+_PARTICLES = {"da", "de", "do", "das", "dos", "e"}
+_NOT_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _name_key(name) -> str:
+    words = _NOT_ALNUM.sub(" ", normalize_text(name)).split()
+    return " ".join(w for w in words if w not in _PARTICLES)
+
+
+def _bigrams(name: str) -> frozenset:
+    padded = f" {name} "
+    return frozenset(map(add, padded, padded[1:]))
+
+
+def _phone_key(phone) -> str:
+    # últimos 8 dígitos: com ou sem DDD/nono dígito continua o mesmo telefone
+    digits = only_digits(str(phone or ""))
+    return digits[-8:] if len(digits) >= 8 else ""
+
+
+def _block_keys(email, cep, phone: str) -> tuple:
+    """Blocos do cadastro: só quem divide algum bloco com ele é comparado."""
+    keys = []
+    cep = only_digits(str(cep or ""))
+    if len(cep) == 8:
+        keys.append(("cep", cep))
+    domain = str(email or "").strip().lower().rpartition("@")[2]
+    if domain:
+        keys.append(("dominio", domain))
+    if phone:
+        keys.append(("telefone", phone))
+    return tuple(keys)
+
+
+def similarity(grams_a: frozenset, grams_b: frozenset, phone_a: str, phone_b: str) -> float:
+    """
+    Nota de 0 a 1: semelhança dos nomes (pares de letras em comum, que
+    tolera erro de digitação e ordem trocada), ajustada pelo telefone:
+    o mesmo telefone reforça, telefones diferentes pesam contra.
+    """
+    if not grams_a or not grams_b:
+        return 0.0
+    name = 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+    if not phone_a or not phone_b:
+        return name
+    if phone_a == phone_b:
+        return 0.7 * name + 0.3
+    return 0.9 * name
+
+
+@dataclass
+class DuplicateMatch:
+    user: UserRecord
+    score: float
+
+
+@dataclass
+class DuplicateReport:
+    records: int = 0
+    comparisons: int = 0
+    groups: list[list[UserRecord]] = field(default_factory=list)  # mais antigo primeiro
+
+    def summary(self) -> str:
+        if not self.groups:
+            return f"Nenhum possível duplicado entre {self.records} cadastro(s)."
+        total = sum(len(g) for g in self.groups)
+        return f"{len(self.groups)} grupo(s) de possíveis duplicados ({total} cadastros de {self.records})."
+
+
+class DuplicateIndex:
+    """
+    Cadastros agrupados em blocos (mesmo CEP, mesmo domínio de e-mail, mesmo
+    telefone), para achar duplicados sem comparar todos com todos.
+
+    Cada cadastro guarda o nome já normalizado e os pares de letras dele,
+    então comparar dois cadastros é só uma interseção de conjuntos. Como o
+    UserSearch, pode ser carregado uma vez e mantido com add/replace/remove.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self.version = None  # data_version do repositório na última carga
+        self._users: dict[int, UserRecord] = {}
+        self._names: dict[int, str] = {}
+        self._grams: dict[int, frozenset] = {}
+        self._phones: dict[int, str] = {}
+        self._blocks: dict[int, tuple] = {}  # chave -> blocos do cadastro
+        self._members: dict[tuple, list[tuple[str, int]]] = {}  # bloco -> (nome, chave) em ordem
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @timed("duplicados.indexar")
+    def load(self, users, version=None):
+        for d in (self._users, self._names, self._grams, self._phones, self._blocks, self._members):
+            d.clear()
+        for user in users:
+            self._index(user)
+            for block in self._blocks[user.key]:
+                self._members.setdefault(block, []).append((self._names[user.key], user.key))
+        for members in self._members.values():
+            members.sort()  # uma ordenação por bloco, em vez de inserir um a um
+        self.version = version
+
+    def reset(self):
+        """Descarta o que foi carregado; a próxima consulta recarrega do repositório."""
+        self.load(())
+
+    def _index(self, user: UserRecord):
+        key = user.key
+        name = _name_key(user.get("nome"))
+        phone = _phone_key(user.get("telefone"))
+        self._users[key] = user
+        self._names[key] = name
+        self._grams[key] = _bigrams(name) if name else frozenset()
+        self._phones[key] = phone
+        # sem nome não há o que comparar: fica fora dos blocos
+        self._blocks[key] = _block_keys(user.get("email"), user.get("cep"), phone) if name else ()
+
+    # ===== Alterações (mantêm o índice igual ao repositório) =====
+
+    def add(self, user: UserRecord):
+        self._index(user)
+        for block in self._blocks[user.key]:
+            insort(self._members.setdefault(block, []), (self._names[user.key], user.key))
+
+    def replace(self, user: UserRecord):
+        if user.key in self._users:
+            self.remove(user.key)
+            self.add(user)
+
+    def remove(self, key: int):
+        if self._users.pop(key, None) is None:
+            return
+        name = self._names.pop(key)
+        for block in self._blocks.pop(key):
+            members = self._members[block]
+            i = bisect_left(members, (name, key))
+            del members[i]
+            if not members:
+                del self._members[block]
+        del self._grams[key]
+        del self._phones[key]
+
+    # ===== Consultas =====
+
+    def _neighbours(self, members: list[tuple[str, int]], name: str):
+        """Chaves do bloco com que um cadastro de nome `name` precisa ser comparado."""
+        if len(members) <= MAX_BLOCK:
+            return (k for _, k in members)
+        i = bisect_left(members, (name,))
+        return (k for _, k in members[max(0, i - WINDOW) : i + WINDOW])
+
+    @timed("duplicados.verificar")
+    def matches(self, data, exclude: int | None = None, limit: int = 5) -> list[DuplicateMatch]:
+        """
+        Cadastros parecidos com `data` (dict do formulário ou UserRecord),
+        da nota maior para a menor. `exclude`: chave do próprio cadastro.
+        """
+        name = _name_key(data.get("nome"))
+        if not name:
+            return []
+        grams = _bigrams(name)
+        phone = _phone_key(data.get("telefone"))
+
+        seen = {exclude}
+        found = []
+        for block in _block_keys(data.get("email"), data.get("cep"), phone):
+            members = self._members.get(block)
+            if not members:
+                continue
+            for key in self._neighbours(members, name):
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = similarity(grams, self._grams[key], phone, self._phones[key])
+                if score >= self.threshold:
+                    found.append(DuplicateMatch(self._users[key], score))
+
+        found.sort(key=lambda m: -m.score)
+        return found[:limit]
+
+    def pairs(self, counter: list | None = None):
+        """
+        Gera (chave, chave, nota) de cada par de possíveis duplicados, uma vez
+        por par. counter[0] (opcional) soma quantas comparações foram feitas.
+        """
+        grams, phones, threshold = self._grams, self._phones, self.threshold
+        found = set()
+        comparisons = 0
+        for members in self._members.values():
+            n = len(members)
+            if n < 2:
+                continue
+            span = n if n <= MAX_BLOCK else WINDOW + 1
+            keys = [k for _, k in members]
+            for i, a in enumerate(keys):
+                ga, pa = grams[a], phones[a]
+                la = len(ga)
+                others = keys[i + 1 : i + span]
+                comparisons += len(others)
+                for b in others:
+                    # a mesma conta de similarity(), sem uma chamada por par
+                    gb, pb = grams[b], phones[b]
+                    score = 2 * len(ga & gb) / (la + len(gb))
+                    if pa and pb:
+                        score = 0.7 * score + 0.3 if pa == pb else 0.9 * score
+                    if score < threshold:
+                        continue
+                    pair = (a, b) if a < b else (b, a)
+                    if pair not in found:  # o mesmo par pode dividir mais de um bloco
+                        found.add(pair)
+                        yield (*pair, score)
+        if counter is not None:
+            counter[0] += comparisons
+
+    def groups(self, counter: list | None = None) -> list[list[UserRecord]]:
+        """Possíveis duplicados agrupados (A~B e B~C ficam no mesmo grupo), mais antigo primeiro."""
+        parent: dict[int, int] = {}
+
+        def root(k):
+            parent.setdefault(k, k)
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        for a, b, _score in self.pairs(counter):
+            ra, rb = root(a), root(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+        grouped: dict[int, list[int]] = {}
+        for k in list(parent):
+            grouped.setdefault(root(k), []).append(k)
+        return [[self._users[k] for k in sorted(keys)] for _, keys in sorted(grouped.items())]
+
+
+@timed("duplicados.relatorio")
+def find_duplicates(repo, threshold: float = THRESHOLD) -> DuplicateReport:
+    """Relatório de possíveis duplicados de todo o repositório."""
+    index = DuplicateIndex(threshold)
+    index.load(repo.iter_users(newest_first=False))
+    counter = [0]
+    groups = index.groups(counter)
+    return DuplicateReport(records=len(index), comparisons=counter[0], groups=groups)
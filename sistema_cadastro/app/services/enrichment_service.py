@@ -0,0 +1,127 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from app.repositories.excel_repo import HEADERS, UserRecord
+from app.services.viacep_service import fetch_address_from_viacep
+from app.utils.strings import only_digits
+
+ADDRESS_FIELDS = ["logradouro", "bairro", "cidade", "uf"]
+
+
+@dataclass
+class EnrichReport:
+    records: int = 0  # cadastros com CEP válido e endereço incompleto
+    ceps: int = 0  # CEPs distintos consultados
+    resolved: int = 0
+    not_found: int = 0
+    failed: int = 0
+    updated: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.updated} cadastro(s) completado(s) a partir de {self.ceps} CEP(s) "
+            f"({self.not_found} não encontrado(s), {self.failed} falha(s))."
+        )
+
+
+class RateLimiter:
+    """Limita a quantidade de chamadas por segundo entre várias threads."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def find_incomplete(repo) -> dict[int, UserRecord]:
+    """Cadastros com CEP de 8 dígitos e algum campo de endereço vazio, por id."""
+    pending = {}
+    for user in repo.iter_users(newest_first=False):
+        cep = only_digits(str(user.get("cep") or ""))
+        if len(cep) == 8 and any(not str(user.get(f) or "").strip() for f in ADDRESS_FIELDS):
+            pending[user.key] = user
+    return pending
+
+
+def resolve_ceps(ceps, workers: int = 8, per_second: float = 10.0, progress=None,
+                 fetch=fetch_address_from_viacep) -> tuple[dict[str, dict], int, int]:
+    """
+    Consulta os CEPs em paralelo (no máximo `workers` ao mesmo tempo e
+    `per_second` chamadas por segundo). progress(feitos, total) é chamado a cada CEP.
+    Retorna (endereços por CEP, não encontrados, falhas).
+    """
+    ceps = list(ceps)
+    limiter = RateLimiter(per_second)
+    addresses, not_found, failed = {}, 0, 0
+
+    def task(cep):
+        limiter.wait()
+        return fetch(cep)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(task, cep): cep for cep in ceps}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            cep = futures[fut]
+            try:
+                addresses[cep] = fut.result()
+            except ValueError:
+                not_found += 1
+            except Exception:
+                failed += 1
+            if progress:
+                progress(done, len(ceps))
+
+    return addresses, not_found, failed
+
+
+def apply_addresses(repo, pending: dict[int, UserRecord], addresses: dict[str, dict]) -> int:
+    """
+    Preenche só os campos de endereço vazios e grava tudo numa única
+    atualização em lote. Registros que mudaram desde a busca são ignorados.
+    """
+    current = find_incomplete(repo)
+    updates = []
+    for key, user in pending.items():
+        now = current.get(key)
+        if now is None or now.get("email") != user.get("email") or now.get("cep") != user.get("cep"):
+            continue
+        addr = addresses.get(only_digits(str(now.get("cep") or "")))
+        if not addr:
+            continue
+
+        row = [now.get(h, "") for h in HEADERS]
+        for f in ADDRESS_FIELDS:
+            i = HEADERS.index(f)
+            if not str(row[i] or "").strip():
+                row[i] = addr.get(f, "")
+        updates.append((key, row))
+
+    if not updates:
+        return 0
+    # quem foi editado em outra sessão depois da busca fica como está
+    return repo.update_users(updates, versions={key: current[key].version for key, _ in updates})
+
+
+def enrich_addresses(repo, workers: int = 8, per_second: float = 10.0, progress=None,
+                     fetch=fetch_address_from_viacep) -> EnrichReport:
+    """Busca, consulta os CEPs distintos e grava os endereços de uma vez."""
+    pending = find_incomplete(repo)
+    ceps = {only_digits(str(u.get("cep") or "")) for u in pending.values()}
+    report = EnrichReport(records=len(pending), ceps=len(ceps))
+
+    addresses, report.not_found, report.failed = resolve_ceps(ceps, workers, per_second, progress, fetch)
+    report.resolved = len(addresses)
+    report.updated = apply_addresses(repo, pending, addresses)
+    return report
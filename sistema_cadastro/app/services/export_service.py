@@ -0,0 +1,67 @@
+import csv
+import os
+
+from app.repositories.excel_repo import HEADERS
+
+
+def _date_key(value) -> str:
+    # "2026-01-31 13:35:56" (ou datetime vindo do Excel) -> texto comparável
+    return str(value or "")[:19]
+
+
+def iter_export_rows(repo, columns: list[str] | None = None, uf: str | None = None,
+                     date_from: str | None = None, date_to: str | None = None):
+    """
+    Gera as linhas a exportar (listas na ordem de `columns`), mais antigas
+    primeiro, lendo o repositório registro a registro.
+    date_from/date_to aceitam "AAAA-MM-DD" ou "AAAA-MM-DD HH:MM:SS" (inclusive).
+    """
+    columns = columns or HEADERS
+    unknown = [c for c in columns if c not in HEADERS]
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(unknown)}")
+
+    uf = (uf or "").strip().upper()
+    for user in repo.iter_users(newest_first=False):
+        if uf and str(user.get("uf") or "").strip().upper() != uf:
+            continue
+        when = _date_key(user.get("data_hora"))
+        if date_from and when[: len(date_from)] < date_from:
+            continue
+        if date_to and when[: len(date_to)] > date_to:
+            continue
+        yield [user.get(c, "") for c in columns]
+
+
+def export_users(repo, path: str, columns: list[str] | None = None, uf: str | None = None,
+                 date_from: str | None = None, date_to: str | None = None) -> int:
+    """
+    Exporta para .csv ou .xlsx (conforme a extensão) com memória limitada:
+    as linhas vão direto do repositório para o arquivo. Retorna quantas foram escritas.
+    """
+    columns = columns or HEADERS
+    rows = iter_export_rows(repo, columns, uf=uf, date_from=date_from, date_to=date_to)
+    ext = os.path.splitext(path)[1].lower()
+    count = 0
+
+    if ext == ".csv":
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+    elif ext == ".xlsx":
+        from openpyxl import Workbook  # carregado só quando alguém exporta
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("usuarios")
+        ws.append(columns)
+        for row in rows:
+            ws.append(row)
+            count += 1
+        wb.save(path)
+    else:
+        raise ValueError("Formato não suportado. Use .csv ou .xlsx.")
+
+    return count
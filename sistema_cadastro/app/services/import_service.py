@@ -0,0 +1,104 @@
+import csv
+import os
+import re
+from dataclasses import dataclass, field
+
+from app.repositories.excel_repo import HEADERS
+from app.repositories.user_index import normalize_email
+from app.services.cadastro_service import build_row, parse_data_hora, validate_user
+from app.utils.strings import normalize_text
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)  # (linha no arquivo, motivo)
+
+    def summary(self) -> str:
+        msg = f"{self.imported} cadastro(s) importado(s)"
+        if self.errors:
+            msg += f", {len(self.errors)} linha(s) rejeitada(s)"
+        return msg + "."
+
+
+def _column_keys(header) -> list[str | None]:
+    """Casa o cabeçalho do arquivo com HEADERS ("E-mail", "Número", "Data/Hora" também valem)."""
+
+    def key(h):
+        return re.sub(r"[^a-z0-9]", "", normalize_text(h))
+
+    known = {key(h): h for h in HEADERS}
+    return [known.get(key(h)) for h in header]
+
+
+def _iter_csv(path: str):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def _iter_xlsx(path: str):
+    from openpyxl import load_workbook  # carregado só quando alguém importa
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        for values in wb.worksheets[0].iter_rows(values_only=True):
+            yield ["" if v is None else str(v) for v in values]
+    finally:
+        wb.close()
+
+
+def iter_records(path: str):
+    """Gera (número da linha, dict) de um CSV ou XLSX com cabeçalho na primeira linha."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        rows = _iter_csv(path)
+    elif ext in (".xlsx", ".xlsm"):
+        rows = _iter_xlsx(path)
+    else:
+        raise ValueError("Formato não suportado. Use .csv ou .xlsx.")
+
+    header = next(rows, None)
+    if header is None:
+        return
+    keys = _column_keys(header)
+    if "nome" not in keys or "email" not in keys:
+        raise ValueError("Cabeçalho inválido: o arquivo precisa das colunas nome e email.")
+
+    for line_no, values in enumerate(rows, start=2):
+        if all(not str(v).strip() for v in values):
+            continue
+        yield line_no, {k: v for k, v in zip(keys, values) if k}
+
+
+def import_users(repo, path: str) -> ImportReport:
+    """
+    Lê o arquivo em streaming, valida cada linha com as regras do formulário e
+    grava todas as aceitas de uma vez (uma única gravação no repositório).
+    """
+    report = ImportReport()
+    rows = []
+    seen_emails = set()
+
+    for line_no, data in iter_records(path):
+        msg = validate_user(data)
+        email = normalize_email(data.get("email"))
+        if msg is None and (email in seen_emails or repo.email_exists(email)):
+            msg = "E-mail já cadastrado."
+        if msg is not None:
+            report.errors.append((line_no, msg))
+            continue
+
+        seen_emails.add(email)
+        # data_hora ausente ou fora do formato do repositório: fica a de agora
+        rows.append(build_row(data, data_hora=parse_data_hora(data.get("data_hora"))))
+
+    if rows:
+        repo.append_users(rows)
+    report.imported = len(rows)
+    return report
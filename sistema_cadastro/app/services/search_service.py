@@ -0,0 +1,155 @@
+import re
+
+from app.repositories.excel_repo import UserRecord
+from app.utils.strings import normalize_text, only_digits
+
+# colunas comparadas só pelos dígitos (busca e ordenação)
+DIGIT_FIELDS = ("cep", "telefone")
+# colunas em que a busca procura o texto digitado
+TEXT_FIELDS = ("nome", "email", "cidade")
+# termo que é só um número formatado ("69000-000", "(11) 9999"): também vale pelos dígitos
+DIGIT_TERM = re.compile(r"[\d\s().-]+")
+
+
+def _sort_key(field: str, value) -> str | tuple:
+    value = "" if value is None else str(value)
+    if field in DIGIT_FIELDS:
+        return only_digits(value)
+    if field == "numero":
+        digits = only_digits(value)
+        return (len(digits), digits, normalize_text(value))  # 9 antes de 10
+    if field == "data_hora":
+        return value  # "AAAA-MM-DD HH:MM:SS" já ordena como texto
+    return normalize_text(value)
+
+
+class UserSearch:
+    """
+    Busca e ordenação em memória sobre os cadastros da tabela.
+
+    Ao carregar, cada registro ganha chaves já normalizadas (sem acento e
+    minúsculas para nome/e-mail/cidade, só dígitos para CEP/telefone), então
+    filtrar enquanto o usuário digita não volta ao repositório nem normaliza
+    nada de novo. A ordem padrão é a do repositório (mais recentes primeiro).
+    """
+
+    def __init__(self):
+        self.version = None  # data_version do repositório na última carga
+        self._order: list[int] = []  # chaves, mais recentes primeiro
+        self._users: dict[int, UserRecord] = {}
+        self._norm: dict[int, tuple[str, ...]] = {}  # chave -> TEXT_FIELDS normalizados
+        self._hay: dict[int, str] = {}  # chave -> texto onde a busca procura
+        self._sorted: dict[str, list[int]] = {}  # campo -> chaves em ordem crescente
+        self._last: tuple[list[str], list[int]] | None = None  # (termos, resultado) da última busca
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def load(self, users, version=None):
+        self._order = []
+        self._users.clear()
+        self._norm.clear()
+        self._hay.clear()
+        for user in users:
+            key = user.key
+            self._order.append(key)
+            self._index(key, user)
+        self.version = version
+        self._invalidate()
+
+    def reset(self):
+        """Descarta o que foi carregado; a próxima consulta recarrega do repositório."""
+        self.load(())
+
+    def _index(self, key: int, user: UserRecord):
+        self._users[key] = user
+        norm = tuple(normalize_text(user.text(f)) for f in TEXT_FIELDS)
+        self._norm[key] = norm
+        digits = (only_digits(user.text(f)) for f in DIGIT_FIELDS)
+        self._hay[key] = "\x00".join([*norm, *digits])
+
+    def _invalidate(self):
+        self._sorted.clear()
+        self._last = None
+
+    def get(self, key: int) -> UserRecord | None:
+        # registros são só de leitura: a tabela recebe o mesmo objeto, sem cópia
+        return self._users.get(key)
+
+    # ===== Alterações (mantêm o modelo igual ao repositório) =====
+
+    def add(self, user: UserRecord):
+        """Novo cadastro: entra como o mais recente."""
+        key = user.key
+        self._order.insert(0, key)
+        self._index(key, user)
+        self._invalidate()
+
+    def replace(self, user: UserRecord):
+        key = user.key
+        if key in self._users:
+            self._index(key, user)
+            self._invalidate()
+
+    def remove(self, key: int):
+        if self._users.pop(key, None) is None:
+            return
+        del self._norm[key]
+        del self._hay[key]
+        self._order.remove(key)
+        self._invalidate()
+
+    # ===== Consultas (retornam chaves) =====
+
+    def query(self, text: str = "", sort_field: str | None = None, ascending: bool = True) -> list[int]:
+        """
+        Chaves dos cadastros em que cada termo de `text` aparece no nome,
+        e-mail ou cidade (ou nos dígitos do CEP/telefone), na ordem pedida.
+        """
+        terms = normalize_text(text).split()
+        if terms:
+            # continuação da busca anterior (usuário digitando): filtra só o que já casou
+            base = self._order
+            if self._last is not None:
+                last_terms, last_keys = self._last
+                if len(terms) >= len(last_terms) and all(t.startswith(lt) for t, lt in zip(terms, last_terms)):
+                    base = last_keys
+
+            hay = self._hay
+            keys = base
+            for term in terms:
+                # "69000-000" também casa com o CEP guardado só com dígitos; termos
+                # com letras ("joao.silva2") não: o "2" casaria com qualquer telefone
+                digits = only_digits(term)
+                if digits and digits != term and DIGIT_TERM.fullmatch(term):
+                    keys = [k for k in keys if term in hay[k] or digits in hay[k]]
+                else:
+                    keys = [k for k in keys if term in hay[k]]
+            self._last = (terms, keys)
+        else:
+            keys = self._order
+
+        if sort_field is None:
+            return list(keys)
+
+        ordered = self._sorted_keys(sort_field)
+        if keys is not self._order:
+            wanted = set(keys)
+            ordered = [k for k in ordered if k in wanted]
+        return list(ordered) if ascending else ordered[::-1]
+
+    def _sorted_keys(self, field: str) -> list[int]:
+        ordered = self._sorted.get(field)
+        if ordered is None:
+            if field in TEXT_FIELDS:
+                i = TEXT_FIELDS.index(field)
+                sort_keys = {k: norm[i] for k, norm in self._norm.items()}
+            else:
+                sort_keys = {k: _sort_key(field, getattr(u, field)) for k, u in self._users.items()}
+            ordered = sorted(self._order, key=sort_keys.__getitem__)
+            self._sorted[field] = ordered
+        return ordered
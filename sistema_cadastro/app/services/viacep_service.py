@@ -1,23 +1,299 @@
-import requests
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 
+from app.services.cep_offline_service import OfflineCepDb, open_offline_db
 from app.utils.strings import only_digits
+from app.utils.timing import timed
 
-def fetch_address_from_viacep(cep: str) -> dict:
+# base local de CEPs (.csv ou .bin); sem a variável, usa "ceps.bin" se existir
+OFFLINE_DB_ENV = "CADASTRO_CEP_DB"
+
+logger = logging.getLogger(__name__)
+
+
+class CepCache:
+    """
+    Cache de dois níveis para o ViaCEP:
+    - LRU em memória, limitado a max_items;
+    - SQLite em disco, com validade (ttl) por entrada.
+    CEPs inexistentes ("erro": true) também são guardados, com validade menor.
+    """
+
+    def __init__(self, db_path: str | None = "viacep_cache.db", max_items: int = 2048,
+                 ttl: float = 30 * 24 * 3600, negative_ttl: float = 24 * 3600):
+        self.db_path = db_path
+        self.max_items = max_items
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._lru: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()  # cep -> (expira_em, endereço)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ceps (cep TEXT PRIMARY KEY, expires_at REAL NOT NULL, address TEXT)"
+                )
+
+    def _remember(self, cep: str, expires_at: float, addr: dict | None):
+        self._lru[cep] = (expires_at, addr)
+        self._lru.move_to_end(cep)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def get(self, cep: str) -> tuple[bool, dict | None]:
+        """
+        (True, endereço) se está no cache; endereço None = CEP inexistente.
+        (False, None) se não está (ou expirou).
+        """
+        now = time.time()
+        with self._lock:
+            item = self._lru.get(cep)
+            if item is not None and item[0] > now:
+                self._lru.move_to_end(cep)
+                self.stats["memory_hits"] += 1
+                return True, item[1]
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT expires_at, address FROM ceps WHERE cep = ?", (cep,)).fetchone()
+                if row is not None and row[0] > now:
+                    addr = json.loads(row[1]) if row[1] is not None else None
+                    self._remember(cep, row[0], addr)
+                    self.stats["disk_hits"] += 1
+                    return True, addr
+
+            self.stats["misses"] += 1
+            return False, None
+
+    def put(self, cep: str, addr: dict | None):
+        expires_at = time.time() + (self.ttl if addr is not None else self.negative_ttl)
+        with self._lock:
+            self._remember(cep, expires_at, addr)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO ceps (cep, expires_at, address) VALUES (?, ?, ?)",
+                        (cep, expires_at, json.dumps(addr, ensure_ascii=False) if addr is not None else None),
+                    )
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM ceps")
+
+
+# criação preguiçosa dos objetos do módulo (cache, cliente, base offline) e
+# contadores: a busca de CEP pode ser chamada de várias threads ao mesmo tempo
+_globals_lock = threading.RLock()
+
+_cache: CepCache | None = None
+
+
+def get_cache() -> CepCache:
+    global _cache
+    with _globals_lock:
+        if _cache is None:
+            _cache = CepCache()
+        return _cache
+
+
+def cache_stats() -> dict:
+    return dict(get_cache().stats)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Depois de failure_threshold falhas seguidas, recusa chamadas por
+    reset_timeout segundos (falha rápido em vez de travar o formulário).
+    Passado esse tempo fica meio aberto: só uma chamada de teste passa (as
+    outras continuam recusadas) e o resultado dela fecha ou reabre o circuito.
+    Se a chamada de teste não der notícia em reset_timeout, outra pode tentar.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_at = None  # quando a chamada de teste (meio aberto) saiu
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            if self._trial_at is not None and now - self._trial_at < self.reset_timeout:
+                return False  # já há uma chamada de teste em andamento
+            self._trial_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_at is not None or self._failures >= self.failure_threshold:
+                # a chamada de teste falhou (ou estourou o limite): recusa por mais reset_timeout
+                self._opened_at = time.monotonic()
+                self._trial_at = None
+
+
+class ViaCepClient:
+    """
+    Cliente HTTP do ViaCEP com conexões reaproveitadas (requests.Session),
+    timeouts separados de conexão/leitura, novas tentativas com espera
+    exponencial em erros 5xx/timeout e circuit breaker.
+    base_url pode apontar para um servidor local (testes).
+    """
+
+    def __init__(self, base_url: str = "https://viacep.com.br/ws", connect_timeout: float = 3.05,
+                 read_timeout: float = 5.0, retries: int = 2, backoff: float = 0.3, max_backoff: float = 2.0,
+                 breaker: CircuitBreaker | None = None, pool_size: int = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        # requests só é carregado na primeira consulta, não na abertura do app
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @timed("viacep.http")
+    def lookup(self, cep: str) -> dict | None:
+        """Endereço do CEP, ou None se o ViaCEP disser que ele não existe."""
+        if not self.breaker.allow():
+            raise CircuitOpenError("ViaCEP indisponível no momento. Tente novamente em instantes.")
+
+        import requests
+
+        url = f"{self.base_url}/{cep}/json/"
+        for attempt in range(self.retries + 1):
+            try:
+                resp = self.session.get(url, timeout=self.timeout)
+                if resp.status_code < 500:
+                    break
+                error = requests.HTTPError(f"ViaCEP respondeu {resp.status_code}", response=resp)
+            except (requests.Timeout, requests.ConnectionError) as ex:
+                error = ex
+
+            if attempt < self.retries:
+                time.sleep(min(self.max_backoff, self.backoff * 2**attempt))
+        else:
+            self.breaker.record_failure()
+            raise error
+
+        # chegou resposta (mesmo 4xx): o serviço está no ar
+        self.breaker.record_success()
+        resp.raise_for_status()
+
+        data = resp.json()
+        if data.get("erro") in (True, "true"):
+            return None
+
+        return {
+            "logradouro" :data.get ("logradouro") or "",
+            "bairro" :data.get ("bairro") or "",
+            "cidade" :data.get ("localidade") or "",
+            "uf" :data.get ("uf") or ""
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_client: ViaCepClient | None = None
+
+
+def get_client() -> ViaCepClient:
+    global _client
+    with _globals_lock:
+        if _client is None:
+            _client = ViaCepClient()
+        return _client
+
+
+_offline: OfflineCepDb | None = None
+_offline_loaded = False
+offline_stats = {"hits": 0, "misses": 0}
+
+
+def set_offline_db(db: OfflineCepDb | str | None):
+    """Troca a base offline (objeto já aberto, caminho .csv/.bin ou None para desligar)."""
+    global _offline, _offline_loaded
+    with _globals_lock:
+        _offline = open_offline_db(db) if isinstance(db, str) else db
+        _offline_loaded = True
+
+
+def get_offline_db() -> OfflineCepDb | None:
+    with _globals_lock:
+        if not _offline_loaded:
+            path = os.environ.get(OFFLINE_DB_ENV) or ("ceps.bin" if os.path.exists("ceps.bin") else None)
+            try:
+                set_offline_db(path)
+            except (OSError, ValueError) as ex:
+                # base ausente ou corrompida: segue com cache e ViaCEP, sem tentar abrir de novo a cada CEP
+                logger.warning("Base offline de CEPs desativada (%s): %s", path, ex)
+                set_offline_db(None)
+        return _offline
+
+
+def _count_offline(outcome: str):
+    with _globals_lock:
+        offline_stats[outcome] += 1
+
+
+@timed("viacep.fetch")
+def fetch_address_from_viacep(cep: str, cache: CepCache | None = None, client: ViaCepClient | None = None) -> dict:
     cep = only_digits(cep)
     if len(cep) != 8:
         raise ValueError("CEP deve ter 8 digitos.")
-    
-    url = f"https://viacep.com.br/ws/{cep}/json/"
-    resp = requests.get(url, timeout= 8)
-    resp.raise_for_status()
 
-    data = resp.json()
-    if data.get("erro") is True:
+    # 1º nível: base local (funciona sem internet)
+    offline = get_offline_db()
+    if offline is not None:
+        with timed("viacep.offline"):
+            addr = offline.lookup(cep)
+        if addr is not None:
+            _count_offline("hits")
+            return addr
+        _count_offline("misses")
+
+    cache = cache or get_cache()
+    with timed("viacep.cache"):
+        found, addr = cache.get(cep)
+    if not found:
+        addr = (client or get_client()).lookup(cep)
+        cache.put(cep, addr)
+
+    if addr is None:
         raise ValueError("CEP não entrado no ViaCEP.")
-    
-    return {
-        "logradouro" :data.get ("logradouro") or "",
-        "bairro" :data.get ("bairro") or "",
-        "cidade" :data.get ("localidade") or "",
-        "uf" :data.get ("uf") or ""
-    }
\ No newline at end of file
+    return dict(addr)
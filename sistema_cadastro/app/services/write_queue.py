@@ -0,0 +1,123 @@
+import atexit
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+
+from app.utils.timing import timed
+
+# filas abertas, para flush_all() gravar tudo antes de o programa sair
+_queues = weakref.WeakSet()
+
+
+class WriteQueue:
+    """
+    Grava no repositório numa thread própria, na ordem em que as alterações
+    chegam; quem chama (um handler da UI) volta na hora.
+
+    on_done(resultado) / on_error(exceção) de cada alteração, e on_error da
+    fila (falha ao compactar), são chamados por meio de `dispatch` (na UI,
+    dentro do loop da página). Quando a fila fica idle_seconds sem nada novo,
+    o que a rajada deixou no journal vai para o .xlsx numa única gravação.
+    """
+
+    def __init__(self, repo, dispatch=None, on_error=None, idle_seconds: float = 2.0):
+        self.repo = repo
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self.on_error = on_error
+        self.idle_seconds = idle_seconds
+
+        self._queue = queue.Queue()
+        self._dirty = False  # gravou algo desde a última compactação
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="fila-gravacao", daemon=True)
+        self._thread.start()
+        _queues.add(self)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, **kwargs) -> Future:
+        """Enfileira fn(*args, **kwargs) (ex.: repo.append_user). O Future traz o resultado."""
+        if self._closed:
+            raise RuntimeError("Fila de gravação encerrada.")
+        future = Future()
+        self._queue.put((fn, args, kwargs, on_done, on_error, future))
+        return future
+
+    def _notify(self, callback, arg):
+        if callback is None:
+            return
+        try:
+            self.dispatch(callback, arg)
+        except Exception:
+            pass  # página já fechada: a gravação em si já aconteceu
+
+    def _compact(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            with timed("fila.compactar"):
+                self.repo.compact()
+        except Exception as ex:
+            self._notify(self.on_error, ex)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_seconds if self._dirty else None)
+            except queue.Empty:
+                self._compact()  # a rajada terminou
+                continue
+
+            try:
+                if item is None:  # close()
+                    self._compact()
+                    return
+                if isinstance(item, Future):  # flush()
+                    self._compact()
+                    item.set_result(None)
+                    continue
+
+                fn, args, kwargs, on_done, on_error, future = item
+                try:
+                    with timed("fila.gravar"):
+                        result = fn(*args, **kwargs)
+                except Exception as ex:
+                    future.set_exception(ex)
+                    self._notify(on_error, ex)
+                else:
+                    self._dirty = True
+                    future.set_result(result)
+                    self._notify(on_done, result)
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera gravar (e compactar) tudo o que já foi enfileirado. False se estourou o tempo."""
+        if threading.current_thread() is self._thread:
+            return False  # de dentro de um callback da própria fila: esperaria por si mesma
+        if self._closed:
+            return self.close(timeout)
+        marker = Future()
+        self._queue.put(marker)
+        try:
+            marker.result(timeout)
+            return True
+        except TimeoutError:
+            return False
+
+    def close(self, timeout: float | None = None) -> bool:
+        """Grava o que falta e encerra a thread. Depois disso submit() falha."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+
+def flush_all(timeout: float | None = None):
+    """Encerra todas as filas abertas, gravando o que estiver pendente (saída do programa)."""
+    for q in list(_queues):
+        q.close(timeout)
+
+
+atexit.register(flush_all)
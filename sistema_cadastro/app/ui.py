@@ -1,9 +1,55 @@
+import asyncio
+import re
+
 import flet as ft
-from datetime import datetime
 
+from app.services.cadastro_service import build_row, validate_user
+from app.services.dedup_service import DuplicateIndex, find_duplicates
+from app.services.enrichment_service import enrich_addresses
+from app.services.export_service import export_users
+from app.services.import_service import import_users
+from app.services.search_service import UserSearch
 from app.services.viacep_service import fetch_address_from_viacep
-from app.repositories.excel_repo import ExcelRepo
+from app.services.write_queue import WriteQueue
+from app.repositories.errors import ConflictError
+from app.repositories.excel_repo import UserRecord
+from app.repositories.factory import create_repo
 from app.utils.strings import only_digits
+from app.utils.timing import timed, timings
+from app.utils.update_batcher import UpdateBatcher
+
+# tempo sem digitar antes de consultar o ViaCEP
+CEP_DEBOUNCE_SECONDS = 0.4
+
+PAGE_SIZES = [25, 50, 100, 200]
+
+# datas do filtro de exportação
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# grupos mostrados no relatório de duplicados (o resumo conta todos)
+DUPLICATE_GROUPS_SHOWN = 100
+
+# quanto tempo o "Desfazer" fica na tela depois de uma exclusão
+UNDO_SECONDS = 8
+
+# (campo do registro, título da coluna) na ordem em que aparecem na tabela
+TABLE_COLUMNS = [
+    ("data_hora", "Data/Hora"),
+    ("nome", "Nome"),
+    ("email", "E-mail"),
+    ("telefone", "Telefone"),
+    ("cep", "CEP"),
+    ("logradouro", "Logradouro"),
+    ("bairro", "Bairro"),
+    ("cidade", "Cidade"),
+    ("uf", "UF"),
+    ("numero", "Número"),
+    ("complemento", "Complemento"),
+]
+
+
+def user_cells(user: UserRecord) -> list[ft.DataCell]:
+    return [ft.DataCell(ft.Text(user.text(key))) for key, _ in TABLE_COLUMNS]
 
 
 def build_ui(page: ft.Page):
@@ -12,13 +58,54 @@ def build_ui(page: ft.Page):
     page.window_height = 780
     page.scroll = ft.ScrollMode.AUTO
 
-    repo = ExcelRepo(file_path="cadastros.xlsx", sheet_name="usuarios")
+    # excel ou sqlite, conforme CADASTRO_BACKEND; aberto por open_repo, depois que a janela aparece
+    repo = None
+
+    # cada evento do usuário gera no máximo um envio de tela (batcher.stats conta)
+    batcher = UpdateBatcher(page)
+
+    def event(handler):
+        """Handler de evento: um envio de tela por evento e tempo medido (painel de diagnóstico)."""
+        return batcher.event(timed(f"ui.{handler.__name__}")(handler))
+
+    async def in_page(fn, *args):
+        # resultado de uma gravação em segundo plano: roda no loop da página, como um evento
+        with batcher.batch():
+            fn(*args)
+
+    # salvar/alterar/excluir vão para uma thread; o handler volta na hora
+    writes: WriteQueue | None = None
+
+    def on_page_close(e):
+        if writes is not None:
+            writes.close()  # sessão encerrada (modo web)
+
+    page.on_close = on_page_close
 
     status = ft.Text("", selectable=True)
 
     # ===== Estado de seleção =====
-    selected_excel_row = None  # linha real no Excel (int)
-    selected_table_index = None  # índice na tabela (int)
+    selected_key = None  # id do cadastro (int)
+    selected_version = None  # versão lida; a gravação falha se outra sessão mudou o cadastro
+
+    # ===== Paginação =====
+    table_page = 0  # página atual (começa em 0)
+    page_size = 50
+    total_users = 0
+
+    # ===== Linhas da página atual, por chave do registro (key) =====
+    row_by_key: dict[int, ft.DataRow] = {}
+    seen_version = None  # data_version do repositório na última leitura completa
+
+    # ===== Busca/ordenação em memória (montada numa thread, depois da abertura) =====
+    search = UserSearch()
+    search_query = ""
+    sort_field = None  # campo de TABLE_COLUMNS ou None (ordem do repositório)
+    sort_ascending = True
+    # cadastros parecidos (aviso ao salvar um novo); montado junto com a busca
+    dups = DuplicateIndex()
+    models_task = None  # Future da montagem de search/dups em andamento (ou da última)
+    model_changes = 0  # alterações feitas na tela; durante a montagem, pedem outra
 
     # Campos
     nome = ft.TextField(label="Nome *", expand=True)
@@ -45,36 +132,49 @@ def build_ui(page: ft.Page):
     update_btn = ft.ElevatedButton("Salvar alterações", icon=ft.Icons.EDIT, disabled=True)
     delete_btn = ft.OutlinedButton("Excluir selecionado", icon=ft.Icons.DELETE, disabled=True)
     refresh_btn = ft.OutlinedButton("Atualizar tabela", icon=ft.Icons.REFRESH)
+    import_btn = ft.OutlinedButton("Importar CSV/XLSX", icon=ft.Icons.UPLOAD_FILE)
+    export_btn = ft.OutlinedButton("Exportar", icon=ft.Icons.DOWNLOAD)
+    enrich_btn = ft.OutlinedButton("Completar endereços", icon=ft.Icons.TRAVEL_EXPLORE)
+    enrich_progress = ft.ProgressBar(width=320, value=0, visible=False)
+    dedup_btn = ft.OutlinedButton("Procurar duplicados", icon=ft.Icons.FIND_REPLACE)
 
     # ===== TABELA =====
     table = ft.DataTable(
-        columns=[
-            ft.DataColumn(ft.Text("Data/Hora")),
-            ft.DataColumn(ft.Text("Nome")),
-            ft.DataColumn(ft.Text("E-mail")),
-            ft.DataColumn(ft.Text("Telefone")),
-            ft.DataColumn(ft.Text("CEP")),
-            ft.DataColumn(ft.Text("Logradouro")),
-            ft.DataColumn(ft.Text("Bairro")),
-            ft.DataColumn(ft.Text("Cidade")),
-            ft.DataColumn(ft.Text("UF")),
-            ft.DataColumn(ft.Text("Número")),
-            ft.DataColumn(ft.Text("Complemento")),
-        ],
+        columns=[ft.DataColumn(ft.Text(label)) for _, label in TABLE_COLUMNS],
         rows=[],
         heading_row_height=42,
         data_row_min_height=40,
         data_row_max_height=56,
     )
 
+    # ===== Paginação (só a página visível vem do repositório) =====
+    page_size_dd = ft.Dropdown(
+        label="Por página",
+        value=str(page_size),
+        options=[ft.DropdownOption(str(n)) for n in PAGE_SIZES],
+        width=130,
+    )
+    prev_page_btn = ft.IconButton(ft.Icons.CHEVRON_LEFT, tooltip="Página anterior")
+    next_page_btn = ft.IconButton(ft.Icons.CHEVRON_RIGHT, tooltip="Próxima página")
+    page_info = ft.Text("")
+    jump_field = ft.TextField(label="Ir para", width=90, keyboard_type=ft.KeyboardType.NUMBER)
+
+    search_field = ft.TextField(
+        label="Buscar",
+        hint_text="Nome, e-mail, cidade, CEP ou telefone",
+        prefix_icon=ft.Icons.SEARCH,
+        expand=True,
+    )
+    clear_search_btn = ft.IconButton(ft.Icons.FILTER_ALT_OFF, tooltip="Limpar busca e ordenação")
+
     def set_status(msg: str, error: bool = False):
         status.value = msg
         status.color = ft.Colors.RED if error else ft.Colors.GREEN
-        page.update()
+        batcher.update()
 
     def clear_status():
         status.value = ""
-        page.update()
+        batcher.update()
 
     def clear_form():
         nome.value = ""
@@ -88,35 +188,54 @@ def build_ui(page: ft.Page):
         numero.value = ""
         complemento.value = ""
 
+    def form_data() -> dict:
+        return {
+            "nome": nome.value,
+            "email": email.value,
+            "telefone": telefone.value,
+            "cep": cep.value,
+            "logradouro": logradouro.value,
+            "bairro": bairro.value,
+            "cidade": cidade.value,
+            "uf": uf.value,
+            "numero": numero.value,
+            "complemento": complemento.value,
+        }
+
+    def form_filled() -> bool:
+        return any(str(v or "").strip() for v in form_data().values())
+
     def validate_required() -> tuple[bool, str]:
-        if not nome.value.strip():
-            return False, "Nome é obrigatório."
-        if not email.value.strip():
-            return False, "E-mail é obrigatório."
-        if len(only_digits(cep.value)) != 8:
-            return False, "CEP inválido. Informe 8 dígitos."
-        if not numero.value.strip():
-            return False, "Número é obrigatório."
-        return True, ""
+        msg = validate_user(form_data())
+        return msg is None, msg or ""
 
     def fill_address(addr: dict):
         logradouro.value = addr.get("logradouro", "")
         bairro.value = addr.get("bairro", "")
         cidade.value = addr.get("cidade", "")
         uf.value = addr.get("uf", "")
-        page.update()
+        batcher.update()
+
+    def lock_form(locked: bool):
+        """Trava (ou libera) os campos e o que mexe neles: botões de gravar e seleção na tabela."""
+        for c in (nome, email, telefone, cep, logradouro, bairro, cidade, uf, numero, complemento, save_btn, table):
+            c.disabled = locked
+        has_sel = selected_key is not None
+        update_btn.disabled = locked or not has_sel
+        delete_btn.disabled = locked or not has_sel
+        batcher.update()
 
-    def set_selected(excel_row: int | None, table_index: int | None):
-        nonlocal selected_excel_row, selected_table_index
-        selected_excel_row = excel_row
-        selected_table_index = table_index
+    def set_selected(key: int | None, version: int | None = None):
+        nonlocal selected_key, selected_version
+        selected_key = key
+        selected_version = version
 
-        has_sel = selected_excel_row is not None
+        has_sel = selected_key is not None
         update_btn.disabled = not has_sel
         delete_btn.disabled = not has_sel
-        page.update()
+        batcher.update()
 
-    def load_user_to_form(user: dict):
+    def load_user_to_form(user: UserRecord | dict):
         nome.value = str(user.get("nome", "") or "")
         email.value = str(user.get("email", "") or "")
         telefone.value = str(user.get("telefone", "") or "")
@@ -127,98 +246,403 @@ def build_ui(page: ft.Page):
         uf.value = str(user.get("uf", "") or "")
         numero.value = str(user.get("numero", "") or "")
         complemento.value = str(user.get("complemento", "") or "")
-        page.update()
+        batcher.update()
 
-    def on_cep_change(e: ft.ControlEvent):
-        clear_status()
-        c = only_digits(cep.value)
-        if len(c) == 8:
-            cep_progress.visible = True
-            page.update()
+    cep_task: asyncio.Task | None = None  # consulta em andamento (só a do último CEP digitado vale)
+
+    async def lookup_cep(c: str):
+        # espera o usuário parar de digitar antes de consultar
+        await asyncio.sleep(CEP_DEBOUNCE_SECONDS)
+        cep_progress.visible = True
+        batcher.update()
+        with batcher.batch():  # endereço, status e fim do indicador num só envio
             try:
-                addr = fetch_address_from_viacep(c)
+                # requisição fora do loop de eventos: a tela continua respondendo
+                addr = await asyncio.to_thread(fetch_address_from_viacep, c)
+                if only_digits(cep.value) != c:
+                    return  # CEP mudou enquanto consultava; resultado velho
                 fill_address(addr)
                 set_status("Endereço preenchido via ViaCEP.")
+            except asyncio.CancelledError:
+                raise
             except Exception as ex:
                 set_status(f"Falha ao consultar CEP: {ex}", error=True)
             finally:
                 cep_progress.visible = False
-                page.update()
+                batcher.update()
+
+    @event
+    async def on_cep_change(e: ft.ControlEvent):
+        nonlocal cep_task
+        clear_status()
+        if cep_task is not None:
+            cep_task.cancel()  # descarta a consulta do CEP anterior
+            cep_task = None
+
+        c = only_digits(cep.value)
+        if len(c) == 8:
+            cep_task = asyncio.create_task(lookup_cep(c))
 
     cep.on_change = on_cep_change
 
+    @event
+    def on_row_select(e: ft.ControlEvent):
+        user = e.control.data
+        set_selected(user.key, user.version)
+        load_user_to_form(user)
+        set_status("Registro carregado para edição.")
+        # destaca visualmente a linha selecionada
+        for r in table.rows:
+            r.selected = (r is e.control)
+        batcher.update()
+
+    def make_row(user: UserRecord) -> ft.DataRow:
+        return ft.DataRow(
+            selected=(user.key == selected_key),
+            on_select_change=on_row_select,
+            data=user,
+            cells=user_cells(user),
+        )
+
+    def update_pager():
+        pages = max(1, -(-total_users // page_size))
+        found = "encontrados" if search_query.strip() else "cadastros"
+        page_info.value = f"Página {table_page + 1} de {pages} ({total_users} {found})"
+        prev_page_btn.disabled = table_page == 0
+        next_page_btn.disabled = table_page >= pages - 1
+
+    def searching() -> bool:
+        return bool(search_query.strip()) or sort_field is not None
+
+    def models_ready() -> bool:
+        """Busca e índice de duplicados montados e em dia com o armazenamento."""
+        return search.loaded and search.version == repo.data_version()
+
+    def load_models(version):
+        # roda numa thread: indexar milhares de cadastros travaria a janela
+        users = list(repo.iter_users())
+        new_search = UserSearch()
+        new_search.load(users, version)
+        new_dups = DuplicateIndex()
+        new_dups.load(reversed(users), version)  # mais antigo primeiro
+        return new_search, new_dups
+
+    async def build_models():
+        nonlocal search, dups
+        try:
+            while True:
+                changes, version = model_changes, repo.data_version()
+                with timed("ui.montar_busca"):
+                    built = await asyncio.to_thread(load_models, version)
+                if changes == model_changes and version == repo.data_version():
+                    break  # nada mudou enquanto montava
+        except Exception as ex:
+            with batcher.batch():
+                set_status(f"Erro ao carregar a busca: {ex}", error=True)
+            return
+        search, dups = built
+        if searching():
+            with batcher.batch():
+                refresh_table()
+
+    def start_models():
+        """Começa a montagem da busca/duplicados, se precisa e ainda não começou; retorna o Future."""
+        nonlocal models_task
+        if models_task is None or (models_task.done() and not models_ready()):
+            models_task = page.run_task(build_models)
+        return models_task
+
+    def models_changed():
+        nonlocal model_changes
+        model_changes += 1
+
+    def reset_models():
+        """Descarta busca e índice de duplicados e remonta os dois do repositório, fora do loop."""
+        search.reset()
+        dups.reset()
+        models_changed()
+        start_models()
+
+    @timed("ui.refresh_table")
     def refresh_table():
-        users = repo.list_users()  # inclui _excel_row (linha real no Excel)
-        rows = []
-
-        def make_on_select(user: dict, idx: int):
-            def handler(e: ft.ControlEvent):
-                set_selected(user["_excel_row"], idx)
-                load_user_to_form(user)
-                set_status("Registro carregado para edição.")
-                # destaca visualmente a linha selecionada
-                for i, r in enumerate(table.rows):
-                    r.selected = (i == idx)
-                page.update()
-
-            return handler
-
-        for idx, u in enumerate(users):
-            rows.append(
-                ft.DataRow(
-                    selected=(idx == selected_table_index),
-                    on_select_change=make_on_select(u, idx),
-                    cells=[
-                        ft.DataCell(ft.Text(str(u.get("data_hora", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("nome", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("email", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("telefone", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("cep", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("logradouro", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("bairro", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("cidade", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("uf", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("numero", "") or ""))),
-                        ft.DataCell(ft.Text(str(u.get("complemento", "") or ""))),
-                    ],
-                )
-            )
+        nonlocal table_page, total_users, seen_version
+        seen_version = repo.data_version()
+        view_keys = None
+        if searching() and not models_ready():
+            # a busca ainda está sendo montada; quando terminar, a tabela é redesenhada
+            start_models()
+            table.rows = []
+            row_by_key.clear()
+            page_info.value = "Carregando busca..."
+            prev_page_btn.disabled = next_page_btn.disabled = True
+            batcher.update()
+            return
+        if searching():
+            view_keys = search.query(search_query, sort_field, sort_ascending)
+            total_users = len(view_keys)
+        else:
+            total_users = repo.count_users()
+        pages = max(1, -(-total_users // page_size))
+        table_page = max(0, min(table_page, pages - 1))
 
-        table.rows = rows
-        page.update()
+        start = table_page * page_size
+        if view_keys is not None:
+            users = (search.get(k) for k in view_keys[start : start + page_size])
+        else:
+            # UserRecord: key (id do cadastro) e version
+            users = repo.iter_users(offset=start, limit=page_size)
+        table.rows = [make_row(u) for u in users]
+        row_by_key.clear()
+        row_by_key.update((r.data.key, r) for r in table.rows)
 
-    def on_save_new(e: ft.ControlEvent):
+        update_pager()
+        batcher.update()
+
+    # ===== Atualização incremental (só a linha que mudou) =====
+
+    def in_sync() -> bool:
+        """False se o armazenamento mudou por fora; aí só uma releitura completa resolve."""
+        return repo.data_version() == seen_version
+
+    def page_user_at(offset: int) -> UserRecord | None:
+        """Registro na posição `offset` (mais recentes primeiro), ou None."""
+        return next(iter(repo.iter_users(offset=offset, limit=1)), None)
+
+    def drop_row(row: ft.DataRow):
+        table.rows.remove(row)
+        row_by_key.pop(row.data.key, None)
+
+    def add_row(user: UserRecord | None, at: int | None = None):
+        if user is None:
+            return
+        row = make_row(user)
+        if at is None:
+            table.rows.append(row)
+        else:
+            table.rows.insert(at, row)
+        row_by_key[user.key] = row
+
+    def table_inserted(key: int):
+        """Novo cadastro: entra no topo (mais recentes primeiro) e empurra a página."""
+        nonlocal total_users
+        if not in_sync():
+            refresh_table()
+            return
+
+        user = repo.get_user(key)
+        models_changed()
+        if search.loaded:
+            search.add(user)
+        if dups.loaded:
+            dups.add(user)
+        if searching():
+            refresh_table()  # posição depende do filtro/ordenação; tudo em memória
+            return
+
+        total_users += 1
+        # o registro que agora abre esta página (na 1ª página, o próprio novo)
+        add_row(user if table_page == 0 else page_user_at(table_page * page_size), at=0)
+        if len(table.rows) > page_size:
+            drop_row(table.rows[-1])
+        update_pager()
+        batcher.update()
+
+    def table_updated(key: int):
+        if not in_sync():
+            refresh_table()
+            return
+
+        row = row_by_key.get(key)
+        models_changed()
+        user = repo.get_user(key) if row is not None or search.loaded or dups.loaded else None
+        if user is not None and search.loaded:
+            search.replace(user)
+        if user is not None and dups.loaded:
+            dups.replace(user)
+        if searching():
+            refresh_table()
+            return
+
+        if row is not None and user is not None:
+            row.data = user
+            row.cells = user_cells(user)
+        batcher.update()
+
+    def table_deleted(key: int):
+        nonlocal total_users
+        if not in_sync():
+            refresh_table()
+            return
+
+        models_changed()
+        if search.loaded:
+            search.remove(key)
+        if dups.loaded:
+            dups.remove(key)
+        if searching():
+            refresh_table()
+            return
+
+        total_users -= 1
+        keys = list(row_by_key)
+        row = row_by_key.get(key)
+        if row is not None:
+            drop_row(row)
+        elif keys and key > max(keys):
+            # excluído de uma página anterior: a página "sobe" uma posição
+            drop_row(table.rows[0])
+
+        if not table.rows and table_page > 0:
+            refresh_table()  # página ficou vazia: volta uma
+            return
+
+        if len(table.rows) < page_size:
+            # completa a página com o próximo registro (se houver)
+            add_row(page_user_at(table_page * page_size + len(table.rows)))
+        update_pager()
+        batcher.update()
+
+    def go_to_page(n: int):
+        nonlocal table_page
+        table_page = n
+        refresh_table()
+
+    @event
+    def on_prev_page(e: ft.ControlEvent):
+        go_to_page(table_page - 1)
+
+    @event
+    def on_next_page(e: ft.ControlEvent):
+        go_to_page(table_page + 1)
+
+    @event
+    def on_jump_page(e: ft.ControlEvent):
+        n = only_digits(jump_field.value)
+        jump_field.value = ""
+        if n:
+            go_to_page(int(n) - 1)  # refresh_table limita ao intervalo válido
+
+    @event
+    def on_page_size_change(e: ft.ControlEvent):
+        nonlocal page_size, table_page
+        first = table_page * page_size  # mantém à vista o primeiro registro da página
+        page_size = int(page_size_dd.value)
+        table_page = first // page_size
+        refresh_table()
+
+    @event
+    def on_search_change(e: ft.ControlEvent):
+        nonlocal search_query, table_page
+        search_query = search_field.value or ""
+        table_page = 0
+        refresh_table()
+
+    @event
+    def on_sort_column(e: ft.DataColumnSortEvent):
+        nonlocal sort_field, sort_ascending, table_page
+        sort_field = TABLE_COLUMNS[e.column_index][0]
+        sort_ascending = e.ascending
+        table.sort_column_index = e.column_index
+        table.sort_ascending = e.ascending
+        table_page = 0
+        refresh_table()
+
+    @event
+    def on_clear_search(e: ft.ControlEvent):
+        nonlocal search_query, sort_field, sort_ascending, table_page
+        search_field.value = ""
+        search_query = ""
+        sort_field = None
+        sort_ascending = True
+        table.sort_column_index = None
+        table_page = 0
+        refresh_table()
+
+    search_field.on_change = on_search_change
+    clear_search_btn.on_click = on_clear_search
+    for col in table.columns:
+        col.on_sort = on_sort_column
+
+    prev_page_btn.on_click = on_prev_page
+    next_page_btn.on_click = on_next_page
+    jump_field.on_submit = on_jump_page
+    page_size_dd.on_select = on_page_size_change
+
+    @event
+    async def on_save_new(e: ft.ControlEvent):
         ok, msg = validate_required()
         if not ok:
             set_status(msg, error=True)
             return
 
-        row = [
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            nome.value.strip(),
-            email.value.strip(),
-            telefone.value.strip(),
-            only_digits(cep.value),
-            logradouro.value.strip(),
-            bairro.value.strip(),
-            cidade.value.strip(),
-            uf.value.strip().upper(),
-            numero.value.strip(),
-            complemento.value.strip(),
-        ]
+        data = form_data()
+        if not models_ready():
+            # índice ainda sendo montado (logo depois de abrir/importar): espera fora do
+            # loop, com o formulário travado para nada digitado nesse meio-tempo se perder
+            set_status("Conferindo cadastros parecidos...")
+            lock_form(True)
+            batcher.flush()
+            try:
+                await asyncio.wrap_future(start_models())
+            finally:
+                lock_form(False)
+        # se a montagem falhou, salva sem o aviso de duplicado
+        similar = dups.matches(data) if models_ready() else []
+        if similar:
+            confirm_duplicate(data, similar)
+            return
+        save_new(data)
 
-        try:
-            repo.append_user(row)
+    def save_new(data: dict):
+        row = build_row(data)
+
+        def saved(key: int):
             set_status("Novo cadastro salvo.")
-            clear_form()
-            set_selected(None, None)
-            refresh_table()
-        except Exception as ex:
+            table_inserted(key)
+
+        def failed(ex: Exception):
             set_status(f"Erro ao salvar: {ex}", error=True)
+            if not form_filled():
+                load_user_to_form(data)  # devolve o que foi digitado para corrigir
 
+        writes.submit(repo.append_user, row, on_done=saved, on_error=failed)
+        # confirmação otimista: o formulário já fica livre para o próximo cadastro
+        set_status("Salvando...")
+        clear_form()
+        set_selected(None)
+
+    def confirm_duplicate(data: dict, similar):
+        """Já existe alguém parecido: mostra quem e deixa o usuário decidir."""
+
+        @event
+        def save_anyway(_):
+            page.pop_dialog()
+            save_new(data)
+
+        @event
+        def cancel_save(_):
+            page.pop_dialog()
+            set_status("Cadastro não salvo: confira os cadastros parecidos.", error=True)
+
+        lines = [
+            ft.Text(f"{m.user.text('nome')} — {m.user.text('email')} — {m.user.text('telefone')} ({m.score:.0%})")
+            for m in similar
+        ]
+        dlg = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Possível cadastro duplicado"),
+            content=ft.Column([ft.Text("Já existe(m) cadastro(s) parecido(s):"), *lines], tight=True),
+            actions=[
+                ft.TextButton("Cancelar", on_click=cancel_save),
+                ft.ElevatedButton("Salvar mesmo assim", icon=ft.Icons.SAVE, on_click=save_anyway),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        page.show_dialog(dlg)
+
+    @event
     def on_update_selected(e: ft.ControlEvent):
-        nonlocal selected_excel_row
-        if selected_excel_row is None:
+        if selected_key is None:
             set_status("Selecione um registro na tabela para editar.", error=True)
             return
 
@@ -228,53 +652,84 @@ def build_ui(page: ft.Page):
             return
 
         # Atualiza data/hora para "agora" (simples e claro)
-        row = [
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            nome.value.strip(),
-            email.value.strip(),
-            telefone.value.strip(),
-            only_digits(cep.value),
-            logradouro.value.strip(),
-            bairro.value.strip(),
-            cidade.value.strip(),
-            uf.value.strip().upper(),
-            numero.value.strip(),
-            complemento.value.strip(),
-        ]
+        data = form_data()
+        row = build_row(data)
+        key, version = selected_key, selected_version
 
-        try:
-            repo.update_user(selected_excel_row, row)
+        def saved(_version: int):
             set_status("Alterações salvas.")
-            clear_form()
-            set_selected(None, None)
-            refresh_table()
-        except Exception as ex:
+            table_updated(key)
+
+        def failed(ex: Exception):
+            if isinstance(ex, ConflictError):
+                # outra sessão chegou antes: mostra o que está gravado agora
+                set_status(str(ex), error=True)
+                reset_models()
+                refresh_table()
+                return
             set_status(f"Erro ao atualizar: {ex}", error=True)
+            if selected_key is None and not form_filled():
+                set_selected(key, version)
+                load_user_to_form(data)
+
+        writes.submit(repo.update_user, key, row, expected_version=version, on_done=saved, on_error=failed)
+        set_status("Salvando alterações...")
+        clear_form()
+        set_selected(None)
+
+    @event
+    def on_undo_delete(e: ft.ControlEvent):
+        key = e.control.data
 
+        def restored(_version: int):
+            set_status("Exclusão desfeita.")
+            reset_models()  # volta para a posição de antes, não para o topo
+            refresh_table()
+
+        def failed(ex: Exception):
+            set_status(f"Não foi possível desfazer: {ex}", error=True)
+
+        writes.submit(repo.restore_user, key, on_done=restored, on_error=failed)
+        set_status("Desfazendo exclusão...")
+
+    @event
     def on_delete_selected(e: ft.ControlEvent):
-        nonlocal selected_excel_row
-        if selected_excel_row is None:
+        if selected_key is None:
             set_status("Selecione um registro na tabela para excluir.", error=True)
             return
 
+        @event
         def confirm_delete(_):
-            nonlocal selected_excel_row
-            try:
-                repo.delete_user(selected_excel_row)
+            key, version = selected_key, selected_version
+            page.pop_dialog()
+
+            def deleted(_):
                 set_status("Registro excluído.")
-                clear_form()
-                set_selected(None, None)
-                dlg.open = False
-                page.update()
-                refresh_table()
-            except Exception as ex:
-                dlg.open = False
-                page.update()
-                set_status(f"Erro ao excluir: {ex}", error=True)
+                table_deleted(key)
+                page.show_dialog(
+                    ft.SnackBar(
+                        ft.Text("Registro excluído."),
+                        action="Desfazer",
+                        on_action=on_undo_delete,
+                        data=key,
+                        duration=ft.Duration(seconds=UNDO_SECONDS),
+                    )
+                )
 
+            def failed(ex: Exception):
+                set_status(str(ex) if isinstance(ex, ConflictError) else f"Erro ao excluir: {ex}", error=True)
+                if isinstance(ex, ConflictError):
+                    reset_models()
+                    refresh_table()
+
+            writes.submit(repo.delete_user, key, expected_version=version, on_done=deleted, on_error=failed)
+            set_status("Excluindo...")
+            clear_form()
+            set_selected(None)
+
+        @event
         def cancel_delete(_):
-            dlg.open = False
-            page.update()
+            page.pop_dialog()
 
         dlg = ft.AlertDialog(
             modal=True,
@@ -286,21 +741,330 @@ def build_ui(page: ft.Page):
             ],
             actions_alignment=ft.MainAxisAlignment.END,
         )
-        page.dialog = dlg
-        dlg.open = True
-        page.update()
+        page.show_dialog(dlg)
 
+    @event
     def on_refresh_click(e: ft.ControlEvent):
+        reset_models()
         refresh_table()
         set_status("Tabela atualizada.")
 
+    import_picker = ft.FilePicker()  # usado também para escolher onde exportar
+    page.services.append(import_picker)
+
+    @batcher.event
+    async def on_import_click(e: ft.ControlEvent):
+        files = await import_picker.pick_files(
+            dialog_title="Importar cadastros",
+            allowed_extensions=["csv", "xlsx"],
+        )
+        if not files:
+            return
+        path = files[0].path
+        if not path:
+            set_status("Importação disponível apenas no app desktop.", error=True)
+            return
+
+        set_status("Importando...")
+        batcher.flush()
+        try:
+            await asyncio.to_thread(writes.flush)  # o que já foi salvo entra antes
+            # leitura e gravação em lote fora do loop de eventos
+            with timed("ui.importar"):
+                report = await asyncio.to_thread(import_users, repo, path)
+        except Exception as ex:
+            set_status(f"Erro ao importar: {ex}", error=True)
+            return
+
+        msg = report.summary()
+        if report.errors:
+            shown = "\n".join(f"Linha {line}: {reason}" for line, reason in report.errors[:10])
+            more = len(report.errors) - 10
+            msg += "\n" + shown + (f"\n... e mais {more}." if more > 0 else "")
+        set_status(msg, error=bool(report.errors) and not report.imported)
+        reset_models()  # gravação em lote não passa pelos ganchos incrementais
+        refresh_table()
+
+    async def export_to_file(columns: list[str], uf: str, date_from: str, date_to: str):
+        path = await import_picker.save_file(
+            dialog_title="Exportar cadastros",
+            file_name="cadastros_export.csv",
+            allowed_extensions=["csv", "xlsx"],
+        )
+        if not path:
+            return
+
+        set_status("Exportando...")
+        batcher.flush()
+        try:
+            await asyncio.to_thread(writes.flush)  # o que já foi salvo entra no arquivo
+            with timed("ui.exportar"):
+                total = await asyncio.to_thread(
+                    export_users, repo, path, columns=columns, uf=uf or None,
+                    date_from=date_from or None, date_to=date_to or None,
+                )
+            set_status(f"{total} cadastro(s) exportado(s) para {path}.")
+        except Exception as ex:
+            set_status(f"Erro ao exportar: {ex}", error=True)
+
+    @event
+    def on_export_click(e: ft.ControlEvent):
+        """Opções da exportação (colunas, UF, período); o arquivo é escolhido depois."""
+        checks = [ft.Checkbox(label=label, value=True, data=field) for field, label in TABLE_COLUMNS]
+        uf = ft.TextField(label="UF (vazio: todas)", width=160, max_length=2, capitalization=ft.TextCapitalization.CHARACTERS)
+        date_from = ft.TextField(label="De (AAAA-MM-DD)", width=180)
+        date_to = ft.TextField(label="Até (AAAA-MM-DD)", width=180)
+        error = ft.Text(color=ft.Colors.RED, visible=False)
+
+        @event
+        async def confirm_export(_):
+            columns = [c.data for c in checks if c.value]
+            dates = [(f.value or "").strip() for f in (date_from, date_to)]
+            if not columns:
+                error.value = "Escolha ao menos uma coluna."
+            elif any(d and not DATE_RE.fullmatch(d) for d in dates):
+                error.value = "Datas no formato AAAA-MM-DD."
+            else:
+                page.pop_dialog()
+                await export_to_file(columns, (uf.value or "").strip(), *dates)
+                return
+            error.visible = True
+            batcher.update()
+
+        @event
+        def cancel_export(_):
+            page.pop_dialog()
+
+        dlg = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Exportar cadastros"),
+            content=ft.Column(
+                [
+                    ft.Text("Colunas:"),
+                    ft.Row(checks, wrap=True, width=640),
+                    ft.Row([uf, date_from, date_to], spacing=10),
+                    error,
+                ],
+                tight=True,
+            ),
+            actions=[
+                ft.TextButton("Cancelar", on_click=cancel_export),
+                ft.ElevatedButton("Escolher arquivo...", icon=ft.Icons.SAVE_ALT, on_click=confirm_export),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        page.show_dialog(dlg)
+
+    @event
+    async def on_enrich_click(e: ft.ControlEvent):
+        last_shown = -1
+
+        def show_progress(value: float):
+            if enrich_progress.visible:  # progresso atrasado, depois do fim: ignora
+                enrich_progress.value = value
+                batcher.flush()  # o evento ainda está aberto: envia já, sem esperar o fim
+
+        def on_progress(done: int, total: int):
+            # chamado na thread do enriquecimento: a tela só é mexida no loop da página
+            nonlocal last_shown
+            pct = done * 100 // total
+            if pct != last_shown:  # no máximo ~100 atualizações de tela
+                last_shown = pct
+                page.run_task(in_page, show_progress, done / total)
+
+        enrich_btn.disabled = True
+        enrich_progress.value = 0
+        enrich_progress.visible = True
+        set_status("Completando endereços pelo CEP...")
+        batcher.flush()
+        try:
+            await asyncio.to_thread(writes.flush)
+            report = await asyncio.to_thread(enrich_addresses, repo, progress=on_progress)
+            set_status(report.summary(), error=report.failed > 0 and not report.updated)
+            if report.updated:
+                reset_models()
+                refresh_table()
+        except Exception as ex:
+            set_status(f"Erro ao completar endereços: {ex}", error=True)
+        finally:
+            enrich_btn.disabled = False
+            enrich_progress.visible = False
+            batcher.update()
+
+    def show_duplicates(report):
+        groups = []
+        for n, group in enumerate(report.groups[:DUPLICATE_GROUPS_SHOWN], start=1):
+            groups.append(ft.Text(f"Grupo {n}", weight=ft.FontWeight.BOLD))
+            groups.extend(
+                ft.Text(f"{u.text('nome')} — {u.text('email')} — {u.text('telefone')} — CEP {u.text('cep')}", selectable=True)
+                for u in group
+            )
+        if len(report.groups) > DUPLICATE_GROUPS_SHOWN:
+            groups.append(ft.Text(f"... e mais {len(report.groups) - DUPLICATE_GROUPS_SHOWN} grupo(s)."))
+
+        @event
+        def close_report(_):
+            page.pop_dialog()
+
+        dlg = ft.AlertDialog(
+            title=ft.Text("Possíveis duplicados"),
+            content=ft.Column(
+                [ft.Text(report.summary()), ft.ListView(controls=groups, spacing=4, height=400, width=640)],
+                tight=True,
+            ),
+            actions=[ft.TextButton("Fechar", on_click=close_report)],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        page.show_dialog(dlg)
+
+    @event
+    async def on_dedup_click(e: ft.ControlEvent):
+        dedup_btn.disabled = True
+        set_status("Procurando cadastros duplicados...")
+        batcher.flush()
+        try:
+            await asyncio.to_thread(writes.flush)
+            report = await asyncio.to_thread(find_duplicates, repo)
+            set_status(report.summary())
+            if report.groups:
+                show_duplicates(report)
+        except Exception as ex:
+            set_status(f"Erro ao procurar duplicados: {ex}", error=True)
+        finally:
+            dedup_btn.disabled = False
+            batcher.update()
+
+    # ===== Diagnóstico (tempos por operação, para achar o que está lento) =====
+    diag_table = ft.DataTable(
+        columns=[
+            ft.DataColumn(ft.Text("Operação")),
+            ft.DataColumn(ft.Text("Vezes"), numeric=True),
+            ft.DataColumn(ft.Text("p50 (ms)"), numeric=True),
+            ft.DataColumn(ft.Text("p95 (ms)"), numeric=True),
+            ft.DataColumn(ft.Text("Máx. (ms)"), numeric=True),
+        ],
+        rows=[],
+        heading_row_height=36,
+        data_row_min_height=32,
+        data_row_max_height=36,
+    )
+    diag_refresh_btn = ft.TextButton("Atualizar", icon=ft.Icons.REFRESH)
+    diag_reset_btn = ft.TextButton("Zerar", icon=ft.Icons.RESTART_ALT)
+    diag_dump_btn = ft.TextButton("Salvar JSON", icon=ft.Icons.SAVE_ALT)
+    diag_updates = ft.Text("", size=12)  # envios de tela (UpdateBatcher)
+    vacuum_btn = ft.TextButton(
+        "Remover excluídos",
+        icon=ft.Icons.DELETE_SWEEP,
+        tooltip="Tira da planilha, de vez, os cadastros excluídos (não dá mais para desfazer)",
+    )
+
+    def show_diagnostics():
+        diag_table.rows = [
+            ft.DataRow(
+                cells=[
+                    ft.DataCell(ft.Text(name)),
+                    ft.DataCell(ft.Text(str(op["count"]))),
+                    ft.DataCell(ft.Text(f"{op['p50_ms']:.1f}")),
+                    ft.DataCell(ft.Text(f"{op['p95_ms']:.1f}")),
+                    ft.DataCell(ft.Text(f"{op['max_ms']:.1f}")),
+                ]
+            )
+            for name, op in timings.summary().items()
+        ]
+        stats = dict(batcher.stats)
+        diag_updates.value = (
+            f"Envios de tela: {stats['updates']} em {stats['events']} evento(s); "
+            f"no último evento: {stats['last_event_updates']}, máx. por evento: {stats['max_event_updates']}"
+        )
+        batcher.update()
+
+    @batcher.event
+    def on_diag_refresh(e: ft.ControlEvent):
+        show_diagnostics()
+
+    @batcher.event
+    def on_diag_reset(e: ft.ControlEvent):
+        timings.reset()
+        show_diagnostics()
+
+    @batcher.event
+    async def on_diag_dump(e: ft.ControlEvent):
+        path = await import_picker.save_file(
+            dialog_title="Salvar tempos",
+            file_name="diagnostico.json",
+            allowed_extensions=["json"],
+        )
+        if not path:
+            return
+        try:
+            timings.dump(path)
+            set_status(f"Tempos salvos em {path}.")
+        except Exception as ex:
+            set_status(f"Erro ao salvar tempos: {ex}", error=True)
+
+    @batcher.event
+    def on_vacuum(e: ft.ControlEvent):
+        def done(removed: int):
+            set_status(f"{removed} cadastro(s) excluído(s) removido(s) de vez.")
+
+        def failed(ex: Exception):
+            set_status(f"Erro ao remover excluídos: {ex}", error=True)
+
+        writes.submit(repo.vacuum, on_done=done, on_error=failed)
+        set_status("Removendo excluídos...")
+
+    diag_refresh_btn.on_click = on_diag_refresh
+    diag_reset_btn.on_click = on_diag_reset
+    diag_dump_btn.on_click = on_diag_dump
+    vacuum_btn.on_click = on_vacuum
+
+    diag_panel = ft.ExpansionTile(
+        title=ft.Text("Diagnóstico"),
+        subtitle=ft.Text("Tempos por operação: planilha, ViaCEP e tela"),
+        controls=[ft.Row([diag_refresh_btn, diag_reset_btn, diag_dump_btn, vacuum_btn], spacing=8), diag_updates, diag_table],
+        on_change=on_diag_refresh,  # ao abrir, mostra os números atuais
+    )
+
     save_btn.on_click = on_save_new
     update_btn.on_click = on_update_selected
     delete_btn.on_click = on_delete_selected
     refresh_btn.on_click = on_refresh_click
+    import_btn.on_click = on_import_click
+    export_btn.on_click = on_export_click
+    enrich_btn.on_click = on_enrich_click
+    dedup_btn.on_click = on_dedup_click
+
+    # até o cadastro abrir, só o formulário responde
+    data_controls = [
+        save_btn, refresh_btn, import_btn, export_btn, enrich_btn, dedup_btn,
+        search_field, clear_search_btn, page_size_dd, prev_page_btn, next_page_btn, jump_field, vacuum_btn,
+    ]
+    for c in data_controls:
+        c.disabled = True
+    page_info.value = "Carregando cadastros..."
 
-    # Primeira carga
-    refresh_table()
+    async def open_repo():
+        """Primeira carga: a janela já está na tela; a leitura da planilha acontece fora do loop."""
+        nonlocal repo, writes
+        try:
+            with timed("ui.abrir_cadastro"):
+                repo = await asyncio.to_thread(create_repo)
+        except Exception as ex:
+            with batcher.batch():
+                page_info.value = ""
+                set_status(f"Erro ao abrir os cadastros: {ex}", error=True)
+            return
+
+        writes = WriteQueue(
+            repo,
+            dispatch=lambda fn, *args: page.run_task(in_page, fn, *args),
+            on_error=lambda ex: set_status(f"Erro ao gravar a planilha: {ex}", error=True),
+        )
+        with batcher.batch():
+            for c in data_controls:
+                c.disabled = False
+            refresh_table()
+        start_models()  # busca e duplicados ficam prontos em segundo plano
 
     page.add(
         ft.Column(
@@ -321,18 +1085,27 @@ def build_ui(page: ft.Page):
                 ft.Row([logradouro], spacing=12),
                 ft.Row([bairro, cidade], spacing=12),
                 ft.Row([complemento], spacing=12),
-                ft.Row([save_btn, update_btn, delete_btn, refresh_btn], spacing=12),
+                ft.Row([save_btn, update_btn, delete_btn, refresh_btn, import_btn, export_btn], spacing=12, wrap=True),
+                ft.Row([enrich_btn, dedup_btn, enrich_progress], spacing=12),
                 ft.Divider(),
                 status,
                 ft.Divider(),
                 ft.Text("Cadastros salvos", size=18, weight=ft.FontWeight.BOLD),
+                ft.Row([search_field, clear_search_btn], spacing=12),
+                ft.Row(
+                    [page_size_dd, prev_page_btn, page_info, next_page_btn, jump_field],
+                    spacing=12,
+                    vertical_alignment=ft.CrossAxisAlignment.CENTER,
+                ),
                 ft.Container(
                     content=ft.Column([table], scroll=ft.ScrollMode.AUTO),
                     border=ft.border.all(1, ft.Colors.OUTLINE),
                     padding=8,
                     border_radius=10,
                 ),
+                diag_panel,
             ],
             spacing=10,
         )
     )
+    page.run_task(open_repo)
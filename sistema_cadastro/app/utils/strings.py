@@ -1,4 +1,13 @@
 import re
+import unicodedata
 
 def only_digits (text: str) -> str:
-    return re.sub (r"\D", "", text or "") # somente aspas duplas
\ No newline at end of file
+    return re.sub (r"\D", "", text or "") # somente aspas duplas
+
+def normalize_text (text: str) -> str:
+    # sem acentos, minúsculo e com espaços simples: "  José  da Silva" -> "jose da silva"
+    text = str(text or "")
+    if not text.isascii():  # sem acento não há o que decompor (caso mais comum)
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
@@ -0,0 +1,117 @@
+import functools
+import inspect
+import json
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+def _percentile(samples: list[float], p: float) -> float:
+    """Percentil por posição (samples já ordenado)."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, math.ceil(p / 100 * len(samples)) - 1))]
+
+
+class Timings:
+    """
+    Tempos por operação: quantas vezes rodou, total, p50/p95 e máximo.
+    Os percentis usam só as últimas `window` medições de cada operação.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._ops: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            op = self._ops.get(name)
+            if op is None:
+                op = self._ops[name] = {"count": 0, "total": 0.0, "max": 0.0, "samples": deque(maxlen=self.window)}
+            op["count"] += 1
+            op["total"] += seconds
+            op["max"] = max(op["max"], seconds)
+            op["samples"].append(seconds)
+
+    def summary(self) -> dict[str, dict]:
+        """operação -> count, total_ms, p50_ms, p95_ms, max_ms (em ordem alfabética)."""
+        with self._lock:
+            ops = {name: (op["count"], op["total"], op["max"], sorted(op["samples"])) for name, op in self._ops.items()}
+
+        result = {}
+        for name, (count, total, top, samples) in sorted(ops.items()):
+            result[name] = {
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+                "max_ms": round(top * 1000, 3),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"data": datetime.now().isoformat(timespec="seconds"), "operacoes": self.summary()},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+# registro usado por todo o app (painel de diagnóstico)
+timings = Timings()
+
+
+class _Timer:
+    def __init__(self, name: str, registry: Timings):
+        self.name = name
+        self.registry = registry
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record(self.name, time.perf_counter() - self._start)
+
+    def __call__(self, fn):
+        name, registry = self.name, self.registry
+
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    registry.record(name, time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.record(name, time.perf_counter() - start)
+
+        return wrapper
+
+
+def timed(name: str, registry: Timings | None = None) -> _Timer:
+    """
+    Mede um trecho (with timed("excel.gravar"): ...) ou uma função, síncrona
+    ou async (@timed("viacep.http")). Conta também as chamadas que falharam.
+    """
+    return _Timer(name, registry or timings)
@@ -0,0 +1,86 @@
+import contextvars
+import functools
+import inspect
+import threading
+from contextlib import contextmanager
+
+from app.utils.timing import timed
+
+
+class UpdateBatcher:
+    """
+    Junta os page.update() de um mesmo evento num único envio para o cliente.
+
+    Dentro de batch() (ou de um handler decorado com @batcher.event), update()
+    só marca que a tela mudou; o envio acontece uma vez, ao final do evento.
+    flush() envia na hora (ex.: mostrar "Importando..." antes de um await longo).
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._current = contextvars.ContextVar("update_batch", default=None)
+        self._lock = threading.Lock()
+        self.stats = {"events": 0, "updates": 0, "last_event_updates": 0, "max_event_updates": 0}
+
+    def _open_batch(self) -> dict | None:
+        state = self._current.get()
+        # tarefas/threads criadas durante um evento herdam o contexto dele;
+        # depois que o evento terminou, esse lote não vale mais
+        return state if state is not None and not state["closed"] else None
+
+    def _send(self, state: dict | None):
+        with timed("ui.page.update"):
+            self.page.update()
+        with self._lock:
+            self.stats["updates"] += 1
+            if state is not None:
+                state["sent"] += 1
+                state["dirty"] = False
+
+    def update(self):
+        state = self._open_batch()
+        if state is not None:
+            state["dirty"] = True
+        else:
+            self._send(None)
+
+    def flush(self):
+        self._send(self._open_batch())
+
+    @contextmanager
+    def batch(self):
+        if self._open_batch() is not None:
+            yield  # já dentro de um lote: junta-se a ele
+            return
+
+        state = {"dirty": False, "sent": 0, "closed": False}
+        token = self._current.set(state)
+        try:
+            yield
+        finally:
+            if state["dirty"]:
+                self._send(state)
+            state["closed"] = True
+            self._current.reset(token)
+            with self._lock:
+                self.stats["events"] += 1
+                self.stats["last_event_updates"] = state["sent"]
+                self.stats["max_event_updates"] = max(self.stats["max_event_updates"], state["sent"])
+
+    def event(self, handler):
+        """Decorador para handlers (síncronos ou async): um único envio por evento."""
+        if inspect.iscoroutinefunction(handler):
+
+            @functools.wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                with self.batch():
+                    return await handler(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            with self.batch():
+                return handler(*args, **kwargs)
+
+        return wrapper
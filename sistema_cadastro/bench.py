@@ -0,0 +1,332 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import flet as ft
+
+from app.repositories.excel_repo import HEADERS, ExcelRepo, _to_user
+from app.services.cadastro_service import build_row
+from app.services.dedup_service import DuplicateIndex
+from app.services.viacep_service import CepCache, ViaCepClient, fetch_address_from_viacep, set_offline_db
+from app.ui import user_cells
+
+NOMES = ["José", "Maria", "João", "Ana", "Conceição", "Luís", "Márcia", "Pedro", "Antônio", "Beatriz"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Araújo", "Conceição", "Lima", "Gonçalves", "Pereira"]
+CIDADES = [("Manaus", "AM"), ("São Paulo", "SP"), ("Belém", "PA"), ("Brasília", "DF"), ("Goiânia", "GO")]
+
+
+def fake_rows(n: int, seed: int = 42) -> list[list]:
+    """Cadastros sintéticos (sempre os mesmos para o mesmo seed), no formato do repositório."""
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(n):
+        cidade, uf = rnd.choice(CIDADES)
+        data = {
+            "nome": f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {i}",
+            "email": f"pessoa{i}@exemplo.com",
+            "telefone": f"(92) 9{rnd.randrange(10**8):08d}",
+            "cep": f"{69000000 + rnd.randrange(5000):08d}",
+            "logradouro": "Rua Teste",
+            "bairro": "Centro",
+            "cidade": cidade,
+            "uf": uf,
+            "numero": str(rnd.randrange(1, 2000)),
+            "complemento": "",
+        }
+        rows.append(build_row(data, data_hora=(start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")))
+    return rows
+
+
+class Bench:
+    """
+    Junta as medições: nome@linhas -> tempo total, operações e ms por operação.
+    Medições sem efeito colateral (repeat > 1) guardam o melhor tempo, que
+    varia menos entre execuções.
+    """
+
+    def __init__(self, repeat: int = 3, verbose: bool = True):
+        self.results: dict[str, dict] = {}
+        self.repeat = max(1, repeat)
+        self.verbose = verbose
+
+    def measure(self, name: str, rows: int, fn, ops: int = 1, repeat: int = 1):
+        seconds = None
+        for _ in range(repeat):
+            t = time.perf_counter()
+            value = fn()
+            elapsed = time.perf_counter() - t
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+        key = f"{name}@{rows}"
+        self.results[key] = {
+            "name": name,
+            "rows": rows,
+            "ops": ops,
+            "seconds": round(seconds, 6),
+            "per_op_ms": round(seconds * 1000 / max(1, ops), 4),
+        }
+        if self.verbose:
+            print(f"{key:<40} {seconds * 1000:>11.1f} ms  ({self.results[key]['per_op_ms']} ms/op)")
+        return value
+
+
+# ===== Repositório =====
+
+def bench_repo(bench: Bench, n: int, workdir: str, ops: int) -> ExcelRepo:
+    path = os.path.join(workdir, f"bench_{n}.xlsx")
+    rows = fake_rows(n)
+
+    repo = ExcelRepo(path)
+    bench.measure("excel.append_users", n, lambda: repo.append_users(rows), ops=n)
+    repo.close()
+
+    # abertura lendo o .xlsx (como na primeira execução) e pelo snapshot binário
+    bench.measure("excel.abrir_sem_snapshot", n, lambda: ExcelRepo(path, snapshot=False))
+
+    # sem compactação automática: append/update/delete medem só o journal e
+    # a gravação do .xlsx inteiro aparece separada, em excel.compact
+    repo = bench.measure("excel.abrir", n, lambda: ExcelRepo(path, compact_every=10**9))
+    bench.measure("excel.count_users", n, repo.count_users)
+    bench.measure(
+        "excel.iter_users.primeira_pagina", n,
+        lambda: [list(repo.iter_users(limit=50)) for _ in range(ops)], ops=ops, repeat=bench.repeat,
+    )
+    bench.measure(
+        "excel.iter_users.ultima_pagina", n,
+        lambda: [list(repo.iter_users(offset=max(0, n - 50), limit=50)) for _ in range(ops)], ops=ops,
+        repeat=bench.repeat,
+    )
+    bench.measure("excel.list_users", n, repo.list_users, repeat=bench.repeat)
+
+    extra = fake_rows(ops, seed=7)
+    for i, row in enumerate(extra):
+        row[2] = f"extra{i}@exemplo.com"  # não colide com os e-mails já gravados
+    # aberto pelo snapshot, a primeira gravação ainda precisa ler o .xlsx de verdade
+    first, *extra = extra
+    bench.measure("excel.primeira_gravacao", n, lambda: repo.append_user(first))
+    bench.measure("excel.append_user", n, lambda: [repo.append_user(r) for r in extra], ops=len(extra))
+
+    rnd = random.Random(1)
+    keys = rnd.sample(range(1, n + 1), min(ops, n))
+
+    def update_all():
+        for key in keys:
+            user = repo.get_user(key)
+            row = [user[h] for h in HEADERS]
+            row[1] += " (editado)"
+            repo.update_user(key, row, expected_version=user.version)
+
+    bench.measure("excel.update_user", n, update_all, ops=len(keys))
+    bench.measure("excel.delete_user", n, lambda: [repo.delete_user(k) for k in keys], ops=len(keys))
+    bench.measure("excel.compact", n, repo.compact)
+    return repo
+
+
+# ===== ViaCEP (servidor local) =====
+
+class _StubViaCep(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        cep = self.path.strip("/").split("/")[-2]
+        body = json.dumps(
+            {"cep": cep, "logradouro": f"Rua {cep}", "bairro": "Centro", "localidade": "Manaus", "uf": "AM"}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def bench_cep(bench: Bench, count: int, latency: float, workdir: str):
+    _StubViaCep.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubViaCep)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ViaCepClient(base_url=f"http://127.0.0.1:{server.server_port}/ws", retries=0)
+    set_offline_db(None)  # mede só cache + HTTP
+
+    try:
+        ceps = [f"{69000000 + i:08d}" for i in range(count)]
+        db_path = os.path.join(workdir, "bench_viacep.db")
+        cache = CepCache(db_path=db_path)
+
+        def fetch_all(c):
+            for cep in ceps:
+                fetch_address_from_viacep(cep, cache=c, client=client)
+
+        bench.measure("cep.frio", count, lambda: fetch_all(cache), ops=count)
+        bench.measure("cep.quente_memoria", count, lambda: fetch_all(cache), ops=count, repeat=bench.repeat)
+        bench.measure("cep.quente_disco", count, lambda: fetch_all(CepCache(db_path=db_path)), ops=count)
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+# ===== Tabela (o trabalho de refresh_table) =====
+
+def bench_table(bench: Bench, repo: ExcelRepo, n: int, ops: int):
+    def build_page(size: int):
+        return [ft.DataRow(data=u, cells=user_cells(u)) for u in repo.iter_users(limit=size)]
+
+    for size in (50, 200):
+        bench.measure(
+            f"tabela.pagina_{size}", n, lambda: [build_page(size) for _ in range(ops)], ops=ops, repeat=bench.repeat
+        )
+    # como era antes da paginação: uma linha por cadastro
+    bench.measure("tabela.todas_as_linhas", n, lambda: build_page(None), repeat=bench.repeat)
+
+
+# ===== Duplicados (blocos em vez de todos contra todos) =====
+
+def bench_dedup(bench: Bench, repo: ExcelRepo, n: int, ops: int):
+    index = DuplicateIndex()
+    bench.measure("duplicados.indexar", n, lambda: index.load(repo.iter_users(newest_first=False)))
+    probes = [{"nome": u.nome.upper(), "email": "novo@exemplo.com", "telefone": u.telefone, "cep": u.cep}
+              for u in repo.iter_users(limit=ops)]
+    bench.measure(
+        "duplicados.verificar", n, lambda: [index.matches(p) for p in probes], ops=len(probes), repeat=bench.repeat
+    )
+    bench.measure("duplicados.relatorio", n, index.groups)
+
+
+# ===== Memória (um objeto por cadastro lido) =====
+
+def _allocated(build) -> tuple[int, float]:
+    """Bytes que continuam alocados depois de build() e o tempo que ele levou."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        t = time.perf_counter()
+        objs = build()
+        elapsed = time.perf_counter() - t
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objs
+    return size, elapsed
+
+
+def bench_memory(n: int) -> dict:
+    """
+    n cadastros como o repositório devolve (UserRecord) e como eram antes (um
+    dict com 11 campos + _excel_row/_version). Os valores já existem antes da
+    medição: conta só o que cada formato acrescenta.
+    """
+    values = [row + [i, 1] for i, row in enumerate(fake_rows(n), start=1)]
+    dict_keys = (*HEADERS, "_excel_row", "_version")
+    dict_bytes, dict_s = _allocated(lambda: [dict(zip(dict_keys, v)) for v in values])
+    record_bytes, record_s = _allocated(lambda: [_to_user(v) for v in values])
+    result = {
+        "rows": n,
+        "dict_bytes": dict_bytes,
+        "record_bytes": record_bytes,
+        "dict_bytes_por_cadastro": round(dict_bytes / n, 1),
+        "record_bytes_por_cadastro": round(record_bytes / n, 1),
+        "economia": round(1 - record_bytes / dict_bytes, 3),
+        "record_ms": round(record_s * 1000, 1),
+    }
+    print(
+        f"memória@{n}: dict {dict_bytes / 2**20:.1f} MiB ({result['dict_bytes_por_cadastro']} B/cadastro) -> "
+        f"UserRecord {record_bytes / 2**20:.1f} MiB ({result['record_bytes_por_cadastro']} B/cadastro), "
+        f"{result['economia']:.0%} menos"
+    )
+    return result
+
+
+# ===== Relatório =====
+
+def compare(results: dict, base_path: str, threshold: float) -> int:
+    """Mostra a razão atual/base de cada medição. Retorna quantas pioraram além do limite."""
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+
+    worse = 0
+    print(f"\nComparação com {base_path} (razão = atual / base):")
+    for key, cur in results.items():
+        old = base.get(key)
+        if old is None or not old["per_op_ms"]:
+            continue
+        ratio = cur["per_op_ms"] / old["per_op_ms"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- piorou"
+            worse += 1
+        print(f"{key:<40} {old['per_op_ms']:>10} -> {cur['per_op_ms']:<10} x{ratio:.2f}{flag}")
+    return worse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede repositório, consulta de CEP e montagem da tabela.")
+    parser.add_argument(
+        "--tamanhos", default="1000,10000",
+        help="quantidades de cadastros separadas por vírgula (padrão: 1000,10000; ex.: 1000,10000,100000)",
+    )
+    parser.add_argument("--ops", type=int, default=50, help="repetições das operações unitárias (padrão: 50)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="leituras são medidas N vezes; vale a melhor (padrão: 3)")
+    parser.add_argument("--ceps", type=int, default=200, help="CEPs distintos consultados (padrão: 200)")
+    parser.add_argument("--latencia", type=float, default=0.02, help="atraso do servidor de CEP local, em segundos")
+    parser.add_argument(
+        "--memoria", type=int, default=100000, help="cadastros na comparação de memória dict x UserRecord (0 desliga)"
+    )
+    parser.add_argument("--saida", default="bench.json", help="relatório JSON (padrão: bench.json)")
+    parser.add_argument("--comparar", help="relatório anterior para comparar")
+    parser.add_argument("--limite", type=float, default=1.2, help="razão a partir da qual conta como piora (padrão: 1.2)")
+    parser.add_argument("--rotulo", default="", help="identifica esta execução no relatório (ex.: versão)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.tamanhos.split(",") if s.strip()]
+    bench = Bench(repeat=args.repeticoes)
+    workdir = tempfile.mkdtemp(prefix="bench_cadastro_")
+    try:
+        for n in sizes:
+            repo = bench_repo(bench, n, workdir, args.ops)
+            bench_table(bench, repo, n, args.ops)
+            bench_dedup(bench, repo, n, args.ops)
+            repo.close()
+        bench_cep(bench, args.ceps, args.latencia, workdir)
+        memory = bench_memory(args.memoria) if args.memoria > 0 else None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "rotulo": args.rotulo,
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "tamanhos": sizes,
+            "ops": args.ops,
+            "repeticoes": args.repeticoes,
+            "ceps": args.ceps,
+            "latencia": args.latencia,
+        },
+        "results": bench.results,
+        "memoria": memory,
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nRelatório gravado em {args.saida}")
+
+    if args.comparar:
+        worse = compare(bench.results, args.comparar, args.limite)
+        raise SystemExit(1 if worse else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# rodar os testes a partir desta pasta: `python -m pytest` (o pacote app fica no sys.path)
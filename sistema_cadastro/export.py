@@ -0,0 +1,31 @@
+import argparse
+
+from app.repositories.excel_repo import HEADERS, ExcelRepo
+from app.repositories.factory import create_repo
+from app.services.export_service import export_users
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta os cadastros para CSV ou XLSX.")
+    parser.add_argument("saida", help="arquivo de saída (.csv ou .xlsx)")
+    parser.add_argument("--colunas", help=f"colunas separadas por vírgula (padrão: todas). Opções: {', '.join(HEADERS)}")
+    parser.add_argument("--uf", help="exporta só esta UF")
+    parser.add_argument("--de", dest="date_from", help="data_hora inicial, AAAA-MM-DD (inclusive)")
+    parser.add_argument("--ate", dest="date_to", help="data_hora final, AAAA-MM-DD (inclusive)")
+    parser.add_argument("--backend", help="excel ou sqlite (padrão: CADASTRO_BACKEND ou excel)")
+    args = parser.parse_args(argv)
+
+    columns = [c.strip() for c in args.colunas.split(",")] if args.colunas else None
+    repo = create_repo(args.backend, cached=False)
+    if isinstance(repo, ExcelRepo):
+        # o que está no journal vai para o .xlsx antes; reaberto sem nada
+        # pendente, a planilha é lida em streaming, sem ficar toda em memória.
+        # Sem vacuum: exportar não apaga o que ainda pode ser desfeito
+        repo.compact(vacuum=False)
+        repo = create_repo(args.backend, cached=False)
+    total = export_users(repo, args.saida, columns=columns, uf=args.uf, date_from=args.date_from, date_to=args.date_to)
+    print(f"{total} cadastro(s) exportado(s) para {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import flet as ft
 
+from app.services.write_queue import flush_all
 from app.ui import build_ui
 
 def main (page: ft.Page):
@@ -7,4 +8,7 @@ def main (page: ft.Page):
 
 
 if __name__ == "__main__":   #são 2 _ em cada
-    ft.app(target=main)
\ No newline at end of file
+    try:
+        ft.app(target=main)
+    finally:
+        flush_all()  # grava o que ainda estiver na fila antes de sair
\ No newline at end of file
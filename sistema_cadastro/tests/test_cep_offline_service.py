@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from app.services import cep_offline_service
+from app.services.cep_offline_service import OfflineCepDb, build_offline_db, open_offline_db
+
+CSV = (
+    "cep;logradouro;bairro;localidade;uf\n"
+    "69079-000;Rua A;Centro;Manaus;AM\n"
+    "69079-120;Rua B;Japiim;Manaus;AM\n"
+    "01001-000;Praça da Sé;Sé;São Paulo;SP\n"
+    "123;Inválido;;;\n"
+)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "ceps.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return str(path)
+
+
+def test_build_and_lookup(tmp_path, csv_path):
+    bin_path = str(tmp_path / "ceps.bin")
+    assert build_offline_db(csv_path, bin_path) == 3
+
+    db = OfflineCepDb(bin_path)
+    try:
+        assert len(db) == 3
+        assert db.lookup("01001000") == {"logradouro": "Praça da Sé", "bairro": "Sé", "cidade": "São Paulo", "uf": "SP"}
+        assert db.lookup("01001-001") is None
+        assert db.lookup("99999999") is None
+        assert [cep for cep, _ in db.prefix("69079")] == ["69079000", "69079120"]
+        assert [cep for cep, _ in db.prefix("6907", limit=1)] == ["69079000"]
+    finally:
+        db.close()
+
+
+def test_open_from_csv_rebuilds_when_csv_is_newer(tmp_path, csv_path):
+    db = open_offline_db(csv_path)
+    assert db.lookup("69079120")["bairro"] == "Japiim"
+    db.close()
+
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("70040-010;Esplanada;Zona Cívica;Brasília;DF\n")
+    later = os.path.getmtime(str(tmp_path / "ceps.bin")) + 10
+    os.utime(csv_path, (later, later))
+
+    db = open_offline_db(csv_path)
+    assert db.lookup("70040010")["uf"] == "DF"
+    db.close()
+
+
+@pytest.mark.parametrize("content", [b"", b"XXXX\x00\x00\x00\x00", b"CEPB\x05\x00\x00\x00"])
+def test_invalid_file_is_rejected_and_closed(tmp_path, monkeypatch, content):
+    path = tmp_path / "ruim.bin"
+    path.write_bytes(content)
+
+    opened = []
+
+    def tracking_open(*args, **kwargs):
+        f = open(*args, **kwargs)
+        opened.append(f)
+        return f
+
+    monkeypatch.setattr(cep_offline_service, "open", tracking_open, raising=False)
+    with pytest.raises(ValueError):
+        OfflineCepDb(str(path))
+    assert opened and all(f.closed for f in opened)
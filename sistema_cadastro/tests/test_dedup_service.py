@@ -0,0 +1,82 @@
+from app.repositories.excel_repo import HEADERS, ExcelRepo, UserRecord
+from app.services.dedup_service import MAX_BLOCK, DuplicateIndex, find_duplicates
+
+
+def user(key: int, nome: str, email: str, cep: str = "", telefone: str = "") -> UserRecord:
+    values = {"nome": nome, "email": email, "cep": cep, "telefone": telefone}
+    return UserRecord([values.get(h, "") for h in HEADERS], key)
+
+
+def keys(matches) -> list[int]:
+    return [m.user.key for m in matches]
+
+
+def test_similar_name_in_shared_block():
+    index = DuplicateIndex()
+    index.load([user(1, "Maria da Silva", "maria@gmail.com"), user(2, "João Souza", "joao@gmail.com")], version=1)
+
+    # mesmo domínio de e-mail: compara; partícula, acento e caixa não contam
+    assert keys(index.matches({"nome": "MARIA SILVA", "email": "msilva@gmail.com"})) == [1]
+    assert index.matches({"nome": "Maria Silva", "email": "m@gmail.com"}, exclude=1) == []
+
+
+def test_records_without_shared_block_are_not_compared():
+    index = DuplicateIndex()
+    index.load([user(1, "Maria Silva", "maria@gmail.com", cep="01001000")], version=1)
+
+    assert index.matches({"nome": "Maria Silva", "email": "maria@empresa.com.br", "cep": "69000000"}) == []
+    assert keys(index.matches({"nome": "Maria Silva", "email": "maria@empresa.com.br", "cep": "01001-000"})) == [1]
+
+
+def test_phone_weighs_in():
+    index = DuplicateIndex()
+    index.load([user(1, "Ana Paula Souza", "ana@x.com", telefone="(92) 98888-7777")], version=1)
+
+    same_phone = index.matches({"nome": "Ana Paula Sousa", "email": "a@x.com", "telefone": "9288887777"})
+    other_phone = index.matches({"nome": "Ana Paula Sousa", "email": "a@x.com", "telefone": "92 3333-2222"})
+    assert same_phone[0].score > (other_phone[0].score if other_phone else 0)
+
+
+def test_large_block_compares_only_neighbours():
+    n = MAX_BLOCK * 3
+    users = [user(i, f"Pessoa {i:04d} Teste", f"p{i}@gmail.com") for i in range(1, n + 1)]
+    users.append(user(n + 1, "Pessoa 0100 Testee", "outra@gmail.com"))  # erro de digitação
+    index = DuplicateIndex(threshold=0.95)
+    index.load(users, version=1)
+
+    counter = [0]
+    pairs = {(a, b) for a, b, _ in index.pairs(counter)}
+    assert (100, n + 1) in pairs
+    assert counter[0] < n * (n - 1) // 2 // 10  # longe de todos com todos
+
+
+def test_changes_keep_index_in_sync():
+    index = DuplicateIndex()
+    index.load([user(1, "Maria Silva", "maria@gmail.com")], version=1)
+    probe = {"nome": "Carlos Lima", "email": "c@gmail.com"}
+
+    index.add(user(2, "Carlos Lima", "carlos@gmail.com"))
+    assert keys(index.matches(probe)) == [2]
+    index.replace(user(2, "Carlos Lima", "carlos@empresa.com.br"))
+    assert index.matches(probe) == []
+    index.remove(1)
+    assert index.matches({"nome": "Maria Silva", "email": "m@gmail.com"}) == []
+    assert len(index) == 1
+
+
+def test_report_groups_chained_matches(tmp_path):
+    repo = ExcelRepo(str(tmp_path / "cadastros.xlsx"))
+
+    def row(nome: str, email: str) -> list:
+        values = {"nome": nome, "email": email}
+        return [values.get(h, "") for h in HEADERS]
+
+    for nome, email in [("Maria Silva", "maria@gmail.com"), ("Maria Silva", "ms@gmail.com"),
+                        ("Maria Silvaa", "m.silva@gmail.com"), ("João Souza", "joao@gmail.com")]:
+        repo.append_user(row(nome, email))
+
+    report = find_duplicates(repo)
+    assert [[u.nome for u in group] for group in report.groups] == [["Maria Silva", "Maria Silva", "Maria Silvaa"]]
+    assert report.records == 4
+    assert report.comparisons == 6  # um bloco só (gmail.com), todos com todos
+    assert "1 grupo(s)" in report.summary()
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from app.repositories.excel_repo import HEADERS, ExcelRepo
+from app.repositories.sqlite_repo import SqliteRepo
+from app.services.enrichment_service import apply_addresses, enrich_addresses, find_incomplete, resolve_ceps
+
+ADDR = {"logradouro": "Praça da Sé", "bairro": "Sé", "cidade": "São Paulo", "uf": "SP"}
+
+
+def make_row(nome: str, cep: str, bairro: str = "") -> list:
+    row = [""] * len(HEADERS)
+    row[HEADERS.index("data_hora")] = "2026-01-01 10:00:00"
+    row[HEADERS.index("nome")] = nome
+    row[HEADERS.index("email")] = f"{nome.lower()}@x.com"
+    row[HEADERS.index("cep")] = cep
+    row[HEADERS.index("bairro")] = bairro
+    return row
+
+
+@pytest.fixture(params=["excel", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "excel":
+        return ExcelRepo(str(tmp_path / "cadastros.xlsx"))
+    return SqliteRepo(str(tmp_path / "cadastros.db"))
+
+
+class FakeFetch:
+    """01001000 existe, 99999999 não, 11111111 falha; registra os CEPs pedidos."""
+
+    def __init__(self):
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def __call__(self, cep):
+        with self._lock:
+            self.requested.append(cep)
+        if cep == "99999999":
+            raise ValueError("CEP não encontrado")
+        if cep == "11111111":
+            raise ConnectionError("sem rede")
+        return dict(ADDR)
+
+
+def test_each_cep_is_fetched_once_and_only_empty_fields_are_filled(repo):
+    repo.append_user(make_row("Ana", "01001000"))
+    repo.append_user(make_row("Bia", "01001-000", bairro="Centro"))
+    repo.append_user(make_row("Caio", "99999999"))
+    repo.append_user(make_row("Dani", "11111111"))
+    repo.append_user(make_row("Eva", "123"))  # CEP inválido: fica de fora
+
+    fetch, progress = FakeFetch(), []
+    report = enrich_addresses(repo, workers=4, per_second=0, progress=lambda d, t: progress.append((d, t)), fetch=fetch)
+
+    assert sorted(fetch.requested) == ["01001000", "11111111", "99999999"]
+    assert (report.records, report.ceps, report.resolved) == (4, 3, 1)
+    assert (report.not_found, report.failed, report.updated) == (1, 1, 2)
+    assert progress[-1] == (3, 3)
+
+    by_name = {u["nome"]: u for u in repo.list_users()}
+    assert by_name["Ana"]["bairro"] == "Sé"
+    assert by_name["Bia"]["bairro"] == "Centro"  # já preenchido: fica
+    assert by_name["Bia"]["cidade"] == "São Paulo"
+    assert by_name["Caio"]["cidade"] == ""
+
+
+def test_records_changed_meanwhile_are_skipped(repo):
+    repo.append_user(make_row("Ana", "01001000"))
+    pending = find_incomplete(repo)
+    addresses, _, _ = resolve_ceps({"01001000"}, per_second=0, fetch=FakeFetch())
+
+    key = next(iter(pending))
+    repo.update_user(key, make_row("Ana", "69000000"))  # CEP trocado enquanto consultava
+    assert apply_addresses(repo, pending, addresses) == 0
+    assert repo.list_users()[0]["cidade"] == ""
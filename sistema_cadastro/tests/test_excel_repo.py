@@ -0,0 +1,286 @@
+import os
+import threading
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from app.repositories.excel_repo import HEADERS, ExcelRepo, UserRecord
+
+
+def make_row(nome: str, email: str) -> list:
+    row = [""] * len(HEADERS)
+    row[HEADERS.index("data_hora")] = "2026-01-01 10:00:00"
+    row[HEADERS.index("nome")] = nome
+    row[HEADERS.index("email")] = email
+    return row
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cadastros.xlsx")
+
+
+def names(repo) -> list[str]:
+    return [u["nome"] for u in reversed(repo.list_users())]
+
+
+# ===== Planilha em memória =====
+
+def test_cached_repo_sees_its_own_writes(path):
+    repo = ExcelRepo(path)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    repo.append_user(make_row("Bia", "bia@x.com"))
+    assert names(repo) == ["Ana", "Bia"]
+    assert names(ExcelRepo(path, cached=False)) == ["Ana", "Bia"]
+
+
+def test_cached_repo_rereads_external_changes(path):
+    repo = ExcelRepo(path)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    assert names(repo) == ["Ana"]
+
+    wb = load_workbook(path)
+    wb["usuarios"].append(make_row("Bia (fora do app)", "bia@x.com"))
+    wb.save(path)
+
+    assert sorted(names(repo)) == ["Ana", "Bia (fora do app)"]
+
+
+# ===== Journal: reabertura depois de queda =====
+
+def test_replay_after_crash(path):
+    repo = ExcelRepo(path, compact_every=1000)
+    ana = repo.append_user(make_row("Ana", "ana@x.com"))
+    bia = repo.append_user(make_row("Bia", "bia@x.com"))
+    repo.append_user(make_row("Caio", "caio@x.com"))
+    repo.update_user(ana, make_row("Ana Maria", "ana@x.com"))
+    repo.delete_user(bia)
+    # "queda": nada foi compactado para o .xlsx e a última linha do journal ficou pela metade
+    with open(repo.journal_path, "ab") as f:
+        f.write(b'{"op": "append", "row": ["meia')
+    del repo
+
+    reopened = ExcelRepo(path, compact_every=1000)
+    assert names(reopened) == ["Ana Maria", "Caio"]
+
+    # a próxima gravação não emenda na linha cortada
+    reopened.append_user(make_row("Dani", "dani@x.com"))
+    assert names(ExcelRepo(path)) == ["Ana Maria", "Caio", "Dani"]
+
+
+def test_compact_folds_journal_into_xlsx(path):
+    repo = ExcelRepo(path, compact_every=1000)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    assert [r[1] for r in load_workbook(path)["usuarios"].iter_rows(min_row=2, values_only=True)] == []
+
+    repo.compact()
+    assert [r[1] for r in load_workbook(path)["usuarios"].iter_rows(min_row=2, values_only=True)] == ["Ana"]
+    assert os.path.getsize(repo.journal_path) == 0
+    assert names(ExcelRepo(path)) == ["Ana"]
+
+
+def test_other_session_catches_up_from_journal(path):
+    a = ExcelRepo(path, compact_every=1000)
+    b = ExcelRepo(path, compact_every=1000)
+    a.append_user(make_row("Ana", "ana@x.com"))
+    b.append_user(make_row("Bia", "bia@x.com"))
+    assert names(a) == names(b) == ["Ana", "Bia"]
+
+
+def test_reads_do_not_wait_for_the_xlsx_save(path):
+    repo = ExcelRepo(path, compact_every=1000)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    saving, release = threading.Event(), threading.Event()
+    save = repo._wb.save
+
+    def slow_save(target):
+        saving.set()
+        release.wait(5)
+        save(target)
+
+    repo._wb.save = slow_save
+    compact = threading.Thread(target=repo.compact)
+    compact.start()
+    try:
+        assert saving.wait(5)
+        # a gravação está parada no meio: ler não pode ficar esperando por ela
+        reader = threading.Thread(target=lambda: names(repo))
+        reader.start()
+        reader.join(2)
+        assert not reader.is_alive()
+    finally:
+        release.set()
+        compact.join(5)
+    assert names(ExcelRepo(path)) == ["Ana"]
+
+
+# ===== Snapshot =====
+
+def test_reopen_uses_snapshot_until_xlsx_changes(path):
+    repo = ExcelRepo(path, compact_every=1)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    assert os.path.exists(repo.snapshot_path)
+
+    reopened = ExcelRepo(path)
+    assert reopened._wb is None  # aba veio do snapshot
+    assert names(reopened) == ["Ana"]
+
+    wb = load_workbook(path)
+    wb["usuarios"].append(make_row("Bia (fora do app)", "bia@x.com"))
+    wb.save(path)
+
+    # carimbo do .xlsx mudou: o snapshot antigo é ignorado
+    assert names(ExcelRepo(path)) == ["Ana", "Bia (fora do app)"]
+
+
+def test_corrupt_snapshot_falls_back_to_xlsx(path):
+    repo = ExcelRepo(path, compact_every=1)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    with open(repo.snapshot_path, "wb") as f:
+        f.write(b"lixo")
+    assert names(ExcelRepo(path)) == ["Ana"]
+
+
+def test_snapshot_keeps_next_id(path):
+    repo = ExcelRepo(path, compact_every=1)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    bia = repo.append_user(make_row("Bia", "bia@x.com"))
+    repo.delete_user(bia)
+
+    reopened = ExcelRepo(path)
+    assert reopened._wb is None
+    assert reopened.append_user(make_row("Caio", "caio@x.com")) > bia
+
+
+# ===== Ids estáveis =====
+
+def test_sessions_never_share_an_id(path):
+    a = ExcelRepo(path, compact_every=1000)
+    b = ExcelRepo(path, compact_every=1000)
+    keys = [a.append_user(make_row("Ana", "ana@x.com")), b.append_user(make_row("Bia", "bia@x.com")),
+            a.append_user(make_row("Caio", "caio@x.com"))]
+    assert len(set(keys)) == 3
+
+
+def test_ids_are_not_reused_after_reopen(path):
+    repo = ExcelRepo(path, compact_every=1)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    bia = repo.append_user(make_row("Bia", "bia@x.com"))
+    repo.delete_user(bia)  # sai o cadastro de id mais alto
+
+    reopened = ExcelRepo(path)
+    assert reopened.append_user(make_row("Caio", "caio@x.com")) > bia
+
+
+def test_legacy_sheet_gets_ids(path):
+    # planilha de antes das colunas id/versao
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "usuarios"
+    ws.append(HEADERS)
+    ws.append(make_row("Ana", "ana@x.com"))
+    ws.append(make_row("Bia", "bia@x.com"))
+    wb.save(path)
+
+    repo = ExcelRepo(path, cached=False)
+    assert [(u.key, u.version) for u in repo.list_users()] == [(2, 1), (1, 1)]
+    assert repo.append_user(make_row("Caio", "caio@x.com")) == 3
+
+
+def test_user_record_keeps_dict_access(path):
+    repo = ExcelRepo(path)
+    key = repo.append_user(make_row("Ana", "ana@x.com"))
+    user = repo.get_user(key)
+    assert isinstance(user, UserRecord)
+    assert (user.key, user.version) == (key, 1)
+    assert user["nome"] == user.text("nome") == "Ana"
+    assert user.get("_excel_row") == key
+    assert user.get("inexistente", "-") == "-"
+    assert dict(user)["email"] == "ana@x.com"
+    assert user["cep"] == ""  # célula vazia vira texto vazio
+
+
+# ===== Exclusão lógica =====
+
+def test_delete_and_restore_survive_replay(path):
+    repo = ExcelRepo(path, compact_every=1000)
+    ana = repo.append_user(make_row("Ana", "ana@x.com"))
+    bia = repo.append_user(make_row("Bia", "bia@x.com"))
+    repo.delete_user(ana)
+    repo.delete_user(bia)
+    repo.restore_user(bia)
+
+    reopened = ExcelRepo(path, compact_every=1000)
+    assert names(reopened) == ["Bia"]
+    reopened.restore_user(ana)
+    assert names(reopened) == ["Ana", "Bia"]
+
+
+def test_id_not_reused_after_vacuum_and_reopen(path):
+    repo = ExcelRepo(path)
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    newest = repo.append_user(make_row("Bia", "bia@x.com"))
+    repo.delete_user(newest)
+    assert repo.vacuum() == 1
+
+    # na mesma sessão, depois do vacuum...
+    assert repo.append_user(make_row("Caio", "caio@x.com")) > newest
+    # ...e numa nova abertura, pelo .xlsx e pelo snapshot
+    repo.compact()
+    for snapshot in (False, True):
+        assert ExcelRepo(path, snapshot=snapshot).append_user(make_row(f"Dan {snapshot}", f"dan{snapshot}@x.com")) > newest + 1
+
+
+def test_id_not_reused_after_undo_window_vacuum(path):
+    repo = ExcelRepo(path, undo_window=0)
+    newest = repo.append_user(make_row("Ana", "ana@x.com"))
+    repo.delete_user(newest)
+    repo.compact()  # remove de vez o que passou da janela de desfazer
+    assert repo.vacuum() == 0
+    assert repo.append_user(make_row("Bia", "bia@x.com")) > newest
+
+
+def test_compact_without_vacuum_keeps_undo(path):
+    repo = ExcelRepo(path, undo_window=0)
+    ana = repo.append_user(make_row("Ana", "ana@x.com"))
+    repo.delete_user(ana)
+    repo.compact(vacuum=False)  # como no export.py
+    repo.restore_user(ana)
+    assert names(ExcelRepo(path)) == ["Ana"]
+
+
+# ===== Leitura paginada =====
+
+def test_streaming_page_matches_resident(path):
+    repo = ExcelRepo(path, compact_every=1)
+    for i in range(5):
+        repo.append_user(make_row(f"U{i}", f"u{i}@x.com"))
+    streaming = ExcelRepo(path, cached=False)
+    assert streaming._streaming()
+    assert streaming._wb is None  # a abertura não carregou a planilha
+    assert [u["nome"] for u in streaming.iter_users(offset=1, limit=2)] == ["U3", "U2"]
+    assert streaming.count_users() == repo.count_users() == 5
+
+
+def test_update_clears_cells(path):
+    repo = ExcelRepo(path)
+    key = repo.append_user(make_row("Ana", "ana@x.com"))
+    row = make_row("Ana", "ana@x.com")
+    row[HEADERS.index("email")] = None
+    repo.update_user(key, row)
+    assert ExcelRepo(path).list_users()[0]["email"] == ""
+
+
+# ===== E-mail único =====
+
+def test_shared_email_stays_editable(path):
+    # planilha antiga em que dois cadastros já dividem um e-mail
+    ExcelRepo(path)
+    wb = load_workbook(path)
+    wb["usuarios"].append(make_row("Ana", "ana@x.com"))
+    wb["usuarios"].append(make_row("Ana 2", "ana@x.com"))
+    wb.save(path)
+
+    repo = ExcelRepo(path)
+    repo.update_user(2, make_row("Ana Dois", "ana@x.com"))  # linhas sem id ganham um na ordem da planilha
+    assert names(repo) == ["Ana", "Ana Dois"]
@@ -0,0 +1,61 @@
+import csv
+
+import pytest
+from openpyxl import load_workbook
+
+import export
+from app.repositories.excel_repo import HEADERS, ExcelRepo
+from app.services.export_service import export_users
+from app.services.import_service import import_users
+
+
+def make_row(nome: str, email: str, uf: str = "SP", data_hora: str = "2026-01-01 10:00:00") -> list:
+    row = [""] * len(HEADERS)
+    row[HEADERS.index("data_hora")] = data_hora
+    row[HEADERS.index("nome")] = nome
+    row[HEADERS.index("email")] = email
+    row[HEADERS.index("cep")] = "01001000"
+    row[HEADERS.index("uf")] = uf
+    row[HEADERS.index("numero")] = "1"
+    return row
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = ExcelRepo(str(tmp_path / "cadastros.xlsx"))
+    repo.append_user(make_row("Ana", "ana@x.com", "SP", "2026-01-10 08:00:00"))
+    repo.append_user(make_row("Bia", "bia@x.com", "AM", "2026-02-01 09:00:00"))
+    repo.append_user(make_row("Caio", "caio@x.com", "AM", "2026-03-05 10:00:00"))
+    return repo
+
+
+@pytest.mark.parametrize("ext", ["csv", "xlsx"])
+def test_round_trip_through_import(tmp_path, repo, ext):
+    path = str(tmp_path / f"dump.{ext}")
+    assert export_users(repo, path) == 3
+
+    other = ExcelRepo(str(tmp_path / "outro.xlsx"))
+    assert import_users(other, path).imported == 3
+    strip = lambda users: [{h: str(u[h]) for h in HEADERS} for u in users]  # noqa: E731
+    assert strip(other.list_users()) == strip(repo.list_users())
+
+
+def test_columns_and_filters(tmp_path, repo):
+    path = str(tmp_path / "dump.csv")
+    total = export_users(repo, path, columns=["nome", "uf"], uf="am", date_from="2026-02-01", date_to="2026-02-28")
+    assert total == 1
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        assert list(csv.reader(f)) == [["nome", "uf"], ["Bia", "AM"]]
+
+    with pytest.raises(ValueError):
+        export_users(repo, path, columns=["nome", "senha"])
+
+
+def test_cli_includes_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    repo = ExcelRepo("cadastros.xlsx", compact_every=1000)
+    repo.append_user(make_row("Ana", "ana@x.com"))  # só no journal
+
+    export.main(["dump.xlsx", "--colunas", "nome,email", "--backend", "excel"])
+    rows = list(load_workbook("dump.xlsx")["usuarios"].iter_rows(values_only=True))
+    assert rows == [("nome", "email"), ("Ana", "ana@x.com")]
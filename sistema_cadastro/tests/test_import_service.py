@@ -0,0 +1,61 @@
+import pytest
+from openpyxl import Workbook
+
+from app.repositories.excel_repo import ExcelRepo
+from app.services.import_service import import_users
+
+
+@pytest.fixture
+def repo(tmp_path):
+    return ExcelRepo(str(tmp_path / "cadastros.xlsx"))
+
+
+def write_csv(tmp_path, text: str) -> str:
+    path = tmp_path / "entrada.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_csv_with_loose_headers(tmp_path, repo):
+    repo.append_user(["2026-01-01 10:00:00", "Zé", "ze@x.com", "", "01001000", "", "", "", "", "1", ""])
+    path = write_csv(
+        tmp_path,
+        "Nome;E-mail;CEP;Número;UF;Data/Hora\n"
+        "Ana;ana@x.com;01001-000;10;sp;2025-05-06 07:08:09\n"
+        "Bia;bia@x.com;123;20;rj;\n"  # CEP inválido
+        "Caio;ZE@x.com;01001000;30;mg;\n"  # e-mail já no repositório
+        "Dani;ana@x.com;01001000;40;ba;\n"  # e-mail repetido no arquivo
+        ";;;;;\n",
+    )
+
+    report = import_users(repo, path)
+    assert report.imported == 1
+    assert [line for line, _ in report.errors] == [3, 4, 5]
+
+    ana = repo.find_by_email("ana@x.com")
+    assert (ana["cep"], ana["uf"], ana["numero"]) == ("01001000", "SP", "10")
+    assert ana["data_hora"] == "2025-05-06 07:08:09"
+
+
+def test_invalid_data_hora_falls_back_to_now(tmp_path, repo):
+    path = write_csv(tmp_path, "nome,email,cep,numero,data_hora\nAna,ana@x.com,01001000,1,06/05/2025\n")
+    import_users(repo, path)
+    data_hora = repo.find_by_email("ana@x.com")["data_hora"]
+    assert data_hora != "06/05/2025"
+    assert len(data_hora) == len("2026-01-01 10:00:00")
+
+
+def test_xlsx_import(tmp_path, repo):
+    path = str(tmp_path / "entrada.xlsx")
+    wb = Workbook()
+    wb.active.append(["nome", "email", "cep", "numero"])
+    wb.active.append(["Ana", "ana@x.com", "01001000", 7])
+    wb.save(path)
+
+    assert import_users(repo, path).imported == 1
+    assert repo.find_by_email("ana@x.com")["numero"] == "7"
+
+
+def test_rejects_file_without_required_columns(tmp_path, repo):
+    with pytest.raises(ValueError):
+        import_users(repo, write_csv(tmp_path, "nome,telefone\nAna,123\n"))
@@ -0,0 +1,65 @@
+from app.repositories.excel_repo import HEADERS, UserRecord
+from app.services.search_service import UserSearch
+
+
+def user(key: int, nome: str, **fields) -> UserRecord:
+    values = {"nome": nome, "email": f"{key}@x.com", **fields}
+    return UserRecord([values.get(h, "") for h in HEADERS], key)
+
+
+def make_search() -> UserSearch:
+    search = UserSearch()
+    # mais recentes primeiro, como o repositório entrega
+    search.load(
+        [
+            user(4, "Édson Araújo", cidade="São Paulo", cep="01001000", numero="10"),
+            user(3, "Bia", cidade="Manaus", telefone="(92) 3333-2222", numero="9"),
+            user(2, "Ana", email="joao.silva2@gmail.com", cidade="Manaus", numero="100"),
+            user(1, "Caio", cidade="Belém", telefone="92 98888-7777"),
+        ],
+        version=1,
+    )
+    return search
+
+
+def test_accent_and_case_insensitive_terms():
+    search = make_search()
+    assert search.query("EDSON sao") == [4]
+    assert search.query("manaus") == [3, 2]
+    assert search.query("manaus bia") == [3]
+
+
+def test_formatted_numbers_match_digits():
+    search = make_search()
+    assert search.query("01001-000") == [4]
+    assert search.query("(92) 3333") == [3]
+    # termo com letras não vira só dígitos: o "2" não casa com todo telefone
+    assert search.query("joao.silva2") == [2]
+
+
+def test_refining_a_query_reuses_the_last_result():
+    search = make_search()
+    assert search.query("man") == [3, 2]
+    assert search.query("manaus") == [3, 2]
+    assert search.query("manaus bia") == [3]
+    assert search.query("manaus") == [3, 2]  # apagou um termo: volta a procurar em todos
+
+
+def test_sort_and_changes():
+    search = make_search()
+    assert search.query(sort_field="nome") == [2, 3, 1, 4]
+    assert search.query(sort_field="numero", ascending=False) == [2, 4, 3, 1]  # 9 antes de 10
+
+    search.add(user(5, "Aaron"))
+    assert search.query(sort_field="nome")[0] == 5
+    search.replace(user(3, "Zeca", cidade="Manaus"))
+    assert search.query("manaus", sort_field="nome") == [2, 3]
+    assert search.get(3)["nome"] == "Zeca"
+
+
+def test_remove_keeps_other_keys():
+    search = make_search()
+    search.remove(2)
+    assert search.query() == [4, 3, 1]
+    assert search.query("manaus") == [3]
+    assert search.get(2) is None
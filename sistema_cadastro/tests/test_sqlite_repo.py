@@ -0,0 +1,235 @@
+import os
+
+import pytest
+
+from app.repositories.errors import ConflictError, DuplicateEmailError
+from app.repositories.excel_repo import HEADERS, ExcelRepo
+from app.repositories.sqlite_repo import SqliteRepo, migrate_excel_to_sqlite
+
+
+def make_row(nome: str, email: str) -> list:
+    row = [""] * len(HEADERS)
+    row[HEADERS.index("data_hora")] = "2026-01-01 10:00:00"
+    row[HEADERS.index("nome")] = nome
+    row[HEADERS.index("email")] = email
+    return row
+
+
+def names(repo) -> list[str]:
+    return [u["nome"] for u in reversed(repo.list_users())]
+
+
+@pytest.fixture(params=["excel", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "excel":
+        return ExcelRepo(str(tmp_path / "cadastros.xlsx"))
+    return SqliteRepo(str(tmp_path / "cadastros.db"))
+
+
+# ===== Mesmo comportamento nos dois armazenamentos =====
+
+def test_crud_matches_excel(repo):
+    for nome in ("Ana", "Bia", "Caio"):
+        repo.append_user(make_row(nome, f"{nome.lower()}@x.com"))
+    users = repo.list_users()
+    assert [u["nome"] for u in users] == ["Caio", "Bia", "Ana"]  # mais recentes primeiro
+    assert users[0]["email"] == "caio@x.com"
+
+    by_name = {u["nome"]: u["_excel_row"] for u in users}
+    repo.update_user(by_name["Bia"], make_row("Bia Souza", "bia@x.com"))
+    repo.delete_user(by_name["Ana"])
+    assert names(repo) == ["Bia Souza", "Caio"]
+
+
+# ===== Migração da planilha =====
+
+def test_migration_includes_journal(tmp_path):
+    xlsx, db = str(tmp_path / "c.xlsx"), str(tmp_path / "c.db")
+    excel = ExcelRepo(xlsx, compact_every=1000)
+    excel.append_user(make_row("Ana", "ana@x.com"))
+    excel.compact()
+    excel.append_user(make_row("Bia", "bia@x.com"))  # só no journal
+
+    assert names(migrate_excel_to_sqlite(xlsx, db)) == ["Ana", "Bia"]
+    # já migrado: a planilha não é importada de novo
+    assert names(migrate_excel_to_sqlite(xlsx, db)) == ["Ana", "Bia"]
+
+
+def test_failed_migration_leaves_no_database(tmp_path, monkeypatch):
+    xlsx, db = str(tmp_path / "c.xlsx"), str(tmp_path / "c.db")
+    ExcelRepo(xlsx).append_user(make_row("Ana", "ana@x.com"))
+
+    def boom(self, rows, next_id=1):
+        raise OSError("disco cheio")
+
+    with monkeypatch.context() as m:
+        m.setattr(SqliteRepo, "_copy_rows", boom)
+        with pytest.raises(OSError):
+            migrate_excel_to_sqlite(xlsx, db)
+    assert [f for f in os.listdir(tmp_path) if f.startswith("c.db")] == []
+
+    assert names(migrate_excel_to_sqlite(xlsx, db)) == ["Ana"]
+
+
+def test_migration_keeps_ids_and_versions(tmp_path):
+    xlsx, db = str(tmp_path / "c.xlsx"), str(tmp_path / "c.db")
+    excel = ExcelRepo(xlsx)
+    ana = excel.append_user(make_row("Ana", "ana@x.com"))
+    bia = excel.append_user(make_row("Bia", "bia@x.com"))
+    caio = excel.append_user(make_row("Caio", "caio@x.com"))
+    excel.update_user(bia, make_row("Bia Souza", "bia@x.com"))
+    excel.delete_user(caio)
+
+    repo = migrate_excel_to_sqlite(xlsx, db)
+    assert [(u.key, u.version) for u in repo.list_users()] == [(bia, 2), (ana, 1)]
+    assert repo.append_user(make_row("Dani", "dani@x.com")) > caio  # o id do Caio não volta
+
+
+def test_migration_keeps_deleted_records_restorable(tmp_path):
+    xlsx, db = str(tmp_path / "c.xlsx"), str(tmp_path / "c.db")
+    excel = ExcelRepo(xlsx, compact_every=1000)
+    ana = excel.append_user(make_row("Ana", "ana@x.com"))
+    excel.append_user(make_row("Bia", "bia@x.com"))
+    excel.delete_user(ana)  # só no journal
+
+    repo = migrate_excel_to_sqlite(xlsx, db)
+    assert names(repo) == ["Bia"]
+    repo.restore_user(ana)
+    assert names(repo) == ["Ana", "Bia"]
+
+
+# ===== Paginação =====
+
+def test_pages_and_count(repo):
+    for i in range(7):
+        repo.append_user(make_row(f"U{i}", f"u{i}@x.com"))
+    repo.delete_user(repo.list_users()[-1]["_excel_row"])  # apaga U0
+
+    assert repo.count_users() == 6
+    page = [u["nome"] for u in repo.iter_users(offset=2, limit=3)]
+    assert page == ["U4", "U3", "U2"]
+    oldest = [u["nome"] for u in repo.iter_users(limit=2, newest_first=False)]
+    assert oldest == ["U1", "U2"]
+
+
+# ===== Busca e e-mail único =====
+
+def test_search_and_filter(repo):
+    ana = make_row("Ána Paula", "Ana@X.com")
+    ana[HEADERS.index("cep")] = "01001000"
+    ana[HEADERS.index("cidade")] = "São Paulo"
+    ana[HEADERS.index("uf")] = "SP"
+    repo.append_user(ana)
+    repo.append_user(make_row("Bia", "bia@x.com"))
+
+    assert repo.find_by_email(" ana@x.COM ")["nome"] == "Ána Paula"
+    assert [u["nome"] for u in repo.find_by_cep("01001-000")] == ["Ána Paula"]
+    assert [u["nome"] for u in repo.search("ana")] == ["Ána Paula"]
+    assert [u["nome"] for u in repo.filter(uf="sp", cidade="sao paulo")] == ["Ána Paula"]
+    assert repo.email_exists("bia@x.com")
+
+
+def test_duplicate_email_rejected(repo):
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    repo.append_user(make_row("Bia", "bia@x.com"))
+    with pytest.raises(DuplicateEmailError):
+        repo.append_user(make_row("Outra Ana", "ANA@x.com"))
+
+    bia = repo.list_users()[0]["_excel_row"]
+    with pytest.raises(DuplicateEmailError):
+        repo.update_user(bia, make_row("Bia", "ana@x.com"))
+    repo.update_user(bia, make_row("Bia Souza", "bia@x.com"))  # mesmo e-mail: pode
+    assert names(repo) == ["Ana", "Bia Souza"]
+
+
+def test_shared_email_stays_editable(tmp_path):
+    # cadastros antigos (ou importados em lote) que já dividem um e-mail
+    repo = SqliteRepo(str(tmp_path / "cadastros.db"))
+    repo.append_users([make_row("Ana", "ana@x.com"), make_row("Ana 2", "ana@x.com")])
+    repo.update_user(repo.list_users()[0]["_excel_row"], make_row("Ana Dois", "ana@x.com"))
+    assert names(repo) == ["Ana", "Ana Dois"]
+
+
+# ===== Edição concorrente =====
+
+def test_stale_version_is_rejected(repo):
+    key = repo.append_user(make_row("Ana", "ana@x.com"))
+    version = repo.get_user(key).version
+    repo.update_user(key, make_row("Ana Maria", "ana@x.com"), expected_version=version)  # outra sessão
+
+    with pytest.raises(ConflictError):
+        repo.update_user(key, make_row("Ana Paula", "ana@x.com"), expected_version=version)
+    with pytest.raises(ConflictError):
+        repo.delete_user(key, expected_version=version)
+    assert names(repo) == ["Ana Maria"]
+
+    repo.delete_user(key, expected_version=version + 1)
+    with pytest.raises(ConflictError):
+        repo.update_user(key, make_row("Ana", "ana@x.com"))
+
+
+def test_keys_survive_deletes(repo):
+    keys = [repo.append_user(make_row(nome, f"{nome.lower()}@x.com")) for nome in ("Ana", "Bia", "Caio")]
+    repo.delete_user(keys[0])
+    assert repo.get_user(keys[2])["nome"] == "Caio"  # as outras chaves não mudam
+    repo.update_user(keys[2], make_row("Caio Lima", "caio@x.com"))
+    assert names(repo) == ["Bia", "Caio Lima"]
+
+
+# ===== Exclusão lógica =====
+
+def test_delete_can_be_undone(repo):
+    ana = repo.append_user(make_row("Ana", "ana@x.com"))
+    repo.append_user(make_row("Bia", "bia@x.com"))
+    repo.delete_user(ana)
+    assert names(repo) == ["Bia"]
+    assert repo.count_users() == 1
+
+    assert repo.restore_user(ana) == 3  # a exclusão e a volta contam como alterações
+    assert names(repo) == ["Ana", "Bia"]
+    with pytest.raises(ConflictError):
+        repo.restore_user(ana)  # não está mais excluído
+
+
+def test_restore_rejects_email_taken_meanwhile(repo):
+    ana = repo.append_user(make_row("Ana", "ana@x.com"))
+    repo.delete_user(ana)
+    repo.append_user(make_row("Outra Ana", "ANA@x.com"))  # o e-mail ficou livre com a exclusão
+
+    with pytest.raises(DuplicateEmailError):
+        repo.restore_user(ana)
+    assert names(repo) == ["Outra Ana"]
+    assert repo.get_user(ana) is None  # continua excluído
+
+
+def test_vacuum_removes_deleted_for_good(repo):
+    ana = repo.append_user(make_row("Ana", "ana@x.com"))
+    bia = repo.append_user(make_row("Bia", "bia@x.com"))
+    repo.append_user(make_row("Caio", "caio@x.com"))
+    repo.delete_user(ana)
+    repo.delete_user(bia)
+
+    assert repo.vacuum(older_than=3600) == 0  # ainda dentro da janela
+    assert repo.vacuum() == 2
+    assert names(repo) == ["Caio"]
+    with pytest.raises(ConflictError):
+        repo.restore_user(ana)
+
+
+# ===== Atualização pontual da tabela =====
+
+def test_append_returns_key_for_get_user(repo):
+    key = repo.append_user(make_row("Ana", "ana@x.com"))
+    assert repo.get_user(key)["nome"] == "Ana"
+    repo.delete_user(key)
+    assert repo.get_user(key) is None
+
+
+def test_data_version_ignores_own_writes(tmp_path):
+    repo = SqliteRepo(str(tmp_path / "cadastros.db"))
+    version = repo.data_version()
+    repo.append_user(make_row("Ana", "ana@x.com"))
+    assert repo.data_version() == version
+
+    SqliteRepo(str(tmp_path / "cadastros.db")).append_user(make_row("Bia", "bia@x.com"))
+    assert repo.data_version() != version
@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import pytest
+
+from app.utils.timing import Timings, timed
+
+
+def test_summary_percentiles_use_the_last_samples():
+    registry = Timings(window=4)
+    for ms in (100, 1, 2, 3, 4):
+        registry.record("op", ms / 1000)
+
+    op = registry.summary()["op"]
+    assert op["count"] == 5
+    assert op["total_ms"] == 110
+    assert op["max_ms"] == 100  # o máximo vale desde o início
+    assert (op["p50_ms"], op["p95_ms"]) == (2, 4)  # só as 4 últimas medições
+
+
+def test_timed_as_block_and_decorator():
+    registry = Timings()
+
+    with timed("bloco", registry):
+        pass
+
+    @timed("sync", registry)
+    def falha():
+        raise ValueError("erro")
+
+    @timed("async", registry)
+    async def soma(a, b):
+        await asyncio.sleep(0)
+        return a + b
+
+    with pytest.raises(ValueError):
+        falha()  # chamadas que falharam também contam
+    assert asyncio.run(soma(1, 2)) == 3
+    assert {name: op["count"] for name, op in registry.summary().items()} == {"async": 1, "bloco": 1, "sync": 1}
+
+
+def test_dump_and_reset(tmp_path):
+    registry = Timings()
+    registry.record("excel.gravar", 0.25)
+    path = tmp_path / "diagnostico.json"
+    registry.dump(str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["operacoes"]["excel.gravar"]["max_ms"] == 250
+
+    registry.reset()
+    assert registry.summary() == {}
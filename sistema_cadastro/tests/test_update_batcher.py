@@ -0,0 +1,63 @@
+import asyncio
+
+from app.utils.update_batcher import UpdateBatcher
+
+
+class FakePage:
+    def __init__(self):
+        self.sent = 0
+
+    def update(self):
+        self.sent += 1
+
+
+def test_one_send_per_event():
+    page = FakePage()
+    batcher = UpdateBatcher(page)
+
+    @batcher.event
+    def handler():
+        for _ in range(5):
+            batcher.update()
+
+    handler()
+    assert page.sent == 1
+    assert batcher.stats == {"events": 1, "updates": 1, "last_event_updates": 1, "max_event_updates": 1}
+
+
+def test_event_without_changes_sends_nothing():
+    page = FakePage()
+    batcher = UpdateBatcher(page)
+    batcher.event(lambda: None)()
+    assert page.sent == 0
+    assert batcher.stats["events"] == 1
+
+
+def test_flush_sends_now_and_nested_batches_join():
+    page = FakePage()
+    batcher = UpdateBatcher(page)
+
+    @batcher.event
+    async def handler():
+        batcher.update()
+        batcher.flush()  # ex.: "Importando..." antes do await
+        assert page.sent == 1
+        await asyncio.sleep(0)
+        with batcher.batch():
+            batcher.update()
+        assert page.sent == 1  # o lote interno não envia sozinho
+        batcher.update()
+
+    asyncio.run(handler())
+    assert page.sent == 2
+    assert batcher.stats["last_event_updates"] == 2
+    assert batcher.stats["max_event_updates"] == 2
+
+
+def test_update_outside_an_event_sends_immediately():
+    page = FakePage()
+    batcher = UpdateBatcher(page)
+    batcher.update()
+    batcher.update()
+    assert page.sent == 2
+    assert batcher.stats["events"] == 0
@@ -0,0 +1,226 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app.services import viacep_service
+from app.services.viacep_service import (
+    CepCache,
+    CircuitBreaker,
+    CircuitOpenError,
+    ViaCepClient,
+    fetch_address_from_viacep,
+)
+
+ADDR = {"logradouro": "Praça da Sé", "bairro": "Sé", "cidade": "São Paulo", "uf": "SP"}
+
+
+class Clock:
+    """Substitui o módulo time dentro de viacep_service (o tempo só anda quando o teste manda)."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture(autouse=True)
+def no_offline_db(monkeypatch):
+    # sem base local, a não ser que o teste instale uma
+    monkeypatch.setattr(viacep_service, "_offline", None)
+    monkeypatch.setattr(viacep_service, "_offline_loaded", True)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(viacep_service, "time", clock)
+    return clock
+
+
+class FakeClient:
+    """Registra os CEPs pedidos; 99999999 não existe."""
+
+    def __init__(self):
+        self.requested = []
+
+    def lookup(self, cep):
+        self.requested.append(cep)
+        return None if cep == "99999999" else dict(ADDR)
+
+
+class StubViaCep:
+    """
+    Servidor HTTP local no lugar do ViaCEP. `statuses` é a fila de códigos
+    das próximas respostas (vazia: 200 com ADDR).
+    """
+
+    def __init__(self):
+        self.statuses = []
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                body = json.dumps({**ADDR, "localidade": ADDR["cidade"]}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/ws"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    stub = StubViaCep()
+    yield stub
+    stub.close()
+
+
+# ===== Cache =====
+
+def test_ttl_and_disk_level(tmp_path, clock):
+    db = str(tmp_path / "cache.db")
+    cache = CepCache(db, ttl=100)
+    cache.put("01001000", ADDR)
+    assert cache.get("01001000") == (True, ADDR)
+
+    # outro processo: só o disco
+    other = CepCache(db, ttl=100)
+    assert other.get("01001000") == (True, ADDR)
+    assert other.stats == {"memory_hits": 0, "disk_hits": 1, "misses": 0}
+
+    clock.now += 101
+    assert cache.get("01001000") == (False, None)
+    assert other.get("01001000") == (False, None)
+
+
+def test_negative_entries_expire_sooner(clock):
+    cache = CepCache(None, ttl=100, negative_ttl=10)
+    cache.put("99999999", None)
+    assert cache.get("99999999") == (True, None)
+    clock.now += 11
+    assert cache.get("99999999") == (False, None)
+
+
+def test_lru_is_bounded(clock):
+    cache = CepCache(None, max_items=2)
+    for cep in ("00000001", "00000002", "00000003"):
+        cache.put(cep, ADDR)
+    assert cache.get("00000001") == (False, None)
+    assert cache.get("00000003") == (True, ADDR)
+
+
+# ===== Busca =====
+
+def test_fetch_uses_cache(clock):
+    cache, client = CepCache(None), FakeClient()
+    assert fetch_address_from_viacep("01001-000", cache=cache, client=client) == ADDR
+    assert fetch_address_from_viacep("01001000", cache=cache, client=client) == ADDR
+    assert client.requested == ["01001000"]
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            fetch_address_from_viacep("99999999", cache=cache, client=client)
+    assert client.requested == ["01001000", "99999999"]
+
+
+# ===== Cliente HTTP =====
+
+def test_retries_5xx_then_succeeds(stub):
+    stub.statuses = [503, 500]
+    client = ViaCepClient(base_url=stub.url, retries=2, backoff=0)
+    assert client.lookup("01001000") == ADDR
+    assert stub.hits == 3
+
+
+def test_breaker_opens_and_fails_fast(stub):
+    stub.statuses = [500] * 4
+    client = ViaCepClient(base_url=stub.url, retries=1, backoff=0, breaker=CircuitBreaker(2, reset_timeout=60))
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            client.lookup("01001000")
+    assert stub.hits == 4
+
+    with pytest.raises(CircuitOpenError):
+        client.lookup("01001000")
+    assert stub.hits == 4  # nem chegou ao servidor
+
+
+def test_breaker_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow()  # chamada de teste
+    assert not breaker.allow()  # as outras esperam o resultado dela
+    breaker.record_failure()  # falhou: reabre
+    assert not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()  # deu certo: fecha
+    assert breaker.allow() and breaker.allow()
+
+
+def test_half_open_trial_against_server(stub, clock):
+    stub.statuses = [500]
+    client = ViaCepClient(base_url=stub.url, retries=0, breaker=CircuitBreaker(1, reset_timeout=5))
+    with pytest.raises(requests.HTTPError):
+        client.lookup("01001000")
+    with pytest.raises(CircuitOpenError):
+        client.lookup("01001000")
+
+    clock.now += 5
+    assert client.lookup("01001000") == ADDR  # o servidor voltou: circuito fecha
+    assert client.lookup("01001000") == ADDR
+    assert stub.hits == 3
+
+
+# ===== Base offline =====
+
+def test_offline_db_comes_first(tmp_path):
+    csv_path = tmp_path / "ceps.csv"
+    csv_path.write_text("cep,logradouro,bairro,cidade,uf\n69079000,Rua A,Centro,Manaus,AM\n", encoding="utf-8")
+    viacep_service.set_offline_db(str(csv_path))
+    cache, client = CepCache(None), FakeClient()
+
+    assert fetch_address_from_viacep("69079-000", cache=cache, client=client)["cidade"] == "Manaus"
+    assert fetch_address_from_viacep("01001000", cache=cache, client=client) == ADDR  # fora da base: ViaCEP
+    assert client.requested == ["01001000"]
+    viacep_service.get_offline_db().close()
+
+
+def test_broken_offline_db_is_disabled_once(tmp_path, monkeypatch, caplog):
+    bad = tmp_path / "ceps.bin"
+    bad.write_bytes(b"lixo")
+    monkeypatch.setenv(viacep_service.OFFLINE_DB_ENV, str(bad))
+    monkeypatch.setattr(viacep_service, "_offline_loaded", False)
+    client = FakeClient()
+
+    for _ in range(3):
+        assert fetch_address_from_viacep("01001000", cache=CepCache(None), client=client) == ADDR
+    assert viacep_service.get_offline_db() is None
+    assert len([r for r in caplog.records if "offline" in r.getMessage()]) == 1
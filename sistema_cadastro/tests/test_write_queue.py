@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from app.services.write_queue import WriteQueue, flush_all
+
+
+class FakeRepo:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.rows = []
+        self.compactions = 0
+
+    def append_user(self, row) -> int:
+        time.sleep(self.delay)
+        if row == "ruim":
+            raise ValueError("E-mail já cadastrado.")
+        self.rows.append(row)
+        return len(self.rows)
+
+    def compact(self):
+        self.compactions += 1
+
+
+def test_burst_is_compacted_once():
+    repo = FakeRepo()
+    writes = WriteQueue(repo, idle_seconds=60)
+    futures = [writes.submit(repo.append_user, f"r{i}") for i in range(5)]
+
+    assert writes.flush(timeout=5)
+    assert [f.result() for f in futures] == [1, 2, 3, 4, 5]
+    assert repo.compactions == 1  # uma gravação do .xlsx para a rajada inteira
+
+    assert writes.flush(timeout=5)
+    assert repo.compactions == 1  # nada novo: não regrava
+    writes.close()
+
+
+def test_idle_queue_compacts_by_itself():
+    repo = FakeRepo()
+    writes = WriteQueue(repo, idle_seconds=0.05)
+    writes.submit(repo.append_user, "a")
+    writes.submit(repo.append_user, "b").result(timeout=5)
+
+    deadline = time.monotonic() + 5
+    while repo.compactions == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert repo.compactions == 1
+    writes.close()
+
+
+def test_callbacks_go_through_dispatch_in_order():
+    repo = FakeRepo()
+    seen = []
+    dispatched = []
+
+    def dispatch(fn, *args):
+        dispatched.append(threading.current_thread().name)
+        fn(*args)
+
+    writes = WriteQueue(repo, dispatch=dispatch)
+    writes.submit(repo.append_user, "a", on_done=lambda key: seen.append(("ok", key)))
+    failed = writes.submit(repo.append_user, "ruim", on_error=lambda ex: seen.append(("erro", str(ex))))
+    writes.submit(repo.append_user, "b", on_done=lambda key: seen.append(("ok", key)))
+    writes.flush(timeout=5)
+
+    assert seen == [("ok", 1), ("erro", "E-mail já cadastrado."), ("ok", 2)]
+    with pytest.raises(ValueError):
+        failed.result()
+    assert set(dispatched) == {"fila-gravacao"}
+    writes.close()
+
+
+def test_flush_from_a_callback_does_not_wait_for_itself():
+    repo = FakeRepo()
+    writes = WriteQueue(repo)
+    results = []
+    writes.submit(repo.append_user, "a", on_done=lambda _: results.append(writes.flush(timeout=1)))
+    writes.flush(timeout=5)
+    assert results == [False]
+    writes.close()
+
+
+def test_flush_all_writes_pending_and_closes():
+    repo = FakeRepo(delay=0.02)
+    writes = WriteQueue(repo, idle_seconds=60)
+    for i in range(5):
+        writes.submit(repo.append_user, f"r{i}")
+
+    flush_all(timeout=5)
+    assert len(repo.rows) == 5
+    assert repo.compactions == 1
+    with pytest.raises(RuntimeError):
+        writes.submit(repo.append_user, "tarde")